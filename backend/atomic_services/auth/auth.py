@@ -1,23 +1,34 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app, resources={r"/auth/*": {"origins": "*"}})
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")  # Use anon key for auth
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(supabase)
+
 
 def require_auth(f):
     @wraps(f)
@@ -26,12 +37,10 @@ def require_auth(f):
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Unauthorized'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = supabase.auth.get_user(token)
-            if not getattr(user, 'user', None):
-                return jsonify({'error': 'Unauthorized'}), 401
-        except Exception:
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Unauthorized'}), 401
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapper
 
@@ -72,6 +81,7 @@ def logout():
     try:
         # Client is responsible for clearing the token
         # Server-side logout is mainly for cleanup if needed
+        token_verifier.revoke(request.headers.get('Authorization', '').split(' ')[1])
         return jsonify({'message': 'Logout successful'}), 200
         
     except Exception as e:
@@ -114,17 +124,17 @@ def validate_token():
         
         token = auth_header.split(' ')[1]
         
-        # Try to get user from token - will raise if token is invalid
-        user = supabase.auth.get_user(token)
+        # Verify locally when possible, falling back to Supabase Auth
+        user = token_verifier.verify(token)
         
-        if not getattr(user, 'user', None):
+        if not user:
             return jsonify({'error': 'Invalid token'}), 401
         
         return jsonify({
             'valid': True,
             'user': {
-                'id': user.user.id,
-                'email': user.user.email
+                'id': user['id'],
+                'email': user['email']
             }
         }), 200
         
@@ -1,25 +1,30 @@
 from flask import request, jsonify
 from functools import wraps
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.http_pool import create_pooled_client
 
 load_dotenv()
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(supabase)
+
 def verify_token(token):
-    """Verify JWT token from Supabase"""
-    try:
-        # Verify the token using Supabase
-        user = supabase.auth.get_user(token)
-        return user
-    except Exception as e:
-        return None
+    """Verify JWT token from Supabase, returning the identity claims or None"""
+    # Signature, expiry and audience are checked locally; Supabase Auth is
+    # only consulted when the token cannot be verified offline
+    return token_verifier.verify(token)
 
 def require_auth(f):
     """Decorator to require authentication for routes"""
@@ -1,29 +1,41 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app)
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
 # Separate client for auth verification (uses anon key)
-auth_supabase: Client = create_client(
+auth_supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(auth_supabase)
+
 
 def require_auth(f):
     @wraps(f)
@@ -32,12 +44,10 @@ def require_auth(f):
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Unauthorized'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = auth_supabase.auth.get_user(token)
-            if not getattr(user, 'user', None):
-                return jsonify({'error': 'Unauthorized'}), 401
-        except Exception:
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Unauthorized'}), 401
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapper
 
@@ -45,8 +55,13 @@ def require_auth(f):
 @app.route('/community', methods=['GET'])
 def get_community():
     try:
-        response = supabase.table('community_service').select('*').execute()
-        return jsonify({'data': response.data, 'count': len(response.data)}), 200
+        # ?limit=&after= keyset pages plus whitelisted filters (shared/listing.py)
+        listing = ListQuery('community_service', request.args)
+        response = listing.apply(supabase.table('community_service').select('*')).execute()
+        rows, next_cursor = listing.page(response.data)
+        return jsonify({'data': rows, 'count': len(rows), 'next_cursor': next_cursor}), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
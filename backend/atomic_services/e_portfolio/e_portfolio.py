@@ -1,29 +1,46 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
+from shared.table_columns import ColumnCatalog, strip_blobs
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app)
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
 # Separate client for auth verification (uses anon key)
-auth_supabase: Client = create_client(
+auth_supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(auth_supabase)
+
+# Column names from PostgREST's schema, so reads can leave out blob columns
+# and return has_logo / logo_version / evidence_count instead
+column_catalog = ColumnCatalog(supabase)
+
 
 def require_auth(f):
     @wraps(f)
@@ -32,12 +49,10 @@ def require_auth(f):
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Unauthorized'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = auth_supabase.auth.get_user(token)
-            if not getattr(user, 'user', None):
-                return jsonify({'error': 'Unauthorized'}), 401
-        except Exception:
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Unauthorized'}), 401
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapper
 
@@ -47,8 +62,14 @@ TABLE_NAME = 'e_portfolio'  # Assumes table name is e_portfolio
 @app.route('/e_portfolio', methods=['GET'])
 def get_e_portfolio():
     try:
-        response = supabase.table(TABLE_NAME).select('*').execute()
-        return jsonify({'data': response.data, 'count': len(response.data)}), 200
+        # ?limit=&after= keyset pages plus whitelisted filters (shared/listing.py)
+        listing = ListQuery(TABLE_NAME, request.args)
+        query = supabase.table(TABLE_NAME).select(column_catalog.select_without_blobs(TABLE_NAME))
+        response = listing.apply(query).execute()
+        rows, next_cursor = listing.page(strip_blobs(TABLE_NAME, response.data))
+        return jsonify({'data': rows, 'count': len(rows), 'next_cursor': next_cursor}), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -56,9 +77,9 @@ def get_e_portfolio():
 @app.route('/e_portfolio/<int:item_id>', methods=['GET'])
 def get_e_portfolio_item(item_id: int):
     try:
-        response = supabase.table(TABLE_NAME).select('*').eq('id', item_id).execute()
+        response = supabase.table(TABLE_NAME).select(column_catalog.select_without_blobs(TABLE_NAME)).eq('id', item_id).execute()
         if response.data:
-            return jsonify(response.data[0]), 200
+            return jsonify(strip_blobs(TABLE_NAME, response.data)[0]), 200
         return jsonify({'error': 'E-portfolio activity not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -92,7 +113,7 @@ def create_e_portfolio():
         new_item = {k: v for k, v in new_item.items() if v is not None}
 
         response = supabase.table(TABLE_NAME).insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'E-portfolio activity created'}), 201
+        return jsonify({'data': strip_blobs(TABLE_NAME, response.data), 'message': 'E-portfolio activity created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -121,7 +142,7 @@ def update_e_portfolio(item_id: int):
 
         response = supabase.table(TABLE_NAME).update(update_data).eq('id', item_id).execute()
         if response.data:
-            return jsonify({'data': response.data, 'message': 'E-portfolio activity updated'}), 200
+            return jsonify({'data': strip_blobs(TABLE_NAME, response.data), 'message': 'E-portfolio activity updated'}), 200
         return jsonify({'error': 'E-portfolio activity not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,29 +1,46 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
+from shared.table_columns import ColumnCatalog, strip_blobs
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app)
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
 # Separate client for auth verification (uses anon key)
-auth_supabase: Client = create_client(
+auth_supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(auth_supabase)
+
+# Column names from PostgREST's schema, so reads can leave out blob columns
+# and return has_logo / logo_version / evidence_count instead
+column_catalog = ColumnCatalog(supabase)
+
 
 def require_auth(f):
     @wraps(f)
@@ -32,12 +49,10 @@ def require_auth(f):
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Unauthorized'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = auth_supabase.auth.get_user(token)
-            if not getattr(user, 'user', None):
-                return jsonify({'error': 'Unauthorized'}), 401
-        except Exception:
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Unauthorized'}), 401
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapper
 
@@ -45,8 +60,14 @@ def require_auth(f):
 @app.route('/education', methods=['GET'])
 def get_education():
     try:
-        response = supabase.table('education').select('*').order('start_date', desc=True).execute()
-        return jsonify({'data': response.data, 'count': len(response.data)}), 200
+        # ?limit=&after= keyset pages plus whitelisted filters (shared/listing.py)
+        listing = ListQuery('education', request.args)
+        query = supabase.table('education').select(column_catalog.select_without_blobs('education'))
+        response = listing.apply(query).execute()
+        rows, next_cursor = listing.page(strip_blobs('education', response.data))
+        return jsonify({'data': rows, 'count': len(rows), 'next_cursor': next_cursor}), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -54,9 +75,9 @@ def get_education():
 @app.route('/education/<int:edu_id>', methods=['GET'])
 def get_education_item(edu_id):
     try:
-        response = supabase.table('education').select('*').eq('id', edu_id).execute()
+        response = supabase.table('education').select(column_catalog.select_without_blobs('education')).eq('id', edu_id).execute()
         if response.data:
-            return jsonify(response.data[0]), 200
+            return jsonify(strip_blobs('education', response.data)[0]), 200
         return jsonify({'error': 'Education record not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -79,7 +100,7 @@ def create_education():
         }
 
         response = supabase.table('education').insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'Education record created'}), 201
+        return jsonify({'data': strip_blobs('education', response.data), 'message': 'Education record created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -103,7 +124,7 @@ def update_education(edu_id):
 
         response = supabase.table('education').update(update_data).eq('id', edu_id).execute()
         if response.data:
-            return jsonify({'data': response.data, 'message': 'Education record updated'}), 200
+            return jsonify({'data': strip_blobs('education', response.data), 'message': 'Education record updated'}), 200
         return jsonify({'error': 'Education record not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
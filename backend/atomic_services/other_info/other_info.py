@@ -1,18 +1,26 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app)
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
@@ -21,8 +29,13 @@ supabase: Client = create_client(
 @app.route('/projects', methods=['GET'])
 def get_projects():
     try:
-        response = supabase.table('other_information').select('*').execute()
-        return jsonify({'data': response.data, 'count': len(response.data)}), 200
+        # ?limit=&after= keyset pages plus whitelisted filters (shared/listing.py)
+        listing = ListQuery('other_information', request.args)
+        response = listing.apply(supabase.table('other_information').select('*')).execute()
+        rows, next_cursor = listing.page(response.data)
+        return jsonify({'data': rows, 'count': len(rows), 'next_cursor': next_cursor}), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
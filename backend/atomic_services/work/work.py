@@ -1,30 +1,46 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from shared.token_verifier import verifier_from_env
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client
+from shared.metrics import instrument_app
+from shared.table_columns import ColumnCatalog, strip_blobs
+
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py)
+instrument_app(app)
 CORS(app)
 
 # Initialize Supabase client
-supabase: Client = create_client(
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
 # Separate client for auth verification (uses anon key)
-auth_supabase: Client = create_client(
+auth_supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# Verifies access tokens locally, only calling Supabase Auth when it has to
+token_verifier = verifier_from_env(auth_supabase)
+
+# Column names from PostgREST's schema, so reads can leave out blob columns
+# and return has_logo / logo_version / evidence_count instead
+column_catalog = ColumnCatalog(supabase)
+
 
 def require_auth(f):
     @wraps(f)
@@ -33,12 +49,10 @@ def require_auth(f):
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Unauthorized'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = auth_supabase.auth.get_user(token)
-            if not getattr(user, 'user', None):
-                return jsonify({'error': 'Unauthorized'}), 401
-        except Exception:
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Unauthorized'}), 401
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapper
 
@@ -46,8 +60,14 @@ def require_auth(f):
 @app.route('/work', methods=['GET'])
 def get_work():
     try:
-        response = supabase.table('work_experience').select('*').order('start_date', desc=True).execute()
-        return jsonify({'data': response.data, 'count': len(response.data)}), 200
+        # ?limit=&after= keyset pages plus whitelisted filters (shared/listing.py)
+        listing = ListQuery('work_experience', request.args)
+        query = supabase.table('work_experience').select(column_catalog.select_without_blobs('work_experience'))
+        response = listing.apply(query).execute()
+        rows, next_cursor = listing.page(strip_blobs('work_experience', response.data))
+        return jsonify({'data': rows, 'count': len(rows), 'next_cursor': next_cursor}), 200
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -55,9 +75,9 @@ def get_work():
 @app.route('/work/<int:work_id>', methods=['GET'])
 def get_work_item(work_id):
     try:
-        response = supabase.table('work_experience').select('*').eq('id', work_id).execute()
+        response = supabase.table('work_experience').select(column_catalog.select_without_blobs('work_experience')).eq('id', work_id).execute()
         if response.data:
-            return jsonify(response.data[0]), 200
+            return jsonify(strip_blobs('work_experience', response.data)[0]), 200
         return jsonify({'error': 'Work record not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -82,7 +102,7 @@ def create_work():
         }
 
         response = supabase.table('work_experience').insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'Work record created'}), 201
+        return jsonify({'data': strip_blobs('work_experience', response.data), 'message': 'Work record created'}), 201
     except Exception as e:
         error_msg = f"Error in create_work: {str(e)}"
         print(error_msg, file=sys.stderr, flush=True)
@@ -111,7 +131,7 @@ def update_work(work_id):
 
         response = supabase.table('work_experience').update(update_data).eq('id', work_id).execute()
         if response.data:
-            return jsonify({'data': response.data, 'message': 'Work record updated'}), 200
+            return jsonify({'data': strip_blobs('work_experience', response.data), 'message': 'Work record updated'}), 200
         return jsonify({'error': 'Work record not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
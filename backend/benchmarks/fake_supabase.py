@@ -0,0 +1,505 @@
+"""In-process stand-in for the Supabase APIs the composite service calls.
+
+FakeSupabase is an httpx transport: installed as the shared transport of
+backend/shared/http_pool.py, every PostgREST, Auth and Storage request made
+by the real supabase-py clients is answered from in-memory tables and
+buckets, after an optional injected latency. It implements the subset of
+PostgREST the service uses (column and JSON-path selects, eq/neq/gt/gte/
+lt/lte/in/is filters, or/and trees, order, limit/offset, insert/update/
+delete/upsert, the remove_evidence_file, apply_batch and sync_id_sequences
+RPCs and the OpenAPI root), password and refresh-token grants, and Storage
+object upload/download (with Range)/list/remove.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from io import BytesIO
+
+import httpx
+from werkzeug.formparser import parse_form_data
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'composite_services'))
+from shared.http_pool import PoolSettings
+from shared.table_columns import blob_version, evidence_count
+
+# Columns per table, as the live schema has them after migrations 001-003
+SCHEMA = {
+    'skills': ['id', 'skill_name', 'proficiency', 'category'],
+    'prof_lvl': ['id', 'level'],
+    'education': ['id', 'institute_name', 'certification', 'start_date', 'finish_date',
+                  'organization_logo', 'logo_version'],
+    'work_experience': ['id', 'company', 'position', 'start_date', 'end_date', 'description',
+                        'organization_logo', 'logo_version'],
+    'community_service': ['id', 'organization', 'role', 'start_date', 'end_date', 'description'],
+    'other_information': ['id', 'project_name', 'description', 'technologies', 'url'],
+    'e_portfolio': ['id', 'activity_name', 'activity_type', 'start_date', 'finish_date',
+                    'organisation_module', 'description', 'what_i_did', 'skills_tools_acquired',
+                    'takeaways', 'artefacts_evidence_files', 'artefacts_evidence_links_texts',
+                    'relevance_career', 'evidence_count', 'artefacts_evidence_meta'],
+}
+
+# Generated columns (migration 001), recomputed on every write
+GENERATED = {
+    'education': {'logo_version': lambda row: blob_version(row['organization_logo']) if row.get('organization_logo') else None},
+    'work_experience': {'logo_version': lambda row: blob_version(row['organization_logo']) if row.get('organization_logo') else None},
+    'e_portfolio': {'evidence_count': lambda row: evidence_count(row.get('artefacts_evidence_files'))},
+}
+
+_RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'or', 'and', 'on_conflict', 'columns'}
+
+
+class PostgrestError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {'code': code, 'message': message, 'details': None, 'hint': None}
+
+
+class FakeSupabase(httpx.BaseTransport):
+    """httpx transport answering Supabase REST, Auth and Storage requests from memory"""
+
+    def __init__(self, tables, latency=0.0, jitter=0.0, jwt_secret='benchmark-secret', seed=0):
+        self.tables = tables
+        self.latency = latency
+        self.jitter = jitter
+        self.jwt_secret = jwt_secret.encode()
+        self.settings = PoolSettings()
+        self.buckets = {}
+        self.requests = 0
+        self._next_id = {name: max([r['id'] for r in rows] or [0]) + 1 for name, rows in tables.items()}
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        for name, rows in tables.items():
+            for row in rows:
+                self._fill_generated(name, row)
+
+    # -- transport -----------------------------------------------------------
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        request.read()
+        path = request.url.path
+        try:
+            if path.startswith('/rest/v1'):
+                return self._postgrest(request, path[len('/rest/v1'):])
+            if path.startswith('/auth/v1'):
+                return self._auth(request, path[len('/auth/v1'):])
+            if path.startswith('/storage/v1'):
+                return self._storage(request, path[len('/storage/v1'):])
+        except PostgrestError as e:
+            return _json(e.body, e.status)
+        return _json({'message': 'Not found'}, 404)
+
+    def stats(self):
+        """Stands in for MeteredTransport.stats() behind /api/admin/http-pool"""
+        return {'requests': self.requests, 'fake': True}
+
+    def close(self):
+        pass
+
+    # -- PostgREST -----------------------------------------------------------
+
+    def _postgrest(self, request, path):
+        if path in ('', '/'):
+            return _json({'definitions': {t: {'properties': {c: {} for c in cols}} for t, cols in SCHEMA.items()}})
+        if path.startswith('/rpc/'):
+            return self._rpc(path[len('/rpc/'):], json.loads(request.content or b'{}'))
+        table = path.strip('/')
+        if table not in self.tables:
+            raise PostgrestError(404, '42P01', f'relation "public.{table}" does not exist')
+        params = list(request.url.params.multi_items())
+        prefer = request.headers.get('Prefer', '')
+        with self._lock:
+            rows = self.tables[table]
+            matched = [r for r in rows if self._matches(r, params)]
+            if request.method == 'GET':
+                result = self._order_and_page(matched, params)
+            elif request.method == 'POST':
+                result = self._insert(table, json.loads(request.content), 'merge-duplicates' in prefer)
+            elif request.method == 'PATCH':
+                result = self._update(table, matched, json.loads(request.content))
+            elif request.method == 'DELETE':
+                ids = {id(r) for r in matched}
+                self.tables[table] = [r for r in rows if id(r) not in ids]
+                result = matched
+            else:
+                raise PostgrestError(405, 'PGRST117', f'Unsupported HTTP method: {request.method}')
+            select = dict(params).get('select', '*')
+            body = [self._project(table, row, select) for row in result]
+        if request.method != 'GET' and 'return=representation' not in prefer:
+            return httpx.Response(204)
+        return _json(body, 201 if request.method == 'POST' else 200)
+
+    def _insert(self, table, payload, upsert):
+        rows = payload if isinstance(payload, list) else [payload]
+        created = []
+        for values in rows:
+            self._check_columns(table, values)
+            existing = upsert and 'id' in values and next((r for r in self.tables[table] if r['id'] == values['id']), None)
+            if existing:
+                existing.update(values)
+                self._fill_generated(table, existing)
+                created.append(existing)
+                continue
+            row = {column: None for column in SCHEMA[table]}
+            row.update(values)
+            if row.get('id') is None:
+                row['id'] = self._next_id[table]
+            self._next_id[table] = max(self._next_id[table], row['id']) + 1
+            self._fill_generated(table, row)
+            self.tables[table].append(row)
+            created.append(row)
+        return created
+
+    def _update(self, table, matched, values):
+        self._check_columns(table, values)
+        for row in matched:
+            row.update(values)
+            self._fill_generated(table, row)
+        return matched
+
+    def _check_columns(self, table, values):
+        for column in values:
+            if column not in SCHEMA[table] or column in GENERATED.get(table, {}):
+                raise PostgrestError(400, 'PGRST204',
+                                     f"Could not find the '{column}' column of '{table}' in the schema cache")
+
+    def _fill_generated(self, table, row):
+        for column, compute in GENERATED.get(table, {}).items():
+            row[column] = compute(row)
+
+    def _rpc(self, name, args):
+        if name == 'apply_batch':
+            return self._apply_batch(args['p_operations'], args.get('p_atomic', False))
+        if name == 'sync_id_sequences':
+            # Inserts already move _next_id past explicit ids (migrations/005)
+            return _json([{'synced_table': t} for t in args['p_tables'] if t in self.tables])
+        if name == 'swap_blob_value':
+            # Same behaviour as migrations/006_swap_blob_value.sql
+            with self._lock:
+                table, column = args['p_table'], args['p_column']
+                row = next((r for r in self.tables[table] if r['id'] == args['p_id']), None)
+                if row is None or row.get(column) != args['p_expected']:
+                    return _json([])
+                row[column] = args['p_value']
+                self._fill_generated(table, row)
+                return _json([{'swapped_id': row['id']}])
+        if name != 'remove_evidence_file':
+            raise PostgrestError(404, 'PGRST202', f'Could not find the function public.{name}')
+        # Same behaviour as migrations/003_evidence_metadata.sql
+        with self._lock:
+            row = next((r for r in self.tables['e_portfolio'] if r['id'] == args['p_item_id']), None)
+            if row is None:
+                return _json({'status': 'not_found'})
+            files, meta, index = row.get('artefacts_evidence_files'), row.get('artefacts_evidence_meta'), args['p_file_index']
+            if isinstance(files, str):
+                if index != 0:
+                    return _json({'status': 'out_of_range'})
+                files = None
+            elif isinstance(files, list):
+                if not 0 <= index < len(files):
+                    return _json({'status': 'out_of_range'})
+                files = files[:index] + files[index + 1:] or None
+            else:
+                return _json({'status': 'no_files'})
+            if files is None or not isinstance(meta, list):
+                meta = None
+            else:
+                meta = meta[:index] + meta[index + 1:]
+            row.update(artefacts_evidence_files=files, artefacts_evidence_meta=meta)
+            self._fill_generated('e_portfolio', row)
+            return _json({'status': 'removed', 'remaining': len(files or [])})
+
+    def _apply_batch(self, operations, atomic):
+        # Same behaviour as migrations/004_apply_batch.sql
+        with self._lock:
+            saved = ({t: [dict(r) for r in rows] for t, rows in self.tables.items()}, dict(self._next_id))
+            results = []
+            for index, operation in enumerate(operations):
+                try:
+                    result = self._batch_operation(operation)
+                except PostgrestError as e:
+                    result = {'status': 400, 'error': str(e)}
+                if atomic and result['status'] >= 400:
+                    self.tables, self._next_id = saved
+                    raise PostgrestError(400, 'P0002', f"operation {index}: {result['error']}")
+                results.append(result)
+            return _json(results)
+
+    def _batch_operation(self, operation):
+        table, data = operation['table'], operation.get('data') or {}
+        if operation['op'] == 'create':
+            return {'status': 201, 'data': dict(self._insert(table, data, False)[0])}
+        matched = [r for r in self.tables[table] if r['id'] == operation['id']]
+        if not matched:
+            return {'status': 404, 'error': 'not found'}
+        if operation['op'] == 'update':
+            return {'status': 200, 'data': dict(self._update(table, matched, data)[0])}
+        self.tables[table] = [r for r in self.tables[table] if r['id'] != operation['id']]
+        return {'status': 200, 'data': {'id': operation['id']}}
+
+    def _matches(self, row, params):
+        for key, value in params:
+            if key in ('or', 'and'):
+                if not _logic(row, key, _split_top(value[1:-1])):
+                    return False
+            elif key not in _RESERVED_PARAMS and not _condition(row, key, value):
+                return False
+        return True
+
+    def _order_and_page(self, rows, params):
+        params = dict(params)
+        rows = list(rows)
+        for term in reversed([t for t in params.get('order', '').split(',') if t]):
+            column, *flags = term.split('.')
+            desc = 'desc' in flags
+            nulls_first = 'nullsfirst' in flags or (desc and 'nullslast' not in flags)
+            present = sorted([r for r in rows if r.get(column) is not None], key=lambda r: _sort_key(r[column]), reverse=desc)
+            nulls = [r for r in rows if r.get(column) is None]
+            rows = nulls + present if nulls_first else present + nulls
+        offset = int(params.get('offset', 0))
+        limit = params.get('limit')
+        return rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+
+    def _project(self, table, row, select):
+        out = {}
+        for item in _split_top(select):
+            if item == '*':
+                out.update(row)
+                continue
+            alias, _, expression = item.rpartition(':')
+            column, steps = _json_path(expression)
+            if column not in SCHEMA[table]:
+                raise PostgrestError(400, '42703', f'column {table}.{column} does not exist')
+            value = row.get(column)
+            for arrow, key in steps:
+                if isinstance(value, list) and key.lstrip('-').isdigit() and -len(value) <= int(key) < len(value):
+                    value = value[int(key)]
+                elif isinstance(value, dict):
+                    value = value.get(key)
+                else:
+                    value = None
+                if arrow == '->>' and value is not None and not isinstance(value, str):
+                    value = json.dumps(value)
+            out[alias or (steps[-1][1] if steps else column)] = value
+        return out
+
+    # -- Auth ----------------------------------------------------------------
+
+    def _auth(self, request, path):
+        if path == '/token':
+            grant = request.url.params.get('grant_type')
+            body = json.loads(request.content or b'{}')
+            if grant == 'password' and body.get('password'):
+                return _json(self.session(body.get('email') or 'owner@example.com'))
+            if grant == 'refresh_token' and body.get('refresh_token'):
+                return _json(self.session('owner@example.com'))
+            return _json({'error': 'invalid_grant', 'error_description': 'Invalid login credentials'}, 400)
+        if path == '/user':
+            token = request.headers.get('Authorization', '').partition(' ')[2]
+            claims = self.claims(token)
+            if claims is None:
+                return _json({'message': 'invalid JWT'}, 401)
+            return _json(_user(claims['sub'], claims.get('email')))
+        if path == '/logout':
+            return httpx.Response(204)
+        return _json({'message': 'Not found'}, 404)
+
+    def access_token(self, email='owner@example.com', ttl=3600):
+        """HS256 access token signed with the fake project's JWT secret"""
+        header = _b64({'alg': 'HS256', 'typ': 'JWT'})
+        claims = _b64({'sub': str(uuid.uuid5(uuid.NAMESPACE_DNS, email)), 'email': email,
+                       'aud': 'authenticated', 'role': 'authenticated', 'exp': int(time.time()) + ttl,
+                       'jti': uuid.uuid4().hex})
+        signature = hmac.new(self.jwt_secret, f'{header}.{claims}'.encode(), hashlib.sha256).digest()
+        return f'{header}.{claims}.{base64.urlsafe_b64encode(signature).rstrip(b"=").decode()}'
+
+    def claims(self, token):
+        try:
+            header, claims, signature = token.split('.')
+            expected = hmac.new(self.jwt_secret, f'{header}.{claims}'.encode(), hashlib.sha256).digest()
+            if not hmac.compare_digest(base64.urlsafe_b64encode(expected).rstrip(b'=').decode(), signature):
+                return None
+            return json.loads(base64.urlsafe_b64decode(claims + '=' * (-len(claims) % 4)))
+        except ValueError:
+            return None
+
+    def session(self, email):
+        token = self.access_token(email)
+        claims = self.claims(token)
+        return {'access_token': token, 'refresh_token': uuid.uuid4().hex, 'token_type': 'bearer',
+                'expires_in': 3600, 'expires_at': claims['exp'], 'user': _user(claims['sub'], email)}
+
+    # -- Storage -------------------------------------------------------------
+
+    def _storage(self, request, path):
+        if path == '/bucket' and request.method == 'POST':
+            name = json.loads(request.content)['id']
+            with self._lock:
+                if name in self.buckets:
+                    return _json({'statusCode': '409', 'error': 'Duplicate', 'message': 'The resource already exists'}, 409)
+                self.buckets[name] = {}
+            return _json({'name': name})
+        if path.startswith('/object/list/') and request.method == 'POST':
+            bucket = self.buckets.get(path[len('/object/list/'):], {})
+            body = json.loads(request.content)
+            prefix, search = body.get('prefix', '').strip('/'), body.get('search', '')
+            with self._lock:
+                entries = [
+                    {'name': key.rsplit('/', 1)[-1], 'id': key, 'metadata': {'size': len(data), 'mimetype': mimetype}}
+                    for key, (data, mimetype) in bucket.items()
+                    if key.rsplit('/', 1)[0] == prefix and search in key.rsplit('/', 1)[-1]
+                ]
+            return _json(entries)
+        if path.startswith('/object/'):
+            bucket_name, _, key = path[len('/object/'):].partition('/')
+            if request.method == 'DELETE':
+                prefixes = json.loads(request.content).get('prefixes', [])
+                with self._lock:
+                    removed = [p for p in prefixes if self.buckets.get(bucket_name, {}).pop(p, None) is not None]
+                return _json([{'name': p} for p in removed])
+            bucket = self.buckets.get(bucket_name)
+            if bucket is None:
+                return _json({'statusCode': '404', 'error': 'Bucket not found', 'message': 'Bucket not found'}, 404)
+            if request.method == 'POST':
+                return self._upload(request, bucket, bucket_name, key)
+            if request.method == 'GET':
+                return self._download(request, bucket, key)
+        return _json({'message': 'Not found'}, 404)
+
+    def _upload(self, request, bucket, bucket_name, key):
+        environ = {'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': request.headers['Content-Type'],
+                   'CONTENT_LENGTH': str(len(request.content)), 'wsgi.input': BytesIO(request.content)}
+        _, _, files = parse_form_data(environ)
+        upload = files['file']
+        with self._lock:
+            if key in bucket:
+                return _json({'statusCode': '409', 'error': 'Duplicate', 'message': 'The resource already exists'}, 409)
+            bucket[key] = (upload.read(), upload.mimetype)
+        return _json({'Key': f'{bucket_name}/{key}'})
+
+    def _download(self, request, bucket, key):
+        entry = bucket.get(key)
+        if entry is None:
+            return _json({'statusCode': '404', 'error': 'not_found', 'message': 'Object not found'}, 400)
+        data, mimetype = entry
+        ranges = request.headers.get('Range', '')
+        if ranges.startswith('bytes='):
+            first, _, last = ranges[6:].partition('-')
+            start, stop = int(first), min(int(last) + 1 if last else len(data), len(data))
+            return httpx.Response(206, content=data[start:stop], headers={
+                'Content-Type': mimetype, 'Content-Range': f'bytes {start}-{stop - 1}/{len(data)}'})
+        return httpx.Response(200, content=data, headers={'Content-Type': mimetype})
+
+
+def _json(body, status=200):
+    return httpx.Response(status, content=json.dumps(body).encode(), headers={'Content-Type': 'application/json'})
+
+
+def _b64(obj):
+    return base64.urlsafe_b64encode(json.dumps(obj, separators=(',', ':')).encode()).rstrip(b'=').decode()
+
+
+def _user(user_id, email):
+    return {'id': user_id, 'aud': 'authenticated', 'role': 'authenticated', 'email': email,
+            'app_metadata': {'provider': 'email'}, 'user_metadata': {},
+            'created_at': '2024-01-01T00:00:00Z'}
+
+
+def _split_top(text):
+    """Split on commas outside parentheses and double quotes"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for i, char in enumerate(text):
+        if char == '"' and (i == 0 or text[i - 1] != '\\'):
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _logic(row, operator, terms):
+    results = []
+    for term in terms:
+        if term.startswith(('or(', 'and(')):
+            name, _, rest = term.partition('(')
+            results.append(_logic(row, name, _split_top(rest[:-1])))
+        else:
+            column, _, condition = term.partition('.')
+            results.append(_condition(row, column, condition))
+    return any(results) if operator == 'or' else all(results)
+
+
+def _condition(row, column, condition):
+    negate = condition.startswith('not.')
+    if negate:
+        condition = condition[4:]
+    operator, _, raw = condition.partition('.')
+    value = row.get(column)
+    if operator == 'is':
+        result = value is None if raw == 'null' else value is (raw == 'true')
+    elif operator == 'in':
+        result = value is not None and _text(value) in {_unquote(v) for v in _split_top(raw[1:-1])}
+    elif value is None:
+        result = False
+    else:
+        left, right = _comparable(value, _unquote(raw))
+        result = {'eq': left == right, 'neq': left != right, 'gt': left > right, 'gte': left >= right,
+                  'lt': left < right, 'lte': left <= right}[operator]
+    return not result if negate else result
+
+
+def _comparable(value, raw):
+    if isinstance(value, bool):
+        return value, raw == 'true'
+    if isinstance(value, (int, float)):
+        try:
+            return value, float(raw)
+        except ValueError:
+            return str(value), raw
+    return _text(value), raw
+
+
+def _text(value):
+    return value if isinstance(value, str) else json.dumps(value) if isinstance(value, (list, dict)) else str(value)
+
+
+def _unquote(raw):
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        return raw[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return raw
+
+
+def _sort_key(value):
+    return (0, value, '') if isinstance(value, (int, float)) else (1, 0, _text(value))
+
+
+def _json_path(expression):
+    steps = []
+    while True:
+        index = expression.rfind('->')
+        if index < 0:
+            return expression, list(reversed(steps))
+        arrow = '->>' if expression[index:index + 3] == '->>' else '->'
+        steps.append((arrow, expression[index + len(arrow):]))
+        expression = expression[:index]
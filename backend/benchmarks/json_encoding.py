@@ -0,0 +1,113 @@
+"""Encode-time comparison of the JSON providers on portfolio-shaped payloads.
+
+    python backend/benchmarks/json_encoding.py [--rows 300] [--repeat 50]
+
+Times Flask's stdlib provider against FastJSONProvider (orjson, and
+MessagePack when msgpack is installed) on an /api/e-portfolio list and an
+/api/portfolio document. Needs no Supabase project or network.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'composite_services'))
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from serialization import FastJSONProvider, msgpack, orjson
+
+WORDS = ('portfolio reflection module project stakeholder delivered analysed improved '
+         'collaborated documented presented research outcome learning évaluation café '
+         'teamwork leadership communication prototype deadline feedback iteration').split()
+
+
+def prose(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def e_portfolio_rows(rng, count):
+    return [{
+        'id': i,
+        'activity_name': prose(rng, 6),
+        'activity_type': rng.choice(['Project', 'Module', 'Internship', 'CCA']),
+        'start_date': f'202{i % 5}-0{1 + i % 9}-1{i % 9}',
+        'finish_date': None if i % 7 == 0 else f'202{i % 5 + 1}-0{1 + i % 9}-2{i % 9}',
+        'organisation_module': prose(rng, 4),
+        'description': prose(rng, 180),
+        'what_i_did': prose(rng, 150),
+        'skills_tools_acquired': prose(rng, 40),
+        'takeaways': prose(rng, 120),
+        'artefacts_evidence_links_texts': '\n'.join(f'https://example.org/evidence/{i}/{n}' for n in range(3)),
+        'relevance_career': prose(rng, 80),
+        'evidence_count': i % 4,
+        'artefacts_evidence_meta': [
+            {'filename': f'report-{i}-{n}.pdf', 'size': 200000 + n, 'mime_type': 'application/pdf',
+             'sha256': '%064x' % rng.getrandbits(256), 'uploaded_at': '2024-05-01T10:00:00+00:00'}
+            for n in range(i % 4)
+        ],
+    } for i in range(1, count + 1)]
+
+
+def portfolio_document(rng, count):
+    return {
+        'skills': [{'id': i, 'skill_name': prose(rng, 2), 'proficiency': i % 5, 'category': 'Technical',
+                    'proficiency_label': 'Advanced'} for i in range(count // 3)],
+        'education': [{'id': i, 'institute_name': prose(rng, 4), 'certification': prose(rng, 6),
+                       'start_date': '2019-01-01', 'finish_date': '2023-01-01', 'logo_version': 'abc123',
+                       'has_logo': True} for i in range(6)],
+        'work': [{'id': i, 'company': prose(rng, 3), 'position': prose(rng, 3), 'start_date': '2022-06-01',
+                  'end_date': None, 'description': prose(rng, 120)} for i in range(count // 10)],
+        'community': [{'id': i, 'organization': prose(rng, 3), 'role': 'Volunteer', 'start_date': '2021-01-01',
+                       'end_date': '2021-12-31', 'description': prose(rng, 60)} for i in range(count // 10)],
+        'projects': [{'id': i, 'project_name': prose(rng, 4), 'description': prose(rng, 150),
+                      'technologies': 'Python, Flask, Vue', 'url': f'https://example.org/p/{i}'}
+                     for i in range(count // 5)],
+        'errors': {},
+    }
+
+
+def time_encode(encode, payload, repeat):
+    encode(payload)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(payload)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300, help='e-portfolio rows in each payload')
+    parser.add_argument('--repeat', type=int, default=50, help='timed encodes per case')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = {
+        '/api/e-portfolio': e_portfolio_rows(rng, args.rows),
+        '/api/portfolio': portfolio_document(rng, args.rows),
+    }
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    encoders = {'stdlib json': lambda obj: stdlib.response(obj).get_data()}
+    if orjson is not None:
+        encoders['orjson'] = lambda obj: fast.encode(obj)[0]
+    if msgpack is not None:
+        encoders['msgpack'] = lambda obj: fast.encode(obj, 'msgpack')[0]
+
+    print(f'{"payload":<18} {"encoder":<12} {"median ms":>10} {"bytes":>10} {"speed-up":>9}')
+    for name, payload in payloads.items():
+        baseline = None
+        for label, encode in encoders.items():
+            ms, size = time_encode(encode, payload, args.repeat)
+            baseline = baseline or ms
+            print(f'{name:<18} {label:<12} {ms:>10.2f} {size:>10} {baseline / ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+"""Offline benchmark of every composite route against an in-process Supabase.
+
+    python backend/benchmarks/run.py                        # all routes
+    python backend/benchmarks/run.py --routes portfolio,logo --concurrency 1,16
+    python backend/benchmarks/run.py --latency-ms 40 --cache cold
+    python backend/benchmarks/run.py --compare backend/benchmarks/results/<earlier>.json
+
+main_server is imported with FakeSupabase (fake_supabase.py) installed as
+the shared HTTP transport, so the real supabase-py clients, caches and blob
+store run unchanged while every Supabase call is answered from memory after
+--latency-ms (+ up to --jitter-ms). The data set holds --rows e-portfolio
+rows of prose, legacy inline hex evidence of --blob-mb MB on every tenth
+row, and inline hex and Storage-backed logos.
+
+Each route runs --requests requests at every --concurrency level, one Flask
+test client per worker thread. Reported per route and level: p50/p95/p99
+latency, throughput, error count and the process's peak RSS so far. Results
+are written to backend/benchmarks/results/<time>_<commit>.json; --compare
+prints the change against an earlier file.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..'))
+sys.path.append(os.path.join(HERE, '..', 'composite_services'))
+
+from fake_supabase import FakeSupabase
+from json_encoding import prose
+
+RESULTS_DIR = os.path.join(HERE, 'results')
+PNG_HEADER = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x80\x00\x00\x00\x80\x08\x06\x00\x00\x00'
+PDF_HEADER = b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n'
+
+
+# -- data set -----------------------------------------------------------------
+
+def seed(rows, blob_mb, rng):
+    """(tables, storage objects) with realistic volumes"""
+    from blob_store import make_ref
+    import hashlib
+
+    objects = {}
+
+    def stored(data, mimetype):
+        key = hashlib.sha256(data).hexdigest()
+        objects[f'sha256/{key[:2]}/{key}'] = (data, mimetype)
+        return make_ref(key)
+
+    def hex_value(data):
+        return '\\x' + data.hex()
+
+    svg = ('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 64 64">'
+           + '<path d="M0 0h64v64H0z" fill="#123456"/>' * 200 + '</svg>').encode()
+    png = PNG_HEADER + rng.randbytes(40 * 1024)
+    big_pdf = PDF_HEADER + rng.randbytes(int(blob_mb * 1024 * 1024))
+    legacy_evidence = hex_value(big_pdf)  # one shared string: hex doubles the size
+    small_pdf = PDF_HEADER + rng.randbytes(300 * 1024)
+    small_ref = stored(small_pdf, 'application/pdf')
+    meta = {'filename': 'report.pdf', 'size': len(small_pdf), 'mime_type': 'application/pdf',
+            'sha256': small_ref.split(':', 1)[1], 'uploaded_at': '2024-05-01T10:00:00+00:00'}
+
+    def logo(i):
+        return [hex_value(png), stored(svg, 'image/svg+xml'), hex_value(svg), None][i % 4]
+
+    tables = {
+        'prof_lvl': [{'id': i, 'level': label} for i, label in
+                     enumerate(['Beginner', 'Novice', 'Intermediate', 'Advanced', 'Expert'], 1)],
+        'skills': [{'id': i, 'skill_name': prose(rng, 2), 'proficiency': 1 + i % 5,
+                    'category': rng.choice(['Technical', 'Soft', 'Tools'])} for i in range(1, rows // 3 + 1)],
+        'education': [{'id': i, 'institute_name': prose(rng, 4), 'certification': prose(rng, 6),
+                       'start_date': f'20{10 + i}-01-0{1 + i % 9}', 'finish_date': f'20{13 + i}-12-01',
+                       'organization_logo': logo(i)} for i in range(1, 9)],
+        'work_experience': [{'id': i, 'company': prose(rng, 3), 'position': prose(rng, 3),
+                             'start_date': f'20{10 + i % 14}-0{1 + i % 9}-01', 'end_date': None if i % 5 == 0 else '2024-01-01',
+                             'description': prose(rng, 120), 'organization_logo': logo(i)} for i in range(1, 21)],
+        'community_service': [{'id': i, 'organization': prose(rng, 3), 'role': rng.choice(['Volunteer', 'Lead']),
+                               'start_date': f'2019-0{1 + i % 9}-01', 'end_date': '2020-01-01',
+                               'description': prose(rng, 60)} for i in range(1, 31)],
+        'other_information': [{'id': i, 'project_name': prose(rng, 4), 'description': prose(rng, 150),
+                               'technologies': 'Python, Flask, Vue', 'url': f'https://example.org/p/{i}'}
+                              for i in range(1, 41)],
+        'e_portfolio': [],
+    }
+    for i in range(1, rows + 1):
+        files, metas = None, None
+        if i % 10 == 0:
+            files = [legacy_evidence]
+        elif i % 3 == 0:
+            files, metas = [small_ref, small_ref], [meta, meta]
+        elif i % 3 == 1:
+            files, metas = small_ref, [meta]
+        tables['e_portfolio'].append({
+            'id': i, 'activity_name': prose(rng, 6), 'activity_type': rng.choice(['Project', 'Module', 'Internship']),
+            'start_date': f'20{15 + i % 9}-0{1 + i % 9}-1{i % 9}', 'finish_date': None if i % 7 == 0 else '2024-06-30',
+            'organisation_module': prose(rng, 4), 'description': prose(rng, 180), 'what_i_did': prose(rng, 150),
+            'skills_tools_acquired': prose(rng, 40), 'takeaways': prose(rng, 120), 'relevance_career': prose(rng, 80),
+            'artefacts_evidence_files': files, 'artefacts_evidence_meta': metas,
+            'artefacts_evidence_links_texts': f'https://example.org/evidence/{i}' if i % 4 == 0 else None,
+        })
+    return tables, objects
+
+
+# -- routes -------------------------------------------------------------------
+
+class Scenario:
+    """One route: request(i, ctx) -> test-client kwargs; prepare(i) runs untimed first"""
+
+    def __init__(self, name, method, path, ok=(200,), auth=False, prepare=None, **kwargs):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.ok = ok
+        self.auth = auth
+        self.prepare = prepare
+        self.kwargs = kwargs
+
+    def request(self, i, ctx):
+        path = self.path(i, ctx) if callable(self.path) else self.path
+        kwargs = {key: value(i, ctx) if callable(value) else value for key, value in self.kwargs.items()}
+        return path, kwargs
+
+
+def scenarios(fake, rows, rng, upload_kb):
+    tables = fake.tables
+    ids = lambda table: [r['id'] for r in tables[table]]
+    legacy_items = [i for i in ids('e_portfolio') if i % 10 == 0]
+    stored_items = [i for i in ids('e_portfolio') if i % 3 == 1 and i % 10]
+    pick = lambda values: (lambda i, ctx: values[i % len(values)])
+
+    def new_row(table, **values):
+        def prepare(i):
+            with fake._lock:
+                return fake._insert(table, dict(values), False)[0]['id']
+        return prepare
+
+    def upload(field, size, header, name, mimetype):
+        return lambda i, ctx: {field: (BytesIO(header + i.to_bytes(8, 'big') + rng.randbytes(size)), name, mimetype)}
+
+    def login(i, ctx):
+        return {'email': 'owner@example.com', 'password': 'benchmark'}
+
+    return [
+        # Public reads
+        Scenario('GET /api/skills', 'GET', '/api/skills'),
+        Scenario('GET /api/education', 'GET', '/api/education'),
+        Scenario('GET /api/work', 'GET', '/api/work'),
+        Scenario('GET /api/community', 'GET', '/api/community'),
+        Scenario('GET /api/projects', 'GET', '/api/projects'),
+        Scenario('GET /api/e-portfolio', 'GET', '/api/e-portfolio'),
+        Scenario('GET /api/e-portfolio?limit=50', 'GET', '/api/e-portfolio?limit=50&order=start_date'),
+        Scenario('GET /api/e-portfolio/<id>', 'GET', lambda i, ctx: f'/api/e-portfolio/{1 + i % rows}'),
+        Scenario('GET /api/e-portfolio/<id>/files', 'GET', lambda i, ctx: f'/api/e-portfolio/{1 + i % rows}/files'),
+        Scenario('GET /api/prof-levels', 'GET', '/api/prof-levels'),
+        Scenario('GET /api/portfolio', 'GET', '/api/portfolio'),
+        Scenario('GET /api/education/<id>/logo', 'GET', lambda i, ctx: f'/api/education/{4 + i % 3}/logo'),
+        Scenario('GET /api/work/<id>/logo', 'GET', lambda i, ctx: f'/api/work/{4 + i % 3}/logo'),
+        Scenario('GET download (stored)', 'GET', lambda i, ctx: f'/api/e-portfolio/{pick(stored_items)(i, ctx)}/download/0'),
+        Scenario('GET download (legacy hex)', 'GET', lambda i, ctx: f'/api/e-portfolio/{pick(legacy_items)(i, ctx)}/download/0'),
+        Scenario('GET download (Range)', 'GET', lambda i, ctx: f'/api/e-portfolio/{pick(stored_items)(i, ctx)}/download/0',
+                 ok=(206,), headers={'Range': 'bytes=0-65535'}),
+        Scenario('GET preview', 'GET', lambda i, ctx: f'/api/e-portfolio/{pick(stored_items)(i, ctx)}/preview/0'),
+
+        # Auth
+        Scenario('POST /api/auth/login', 'POST', '/api/auth/login', json=login),
+        Scenario('POST /api/auth/validate', 'POST', '/api/auth/validate', auth=True),
+        Scenario('POST /api/auth/refresh', 'POST', '/api/auth/refresh', json={'refresh_token': 'benchmark'}),
+        Scenario('POST /api/auth/logout', 'POST', '/api/auth/logout', prepare=lambda i: fake.access_token(),
+                 headers=lambda i, token: {'Authorization': f'Bearer {token}'}),
+        Scenario('GET /api/admin/http-pool', 'GET', '/api/admin/http-pool', auth=True),
+
+        # Writes
+        Scenario('POST /api/skills', 'POST', '/api/skills', ok=(201,), auth=True,
+                 json={'skill_name': 'Benchmarking', 'proficiency': 3, 'category': 'Technical'}),
+        Scenario('PUT /api/skills/<id>', 'PUT', lambda i, ctx: f'/api/skills/{1 + i % (rows // 3)}', auth=True,
+                 json={'proficiency': 4}),
+        Scenario('DELETE /api/skills/<id>', 'DELETE', lambda i, ctx: f'/api/skills/{ctx}', auth=True,
+                 prepare=new_row('skills', skill_name='Temporary')),
+        Scenario('POST /api/education', 'POST', '/api/education', ok=(201,), auth=True,
+                 json={'institute_name': 'Benchmark University', 'certification': 'BSc', 'start_date': '2020-01-01'}),
+        Scenario('PUT /api/education/<id>', 'PUT', lambda i, ctx: f'/api/education/{1 + i % 8}', auth=True,
+                 json={'certification': 'BSc (Hons)'}),
+        Scenario('DELETE /api/education/<id>', 'DELETE', lambda i, ctx: f'/api/education/{ctx}', auth=True,
+                 prepare=new_row('education', institute_name='Temporary')),
+        Scenario('POST /api/education/<id>/logo', 'POST', lambda i, ctx: f'/api/education/{5 + i % 4}/logo', auth=True,
+                 data=upload('logo', 20 * 1024, PNG_HEADER, 'logo.png', 'image/png')),
+        Scenario('POST /api/work', 'POST', '/api/work', ok=(201,), auth=True,
+                 json={'company': 'Benchmark Ltd', 'position': 'Engineer', 'start_date': '2022-01-01'}),
+        Scenario('PUT /api/work/<id>', 'PUT', lambda i, ctx: f'/api/work/{1 + i % 20}', auth=True,
+                 json={'position': 'Senior Engineer'}),
+        Scenario('DELETE /api/work/<id>', 'DELETE', lambda i, ctx: f'/api/work/{ctx}', auth=True,
+                 prepare=new_row('work_experience', company='Temporary')),
+        Scenario('POST /api/work/<id>/logo', 'POST', lambda i, ctx: f'/api/work/{17 + i % 4}/logo', auth=True,
+                 data=upload('logo', 20 * 1024, PNG_HEADER, 'logo.png', 'image/png')),
+        Scenario('POST /api/community', 'POST', '/api/community', ok=(201,), auth=True,
+                 json={'organization': 'Benchmark Club', 'role': 'Volunteer'}),
+        Scenario('PUT /api/community/<id>', 'PUT', lambda i, ctx: f'/api/community/{1 + i % 30}', auth=True,
+                 json={'role': 'Lead'}),
+        Scenario('DELETE /api/community/<id>', 'DELETE', lambda i, ctx: f'/api/community/{ctx}', auth=True,
+                 prepare=new_row('community_service', organization='Temporary')),
+        Scenario('POST /api/projects', 'POST', '/api/projects', ok=(201,), auth=True,
+                 json={'project_name': 'Benchmark', 'description': 'Load test', 'technologies': 'Python'}),
+        Scenario('PUT /api/projects/<id>', 'PUT', lambda i, ctx: f'/api/projects/{1 + i % 40}', auth=True,
+                 json={'technologies': 'Python, Flask'}),
+        Scenario('DELETE /api/projects/<id>', 'DELETE', lambda i, ctx: f'/api/projects/{ctx}', auth=True,
+                 prepare=new_row('other_information', project_name='Temporary')),
+        Scenario('POST /api/e-portfolio', 'POST', '/api/e-portfolio', ok=(201,), auth=True,
+                 json={'activity_name': 'Benchmark activity', 'activity_type': 'Project',
+                       'description': prose(rng, 180), 'takeaways': prose(rng, 120)}),
+        Scenario('PUT /api/e-portfolio/<id>', 'PUT', lambda i, ctx: f'/api/e-portfolio/{1 + i % rows}', auth=True,
+                 json={'takeaways': prose(rng, 120)}),
+        Scenario('DELETE /api/e-portfolio/<id>', 'DELETE', lambda i, ctx: f'/api/e-portfolio/{ctx}', auth=True,
+                 prepare=new_row('e_portfolio', activity_name='Temporary')),
+        Scenario('POST /api/e-portfolio/<id>/upload', 'POST', lambda i, ctx: f'/api/e-portfolio/{ctx}/upload', auth=True,
+                 prepare=new_row('e_portfolio', activity_name='Upload target'),
+                 data=upload('files', upload_kb * 1024, PDF_HEADER, 'evidence.pdf', 'application/pdf')),
+        Scenario('POST /api/batch (20 updates)', 'POST', '/api/batch', auth=True,
+                 json=lambda i, ctx: {'operations': [
+                     {'op': 'update', 'resource': 'skills', 'id': 1 + (i + n) % (rows // 3),
+                      'data': {'proficiency': 1 + n % 5}} for n in range(20)]}),
+        Scenario('GET /api/export', 'GET', '/api/export', auth=True),
+        Scenario('DELETE /api/e-portfolio/<id>/files/0', 'DELETE', lambda i, ctx: f'/api/e-portfolio/{ctx}/files/0', auth=True,
+                 prepare=new_row('e_portfolio', activity_name='Delete target',
+                                 artefacts_evidence_files=[tables['e_portfolio'][0]['artefacts_evidence_files']])),
+    ]
+
+
+# -- runner -------------------------------------------------------------------
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(app, caches, scenario, concurrency, total, token, cold, warmup=3):
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client
+
+    def one(i):
+        ctx = scenario.prepare(i) if scenario.prepare else None
+        path, kwargs = scenario.request(i, ctx)
+        if scenario.auth:
+            kwargs['headers'] = {**kwargs.get('headers', {}), 'Authorization': f'Bearer {token}'}
+        if cold:
+            for cache in caches:
+                cache.clear()
+        start = time.perf_counter()
+        response = client().open(path, method=scenario.method, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        response.close()
+        return elapsed, response.status_code in scenario.ok
+
+    for i in range(warmup):
+        one(total + i)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in outcomes)
+    return {
+        'route': scenario.name,
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'rps': round(total / wall, 1) if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def load_app(fake):
+    """Import main_server with fake installed as the shared Supabase transport"""
+    os.environ.update({
+        'SUPABASE_URL': 'http://supabase.fake',
+        'SUPABASE_SERVICE_KEY': 'benchmark.service.key',
+        'SUPABASE_ANON_KEY': 'benchmark.anon.key',
+        'SUPABASE_JWT_SECRET': fake.jwt_secret.decode(),
+        'BLOB_STORE': 'supabase',
+    })
+    os.environ.pop('BLOB_MIGRATION', None)
+    import shared.http_pool as http_pool
+    http_pool._transport = fake
+    import main_server
+    return main_server
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_results(results, baseline=None):
+    base = {(r['route'], r['concurrency']): r for r in (baseline or [])}
+    print(f'{"route":<38} {"conc":>4} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>9} {"err":>4} {"rss MB":>7}'
+          + ('  p50 / req/s vs baseline' if baseline else ''))
+    for r in results:
+        line = (f'{r["route"]:<38} {r["concurrency"]:>4} {r["p50_ms"]:>9.2f} {r["p95_ms"]:>9.2f} '
+                f'{r["p99_ms"]:>9.2f} {r["rps"]:>9.1f} {r["errors"]:>4} {r["peak_rss_mb"]:>7.1f}')
+        old = base.get((r['route'], r['concurrency']))
+        if old:
+            line += f'  {_change(old["p50_ms"], r["p50_ms"]):>7} / {_change(old["rps"], r["rps"]):>7}'
+        print(line)
+
+
+def _change(old, new):
+    return f'{(new - old) / old * 100:+.0f}%' if old else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the composite service routes')
+    parser.add_argument('--routes', help='comma-separated substrings; only matching routes run')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated worker counts (default 1,8,32)')
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per route and level')
+    parser.add_argument('--latency-ms', type=float, default=20, help='injected latency per Supabase call')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='extra random latency, 0..jitter')
+    parser.add_argument('--rows', type=int, default=300, help='e-portfolio rows in the data set')
+    parser.add_argument('--blob-mb', type=float, default=2, help='size of legacy inline hex evidence files')
+    parser.add_argument('--upload-kb', type=int, default=256, help='size of uploaded evidence files')
+    parser.add_argument('--cache', choices=['warm', 'cold'], default='warm',
+                        help='cold clears the response and logo caches before every request')
+    parser.add_argument('--compare', metavar='RESULTS_JSON', help='earlier results file to compare against')
+    parser.add_argument('--output', help='where to write results (default: results/<time>_<commit>.json)')
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    tables, objects = seed(args.rows, args.blob_mb, rng)
+    fake = FakeSupabase(tables, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000)
+    fake.buckets['blobs'] = objects
+    main_server = load_app(fake)
+    app = main_server.app
+    caches = [main_server.response_cache, main_server.logo_cache]
+    token = fake.access_token()
+
+    selected = scenarios(fake, args.rows, rng, args.upload_kb)
+    if args.routes:
+        wanted = [w.strip().lower() for w in args.routes.split(',') if w.strip()]
+        selected = [s for s in selected if any(w in s.name.lower() for w in wanted)]
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    results = []
+    for scenario in selected:
+        for concurrency in levels:
+            result = run_scenario(app, caches, scenario, concurrency, args.requests, token, args.cache == 'cold')
+            results.append(result)
+            print(f'  {scenario.name} x{concurrency}: p50 {result["p50_ms"]:.2f} ms, '
+                  f'{result["rps"]:.0f} req/s, {result["errors"]} errors', file=sys.stderr)
+    main_server.supabase_anon.auth._remove_session()  # stop the auto-refresh timer
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")}_{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'settings': vars(args),
+            'results': results,
+        }, f, indent=2)
+    print(f'\nResults written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""Asyncio (ASGI) edition of the composite API.
+
+    uvicorn async_server:app --app-dir backend/composite_services --port 8000
+
+The read-only JSON routes below are served natively: their PostgREST calls go
+through an async httpx client, so a request waiting on Supabase holds no
+thread, and /api/portfolio runs its section queries concurrently. Every other
+route (auth, writes, uploads, logos, evidence files) is handed to the Flask
+app in main_server through a2wsgi's thread pool. Both editions therefore
+answer the same routes with the same JSON, and share one response cache,
+proficiency registry, column catalog and blob store.
+
+Outbound back-pressure: at most ASYNC_UPSTREAM_MAX_CONNECTIONS requests to
+PostgREST are in flight; further calls wait up to ASYNC_UPSTREAM_POOL_TIMEOUT
+seconds for a connection and are then answered with 503. Cap inbound
+concurrency with the server, e.g. uvicorn --limit-concurrency.
+"""
+import asyncio
+import os
+from contextvars import ContextVar
+from functools import wraps
+from urllib.parse import parse_qsl
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from postgrest import AsyncPostgrestClient
+from werkzeug.datastructures import Headers, MIMEAccept, MultiDict
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.http import parse_accept_header, parse_etags, unquote_etag
+from werkzeug.routing import Map, RequestRedirect, Rule
+
+import main_server
+from main_server import (
+    PORTFOLIO_QUERY_TIMEOUT, PORTFOLIO_SECTIONS, _cache_tags, cache_control_for, column_catalog,
+    content_etag, evidence_items, next_page_headers, portfolio_document, prof_registry, response_cache,
+)
+from portfolio_document import PORTFOLIO_DOCUMENT
+from compression import cached_variant, compressible, negotiate
+from serialization import msgpack, response_format
+from shared.http_pool import MeteredAsyncTransport, settings_from_env
+from shared import timing
+from shared.metrics import IN_FLIGHT, record_request
+from shared.listing import ListQuery, ListQueryError
+from shared.table_columns import strip_blobs
+from sparse_fields import FieldSelection, FieldSelectionError, section_fields
+
+ASYNC_UPSTREAM_MAX_CONNECTIONS = int(os.getenv('ASYNC_UPSTREAM_MAX_CONNECTIONS', '50'))
+ASYNC_UPSTREAM_POOL_TIMEOUT = float(os.getenv('ASYNC_UPSTREAM_POOL_TIMEOUT', '5'))
+ASYNC_UPSTREAM_TIMEOUT = float(os.getenv('ASYNC_UPSTREAM_TIMEOUT', '10'))
+http_settings = settings_from_env()
+
+# Same as the CORS expose_headers of the Flask app
+EXPOSE_HEADERS = 'Accept-Ranges, Content-Range, Content-Length, Content-Encoding, ETag, Link, X-Next-Cursor, X-Portfolio-Version'
+
+# Routes not handled here fall through to the Flask app
+flask_fallback = WSGIMiddleware(main_server.app, workers=int(os.getenv('WSGI_FALLBACK_WORKERS', '16')))
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient whose httpx client has a bounded connection pool;
+    keep-alive, connect timeout and HTTP/2 follow the SUPABASE_HTTP_* settings"""
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=http_settings.timeout(ASYNC_UPSTREAM_TIMEOUT, pool=ASYNC_UPSTREAM_POOL_TIMEOUT),
+            transport=MeteredAsyncTransport(
+                limits=http_settings.limits(ASYNC_UPSTREAM_MAX_CONNECTIONS),
+                http2=http_settings.http2,
+            ),
+        )
+
+
+_db = None
+
+def db():
+    """The async PostgREST client, created on first use inside the event loop"""
+    global _db
+    if _db is None:
+        key = os.getenv('SUPABASE_SERVICE_KEY')
+        _db = PooledPostgrestClient(
+            f"{os.getenv('SUPABASE_URL')}/rest/v1",
+            headers={
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+                'apikey': key,
+                'Authorization': f'Bearer {key}',
+            },
+        )
+    return _db
+
+
+class AsyncRequest:
+    """The parts of an ASGI HTTP scope the handlers need"""
+
+    def __init__(self, scope):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'')
+        self.args = MultiDict(parse_qsl(self.query_string.decode('latin-1'), keep_blank_values=True))
+        self.headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+        self.format = response_format(parse_accept_header(self.headers.get('Accept'), MIMEAccept))
+        host = self.headers.get('Host') or '{}:{}'.format(*scope.get('server') or ('localhost', 80))
+        self.base_url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{self.path}"
+
+
+class Reply:
+    def __init__(self, body, status=200, mimetype='application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.headers = list(headers or [])
+
+
+# JSON or MessagePack, as negotiated for the request being handled
+reply_format = ContextVar('reply_format', default='json')
+
+def json_reply(obj, status=200, headers=None):
+    # Encode with the Flask app's JSON provider so both editions produce
+    # byte-identical bodies (and so identical ETags)
+    body, mimetype = main_server.app.json.encode(obj, reply_format.get())
+    headers = list(headers or [])
+    if msgpack is not None:
+        headers.append(('Vary', 'Accept'))
+    return Reply(body, status, mimetype, headers)
+
+
+def cached(*tables, row_arg=None):
+    """response_cache wrapper, sharing keys and entries with cached_response"""
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(req, **values):
+            key = (req.path, req.query_string, req.format)
+            tags = _cache_tags(tables, row_arg, values)
+            hit = response_cache.get(key)
+            if hit is not None:
+                body, mimetype, etag, headers = hit
+                return precompress(req, Reply(body, 200, mimetype, list(headers)), key, etag, tags)
+            since = response_cache.generations(tags)
+            reply = await handler(req, **values)
+            if reply.status != 200:
+                return reply
+            etag = content_etag(reply.body)
+            if not getattr(reply, 'partial', False):
+                response_cache.set(key, (reply.body, reply.mimetype, etag, list(reply.headers)),
+                                   size=len(reply.body), tags=tags, since=since)
+            return precompress(req, reply, key, etag, tags)
+        return wrapper
+    return decorator
+
+
+def precompress(req, reply, key, etag, tags):
+    """Set the reply's ETag and, when the client accepts it, swap in the
+    compressed variant kept next to the cache entry (as main_server.precompress)"""
+    if not compressible(reply.mimetype, len(reply.body)):
+        reply.headers.append(('ETag', f'"{etag}"'))
+        return reply
+    reply.headers.append(('Vary', 'Accept-Encoding'))
+    encoding = negotiate(parse_accept_header(req.headers.get('Accept-Encoding')))
+    if encoding is None:
+        reply.headers.append(('ETag', f'"{etag}"'))
+        return reply
+    reply.body = cached_variant(response_cache, key, etag, reply.body, encoding, tags)
+    reply.headers += [('Content-Encoding', encoding), ('ETag', f'W/"{etag}"')]
+    return reply
+
+
+
+async def ensure_catalog():
+    # The catalog loads through the sync client; keep that off the event loop
+    if column_catalog.needs_load():
+        await asyncio.to_thread(column_catalog.columns, '')
+
+
+async def ensure_prof_labels():
+    if not prof_registry.is_stale():
+        return
+    try:
+        response = await db().table('prof_lvl').select('*').execute()
+        prof_registry.refresh(response.data or [])
+    except Exception:
+        prof_registry.refresh_failed()
+
+
+async def fetch_page(req, table):
+    """(rows, next_cursor, fields) for a list route, as the Flask routes build them"""
+    listing = ListQuery(table, req.args)
+    fields = FieldSelection(table, req.args.get('fields'), column_catalog)
+    query = db().table(table).select(fields.select_list(listing.key_columns()))
+    response = await listing.apply(query).execute()
+    rows, next_cursor = listing.page(response.data)
+    return strip_blobs(table, rows), next_cursor, fields
+
+
+def list_handler(table):
+    @cached(table)
+    async def handler(req):
+        try:
+            rows, next_cursor, fields = await fetch_page(req, table)
+            return json_reply(fields.project(rows), headers=next_page_headers(req.base_url, req.args, next_cursor))
+        except (ListQueryError, FieldSelectionError) as e:
+            return json_reply({'error': str(e)}, 400)
+    return handler
+
+
+@cached('skills', 'prof_lvl')
+async def get_skills(req):
+    try:
+        (skills, next_cursor, fields), _ = await asyncio.gather(fetch_page(req, 'skills'), ensure_prof_labels())
+        try:
+            prof_registry.apply(skills)
+        except Exception:
+            pass
+        return json_reply(fields.project(skills), headers=next_page_headers(req.base_url, req.args, next_cursor))
+    except (ListQueryError, FieldSelectionError) as e:
+        return json_reply({'error': str(e)}, 400)
+
+
+@cached('e_portfolio', row_arg='item_id')
+async def get_e_portfolio_item(req, item_id):
+    try:
+        fields = FieldSelection('e_portfolio', req.args.get('fields'), column_catalog)
+        response = await db().table('e_portfolio').select(fields.select_list()).eq('id', item_id).execute()
+        if response.data:
+            return json_reply(fields.project(strip_blobs('e_portfolio', response.data))[0])
+        return json_reply({'error': 'E-portfolio activity not found'}, 404)
+    except FieldSelectionError as e:
+        return json_reply({'error': str(e)}, 400)
+
+
+@cached('e_portfolio', row_arg='item_id')
+async def list_eportfolio_files(req, item_id):
+    response = await db().table('e_portfolio').select(column_catalog.select_without_blobs('e_portfolio')).eq('id', item_id).execute()
+    if not response.data:
+        return json_reply({'error': 'E-portfolio activity not found'}, 404)
+    return json_reply({'items': evidence_items(strip_blobs('e_portfolio', response.data)[0])})
+
+
+@cached('prof_lvl')
+async def get_prof_levels(req):
+    try:
+        fields = FieldSelection('prof_lvl', req.args.get('fields'), column_catalog)
+        response = await db().table('prof_lvl').select('*').execute()
+        prof_registry.refresh(response.data or [])
+        return json_reply(fields.project(response.data or []))
+    except FieldSelectionError as e:
+        return json_reply({'error': str(e)}, 400)
+
+
+async def get_portfolio(req):
+    # Served from main_server's in-memory document unless fields are selected
+    # or it isn't built yet
+    if PORTFOLIO_DOCUMENT and not any(key.startswith('fields') for key in req.args):
+        # Encoding labels the skills; refresh the labels here, off the sync client
+        await ensure_prof_labels()
+        entry = portfolio_document.encoded(req.format)
+        if entry is not None:
+            body, mimetype, etag, version = entry
+            headers = [('X-Portfolio-Version', str(version))]
+            if msgpack is not None:
+                headers.append(('Vary', 'Accept'))
+            return precompress(req, Reply(body, 200, mimetype, headers), ('portfolio-document', req.format), etag,
+                               list(PORTFOLIO_SECTIONS.values()) + ['prof_lvl'])
+    return await query_portfolio(req)
+
+
+@cached('skills', 'prof_lvl', 'education', 'work_experience', 'community_service', 'other_information')
+async def query_portfolio(req):
+    try:
+        fields = section_fields(PORTFOLIO_SECTIONS, req.args, column_catalog)
+    except FieldSelectionError as e:
+        return json_reply({'error': str(e)}, 400)
+
+    async def section(name):
+        table = PORTFOLIO_SECTIONS[name]
+        query = db().table(table).select(fields[name].select_list())
+        if table in ('education', 'work_experience'):
+            query = query.order('start_date', desc=True)
+        return strip_blobs(table, (await query.execute()).data)
+
+    tasks = {name: asyncio.ensure_future(section(name)) for name in PORTFOLIO_SECTIONS}
+    labels = asyncio.ensure_future(ensure_prof_labels())
+    await asyncio.wait(list(tasks.values()) + [labels], timeout=PORTFOLIO_QUERY_TIMEOUT)
+    results, errors = {}, {}
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            errors[name] = f'Timed out after {PORTFOLIO_QUERY_TIMEOUT:g}s'
+        elif task.exception() is not None:
+            errors[name] = str(task.exception())
+        else:
+            results[name] = task.result()
+    if not labels.done():
+        labels.cancel()
+    if not results:
+        return json_reply({'error': 'All portfolio queries failed', 'errors': errors}, 500)
+
+    skills_data = results.get('skills') or []
+    try:
+        prof_registry.apply(skills_data)
+    except Exception:
+        pass
+    body = {name: fields[name].project(results.get(name) or []) for name in PORTFOLIO_SECTIONS}
+    body['errors'] = errors
+    reply = json_reply(body)
+    # Don't pin a partial page in the cache
+    reply.partial = bool(errors)
+    return reply
+
+
+# Endpoint names match the Flask view functions, so per-endpoint
+# Cache-Control policies (cache_control_for) apply to both editions
+url_map = Map([
+    Rule('/api/skills', endpoint='get_skills', methods=['GET']),
+    Rule('/api/education', endpoint='get_education', methods=['GET']),
+    Rule('/api/work', endpoint='get_work', methods=['GET']),
+    Rule('/api/community', endpoint='get_community', methods=['GET']),
+    Rule('/api/projects', endpoint='get_projects', methods=['GET']),
+    Rule('/api/e-portfolio', endpoint='get_e_portfolio', methods=['GET']),
+    Rule('/api/e-portfolio/<int:item_id>', endpoint='get_e_portfolio_item', methods=['GET']),
+    Rule('/api/e-portfolio/<int:item_id>/files', endpoint='list_eportfolio_files', methods=['GET']),
+    Rule('/api/prof-levels', endpoint='get_prof_levels', methods=['GET']),
+    Rule('/api/portfolio', endpoint='get_portfolio', methods=['GET']),
+])
+
+handlers = {
+    'get_skills': get_skills,
+    'get_education': list_handler('education'),
+    'get_work': list_handler('work_experience'),
+    'get_community': list_handler('community_service'),
+    'get_projects': list_handler('other_information'),
+    'get_e_portfolio': list_handler('e_portfolio'),
+    'get_e_portfolio_item': get_e_portfolio_item,
+    'list_eportfolio_files': list_eportfolio_files,
+    'get_prof_levels': get_prof_levels,
+    'get_portfolio': get_portfolio,
+}
+
+
+def finalize(req, endpoint, reply):
+    """Conditional GET and CORS headers, matching main_server's after_request
+    hook and flask-cors; returns (status, headers, body)"""
+    headers = Headers(reply.headers)
+    status, body = reply.status, reply.body
+    if status == 200:
+        if 'Cache-Control' not in headers:
+            headers['Cache-Control'] = cache_control_for(endpoint)
+        if 'ETag' not in headers:
+            headers['ETag'] = f'"{content_etag(body)}"'
+        if parse_etags(req.headers.get('If-None-Match')).contains_weak(unquote_etag(headers['ETag'])[0]):
+            status, body = 304, b''
+    headers['Access-Control-Allow-Origin'] = '*'
+    headers['Access-Control-Expose-Headers'] = EXPOSE_HEADERS
+    if status != 304:
+        headers['Content-Type'] = reply.mimetype
+        headers['Content-Length'] = str(len(body))
+    return status, headers, body
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        await flask_fallback(scope, receive, send)
+        return
+    try:
+        endpoint, values = url_map.bind('localhost').match(scope['path'], method=scope['method'])
+    except (NotFound, MethodNotAllowed, RequestRedirect):
+        await flask_fallback(scope, receive, send)
+        return
+
+    req = AsyncRequest(scope)
+    reply_format.set(req.format)
+    # Phases recorded by the handler, its tasks and the upstream transport
+    timings, timings_token = timing.begin()
+    IN_FLIGHT.labels(endpoint).inc()
+    try:
+        await ensure_catalog()
+        reply = await handlers[endpoint](req, **values)
+    except httpx.PoolTimeout:
+        reply = json_reply({'error': 'Upstream busy, try again shortly'}, 503, [('Retry-After', '1')])
+    except Exception as e:
+        reply = json_reply({'error': str(e)}, 500)
+    finally:
+        IN_FLIGHT.labels(endpoint).dec()
+    status, headers, body = finalize(req, endpoint, reply)
+    total = timings.elapsed()
+    timing.end(timings_token)
+    # Same series and headers as the Flask routes; endpoints share names
+    record_request(endpoint, req.method, status, total, len(body))
+    if timing.SERVER_TIMING:
+        headers['Server-Timing'] = timings.server_timing(total)
+        if timing.TIMING_ALLOW_ORIGIN:
+            headers['Timing-Allow-Origin'] = timing.TIMING_ALLOW_ORIGIN
+    if timing.should_log(total):
+        path = req.path + ('?' + req.query_string.decode('latin-1') if req.query_string else '')
+        timing.log_request(timings.log_record(req.method, path, endpoint, status, len(body), total))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': b'' if req.method == 'HEAD' else body})
+
+
+async def _lifespan(receive, send):
+    global _db
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _db is not None:
+                await _db.aclose()
+                _db = None
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -0,0 +1,216 @@
+import json
+import os
+
+from shared.table_columns import strip_blobs
+
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '200'))
+
+
+class Resource:
+    """Writable fields and rules of one CRUD resource, as its routes apply them"""
+
+    def __init__(self, table, fields, required=(), dates=()):
+        self.table = table
+        self.fields = fields
+        self.required = required
+        self.dates = dates
+
+    def values(self, data, creating):
+        values = {}
+        for key in self.fields:
+            if key in data:
+                value = data[key]
+                # Empty date inputs mean "no date"
+                if key in self.dates and value == '':
+                    value = None
+                values[key] = value
+        if creating:
+            # Creates leave unset columns to their defaults
+            values = {k: v for k, v in values.items() if v is not None}
+        return values
+
+
+# Keyed by the resource's path under /api
+RESOURCES = {
+    'skills': Resource('skills', ['skill_name', 'proficiency', 'category'], required=['skill_name']),
+    'education': Resource('education', ['institute_name', 'certification', 'start_date', 'finish_date'],
+                          dates=['start_date', 'finish_date']),
+    'work': Resource('work_experience', ['company', 'position', 'start_date', 'end_date', 'description'],
+                     dates=['start_date', 'end_date']),
+    'community': Resource('community_service', ['organization', 'role', 'start_date', 'end_date', 'description'],
+                          dates=['start_date', 'end_date']),
+    'projects': Resource('other_information', ['project_name', 'description', 'technologies', 'url']),
+    'e-portfolio': Resource('e_portfolio', [
+        'activity_name', 'activity_type', 'start_date', 'finish_date', 'organisation_module', 'description',
+        'what_i_did', 'skills_tools_acquired', 'takeaways', 'artefacts_evidence_files',
+        'artefacts_evidence_links_texts', 'relevance_career',
+    ], required=['activity_name'], dates=['start_date', 'finish_date']),
+}
+
+
+class BatchError(ValueError):
+    """A batch that can't be applied; index is the offending operation, if any"""
+
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+
+class AtomicBatchUnavailable(Exception):
+    pass
+
+
+class Operation:
+    def __init__(self, index, op, resource, row_id=None, values=None):
+        self.index = index
+        self.op = op
+        self.resource = resource
+        self.table = RESOURCES[resource].table
+        self.id = row_id
+        self.values = values or {}
+
+    def rpc_payload(self):
+        payload = {'op': self.op, 'table': self.table}
+        if self.id is not None:
+            payload['id'] = self.id
+        if self.op != 'delete':
+            payload['data'] = self.values
+        return payload
+
+    def result(self, status, data=None, error=None):
+        result = {'index': self.index, 'op': self.op, 'resource': self.resource, 'status': status}
+        if self.id is not None:
+            result['id'] = self.id
+        if data is not None:
+            result['data'] = strip_blobs(self.table, [data])[0] if self.op != 'delete' else data
+        if error is not None:
+            result['error'] = error
+        return result
+
+
+def parse_operations(operations, atomic=False):
+    """Validate a request's operations.
+
+    Returns (operations to apply, results of invalid ones). Invalid
+    operations are reported with a 400 result, or reject the whole batch
+    with BatchError when atomic.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations must be a non-empty list')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise BatchError(f'At most {BATCH_MAX_OPERATIONS} operations per batch')
+    valid, invalid = [], []
+    for index, raw in enumerate(operations):
+        try:
+            valid.append(_parse_operation(index, raw))
+        except BatchError as e:
+            if atomic:
+                raise
+            invalid.append({'index': index, 'status': 400, 'error': str(e)})
+    return valid, invalid
+
+
+def _parse_operation(index, raw):
+    if not isinstance(raw, dict):
+        raise BatchError('operation must be an object', index)
+    op, resource_name = raw.get('op'), raw.get('resource')
+    if op not in ('create', 'update', 'delete'):
+        raise BatchError('op must be create, update or delete', index)
+    resource = RESOURCES.get(resource_name)
+    if resource is None:
+        raise BatchError(f'resource must be one of {", ".join(RESOURCES)}', index)
+    row_id = None
+    if op != 'create':
+        row_id = raw.get('id')
+        if not isinstance(row_id, int) or isinstance(row_id, bool) or row_id <= 0:
+            raise BatchError('id must be a positive integer', index)
+    if op == 'delete':
+        return Operation(index, op, resource_name, row_id)
+    data = raw.get('data')
+    if not isinstance(data, dict):
+        raise BatchError('data must be an object', index)
+    values = resource.values(data, creating=op == 'create')
+    if op == 'create':
+        missing = [f for f in resource.required if not values.get(f)]
+        if missing:
+            raise BatchError(f'{missing[0]} is required', index)
+    elif not values:
+        raise BatchError('No fields to update', index)
+    return Operation(index, op, resource_name, row_id, values)
+
+
+def apply_batch(client, operations, atomic=False):
+    """Apply operations in order; returns one result per operation.
+
+    Uses the apply_batch database function (migrations/004) when installed:
+    one round trip and one transaction. Without it, operations are grouped
+    into bulk PostgREST calls, which can't be all-or-nothing.
+    """
+    try:
+        results = client.rpc('apply_batch', {
+            'p_operations': [op.rpc_payload() for op in operations],
+            'p_atomic': atomic,
+        }).execute().data
+    except Exception as e:
+        # PGRST202: function not installed yet
+        if getattr(e, 'code', None) != 'PGRST202':
+            raise
+    else:
+        return [op.result(r.get('status'), r.get('data'), r.get('error')) for op, r in zip(operations, results)]
+    if atomic:
+        raise AtomicBatchUnavailable('Atomic batches need the apply_batch function (migrations/004_apply_batch.sql)')
+    return _apply_grouped(client, operations)
+
+
+def _apply_grouped(client, operations):
+    """Bulk insert / update / delete per table, keeping the order of operations
+    that touch the same row"""
+    results = {}
+    pending, touched = [], set()
+    for op in operations:
+        if op.id is not None and (op.table, op.id) in touched:
+            _flush(client, pending, results)
+            pending, touched = [], set()
+        pending.append(op)
+        if op.id is not None:
+            touched.add((op.table, op.id))
+    _flush(client, pending, results)
+    return [results[op.index] for op in operations]
+
+
+def _flush(client, operations, results):
+    groups = {}
+    for op in operations:
+        if op.op == 'create':
+            # PostgREST bulk inserts need the same columns in every row
+            key = ('create', op.table, tuple(sorted(op.values)))
+        elif op.op == 'update':
+            # Rows receiving identical changes share one PATCH ... id=in.(...)
+            key = ('update', op.table, json.dumps(op.values, sort_keys=True, default=str))
+        else:
+            key = ('delete', op.table)
+        groups.setdefault(key, []).append(op)
+
+    for key, group in groups.items():
+        table = group[0].table
+        try:
+            if key[0] == 'create':
+                rows = client.table(table).insert([op.values for op in group]).execute().data or []
+                for op, row in zip(group, rows):
+                    results[op.index] = op.result(201, row)
+                continue
+            ids = [op.id for op in group]
+            if key[0] == 'update':
+                rows = client.table(table).update(group[0].values).in_('id', ids).execute().data or []
+            else:
+                rows = client.table(table).delete().in_('id', ids).execute().data or []
+            by_id = {row['id']: row for row in rows}
+            for op in group:
+                row = by_id.get(op.id)
+                if row is None:
+                    results[op.index] = op.result(404, error='not found')
+                else:
+                    results[op.index] = op.result(200, row if key[0] == 'update' else {'id': op.id})
+        except Exception as e:
+            for op in group:
+                results.setdefault(op.index, op.result(500, error=str(e)))
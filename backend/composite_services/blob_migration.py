@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from blob_store import make_ref, parse_ref
+from media import decode_hex_blob, sniff_image_mimetype
+
+# (table, column) pairs that may still hold inline hex blobs
+MIGRATION_TARGETS = [
+    ('education', 'organization_logo'),
+    ('work_experience', 'organization_logo'),
+    ('e_portfolio', 'artefacts_evidence_files'),
+]
+
+
+class SwapUnavailable(RuntimeError):
+    """The swap_blob_value database function isn't installed"""
+
+
+class BlobMigration:
+    """Move inline hex blobs out of table columns and into the blob store.
+
+    Rows are visited in id order, one at a time, and the last id finished in
+    each table is written to a checkpoint file, so an interrupted run carries
+    on where it stopped. Values that are already references are skipped, so
+    re-running from scratch is also safe.
+
+    The new value is written with swap_blob_value (migrations/006), only if
+    the column still holds what was read; rows written in between are
+    skipped. on_migrated(table, row_id) is called after each swap, so the
+    caller can drop what it derived from the old value.
+    """
+
+    def __init__(self, client, store, checkpoint_path=None, batch_size=50, on_migrated=None):
+        self.client = client
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.on_migrated = on_migrated
+        self.stats = {'rows_scanned': 0, 'rows_migrated': 0, 'rows_changed': 0, 'blobs_moved': 0, 'errors': 0}
+        self._checkpoint = self._load_checkpoint()
+
+    def run(self, stop_event=None):
+        for table, column in MIGRATION_TARGETS:
+            last_id = self._checkpoint.get(table, 0)
+            while not (stop_event and stop_event.is_set()):
+                ids = (
+                    self.client.table(table).select('id')
+                    .gt('id', last_id).order('id').limit(self.batch_size)
+                    .execute().data
+                ) or []
+                if not ids:
+                    break
+                for row in ids:
+                    if stop_event and stop_event.is_set():
+                        return self.stats
+                    try:
+                        self.migrate_row(table, column, row['id'])
+                    except SwapUnavailable as e:
+                        print(f'Blob migration stopped: {e}', file=sys.stderr, flush=True)
+                        return self.stats
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        print(f"Blob migration failed for {table} {row['id']}: {e}", file=sys.stderr, flush=True)
+                    last_id = row['id']
+                    self._save_checkpoint(table, last_id)
+        return self.stats
+
+    def migrate_row(self, table, column, row_id):
+        self.stats['rows_scanned'] += 1
+        rows = self.client.table(table).select(column).eq('id', row_id).execute().data
+        if not rows or not rows[0].get(column):
+            return
+        value = rows[0][column]
+        if isinstance(value, list):
+            new_value = [self._migrate_value(v, 'application/octet-stream') for v in value]
+        else:
+            new_value = self._migrate_value(value, None)
+        if new_value == value:
+            return
+        if not self._swap(table, column, row_id, value, new_value):
+            # Written since it was read, by a route that stores references
+            # itself; blobs already put are harmless (content-addressed)
+            self.stats['rows_changed'] += 1
+            return
+        self.stats['rows_migrated'] += 1
+        if self.on_migrated is not None:
+            self.on_migrated(table, row_id)
+
+    def _swap(self, table, column, row_id, expected, value):
+        """Write value if the column still holds expected; True if it did"""
+        try:
+            swapped = self.client.rpc('swap_blob_value', {
+                'p_table': table, 'p_id': row_id, 'p_column': column,
+                'p_expected': expected, 'p_value': value,
+            }).execute().data
+        except Exception as e:
+            if getattr(e, 'code', None) == 'PGRST202':
+                raise SwapUnavailable('install migrations/006_swap_blob_value.sql') from e
+            raise
+        return bool(swapped)
+
+    def _migrate_value(self, value, content_type):
+        if not value or parse_ref(value) is not None:
+            return value
+        data = decode_hex_blob(value)
+        key = self.store.put(data, content_type or sniff_image_mimetype(data))
+        self.stats['blobs_moved'] += 1
+        return make_ref(key)
+
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, table, last_id):
+        self._checkpoint[table] = last_id
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+def start_background_migration(client, store, checkpoint_path=None, on_migrated=None):
+    """Run a BlobMigration on a daemon thread; returns (migration, stop_event)"""
+    migration = BlobMigration(client, store, checkpoint_path, on_migrated=on_migrated)
+    stop_event = threading.Event()
+    thread = threading.Thread(target=migration.run, args=(stop_event,), name='blob-migration', daemon=True)
+    thread.start()
+    return migration, stop_event
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from supabase import create_client
+    from blob_store import blob_store_from_env
+
+    load_dotenv()
+    client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+    checkpoint = os.getenv('BLOB_MIGRATION_CHECKPOINT', 'blob_migration.json')
+    print(BlobMigration(client, blob_store_from_env(client), checkpoint).run())
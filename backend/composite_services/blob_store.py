@@ -0,0 +1,331 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from media import decode_hex_blob
+
+# Blob columns hold either legacy '\x' + hex data or a reference to a blob in
+# the store, written as REF_PREFIX + the SHA-256 of its content
+REF_PREFIX = 'sha256:'
+# A reference written into a bytea column comes back hex encoded
+_BYTEA_REF_PREFIX = '\\x' + REF_PREFIX.encode().hex()
+
+
+# Largest read from a local blob file per chunk of a streamed response
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobStore:
+    """Content-addressed blob storage: objects are keyed by their SHA-256,
+    so uploading the same bytes twice stores them once."""
+
+    def put(self, data, content_type=None):
+        """Store data and return its key"""
+        key = hashlib.sha256(data).hexdigest()
+        if not self.exists(key):
+            self._write(key, data, content_type or 'application/octet-stream')
+        return key
+
+    def put_stream(self, fileobj, key, content_type=None):
+        """Store a file object whose SHA-256 (key) is already known, without
+        reading it into memory where the backend allows"""
+        if not self.exists(key):
+            fileobj.seek(0)
+            self._write_stream(key, fileobj, content_type or 'application/octet-stream')
+        return key
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def size(self, key):
+        return len(self.get(key))
+
+    def iter_range(self, key, start, stop):
+        """Yield the bytes in [start, stop) of a blob"""
+        yield self.get(key)[start:stop]
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def _write(self, key, data, content_type):
+        raise NotImplementedError
+
+    def _write_stream(self, key, fileobj, content_type):
+        self._write(key, fileobj.read(), content_type)
+
+
+class MemoryBlobStore(BlobStore):
+    """In-process store, for tests and local experiments"""
+
+    def __init__(self):
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._blobs:
+                raise BlobNotFound(key)
+            return self._blobs[key]
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._blobs
+
+    def delete(self, key):
+        with self._lock:
+            self._blobs.pop(key, None)
+
+    def _write(self, key, data, content_type):
+        with self._lock:
+            self._blobs[key] = bytes(data)
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under a root directory, fanned out by key prefix"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key):
+        try:
+            with open(self.path_for(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self.path_for(key))
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def iter_range(self, key, start, stop):
+        try:
+            f = open(self.path_for(key), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+        with f:
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def _write(self, key, data, content_type):
+        self._write_stream(key, io.BytesIO(data), content_type)
+
+    def _write_stream(self, key, fileobj, content_type):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(fileobj, f, 64 * 1024)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+class SupabaseBlobStore(BlobStore):
+    """Blobs as objects in a private Supabase Storage bucket"""
+
+    def __init__(self, client, bucket='blobs'):
+        self.client = client
+        self.bucket = bucket
+        self._bucket_ready = False
+        # Objects never change under a content key, so their sizes can be kept
+        self._sizes = {}
+
+    def path_for(self, key):
+        return f'sha256/{key[:2]}/{key}'
+
+    def put(self, data, content_type=None):
+        # Upload straight away; a duplicate is reported by Storage and ignored
+        key = hashlib.sha256(data).hexdigest()
+        self._write(key, data, content_type or 'application/octet-stream')
+        return key
+
+    def put_stream(self, fileobj, key, content_type=None):
+        self._write_stream(key, fileobj, content_type or 'application/octet-stream')
+        return key
+
+    def get(self, key):
+        try:
+            return self.client.storage.from_(self.bucket).download(self.path_for(key))
+        except Exception as e:
+            if '404' in str(e) or 'not found' in str(e).lower():
+                raise BlobNotFound(key)
+            raise
+
+    def size(self, key):
+        if key not in self._sizes:
+            entry = self._entry(key)
+            if entry is None:
+                raise BlobNotFound(key)
+            if len(self._sizes) >= 4096:
+                self._sizes.clear()
+            self._sizes[key] = int((entry.get('metadata') or {}).get('size') or 0)
+        return self._sizes[key]
+
+    def iter_range(self, key, start, stop):
+        # storage3 has no ranged download, so send the Range header through
+        # the bucket's own request helper; Storage answers with 206
+        bucket = self.client.storage.from_(self.bucket)
+        try:
+            response = bucket._request(
+                'GET',
+                f'object/{bucket._get_final_path(self.path_for(key))}',
+                headers={'Range': f'bytes={start}-{stop - 1}'},
+            )
+        except Exception as e:
+            if '404' in str(e) or 'not found' in str(e).lower():
+                raise BlobNotFound(key)
+            raise
+        if response.status_code == 206:
+            yield response.content
+        else:
+            yield response.content[start:stop]
+
+    def exists(self, key):
+        try:
+            return self._entry(key) is not None
+        except Exception:
+            return False
+
+    def _entry(self, key):
+        folder, name = self.path_for(key).rsplit('/', 1)
+        entries = self.client.storage.from_(self.bucket).list(folder, {'search': name})
+        return next((entry for entry in entries or [] if entry.get('name') == name), None)
+
+    def delete(self, key):
+        self.client.storage.from_(self.bucket).remove([self.path_for(key)])
+        self._sizes.pop(key, None)
+
+    def _write(self, key, data, content_type):
+        self._upload(key, data, content_type)
+
+    def _write_stream(self, key, fileobj, content_type):
+        # Give Storage a plain reader on the spooled file's descriptor so the
+        # body is streamed from disk rather than loaded into memory
+        reader = io.open(os.dup(fileobj.fileno()), 'rb')
+        try:
+            reader.seek(0)
+            self._upload(key, reader, content_type)
+        finally:
+            reader.close()
+
+    def _upload(self, key, body, content_type):
+        self._ensure_bucket()
+        try:
+            self.client.storage.from_(self.bucket).upload(
+                self.path_for(key), body, {'content-type': content_type}
+            )
+        except Exception as e:
+            # Someone else stored the same content first
+            if '409' not in str(e) and 'duplicate' not in str(e).lower() and 'exists' not in str(e).lower():
+                raise
+
+    def _ensure_bucket(self):
+        if self._bucket_ready:
+            return
+        try:
+            self.client.storage.create_bucket(self.bucket)
+        except Exception as e:
+            # ignore if already exists
+            if '409' not in str(e) and 'exists' not in str(e).lower():
+                raise
+        self._bucket_ready = True
+
+
+def blob_store_from_env(client):
+    """Build the store selected by BLOB_STORE (supabase, local or memory)"""
+    backend = os.getenv('BLOB_STORE', 'supabase').lower()
+    if backend == 'memory':
+        return MemoryBlobStore()
+    if backend == 'local':
+        return LocalBlobStore(os.getenv('BLOB_STORE_PATH', os.path.join(os.path.dirname(__file__), 'blob_data')))
+    if backend == 'supabase':
+        return SupabaseBlobStore(client, os.getenv('BLOB_BUCKET', 'blobs'))
+    raise ValueError(f'Unknown BLOB_STORE: {backend}')
+
+
+def make_ref(key):
+    return REF_PREFIX + key
+
+
+def parse_ref(value):
+    """The blob key a column value refers to, or None for legacy hex data"""
+    if not isinstance(value, str):
+        return None
+    if value.startswith(REF_PREFIX):
+        return value[len(REF_PREFIX):]
+    if value.startswith(_BYTEA_REF_PREFIX):
+        return bytes.fromhex(value[2:]).decode('ascii')[len(REF_PREFIX):]
+    return None
+
+
+class BlobView:
+    """Sized, range-readable view of a blob column value.
+
+    Stored blobs are read from the store one range at a time; legacy inline
+    hex values are decoded once and sliced.
+    """
+
+    def __init__(self, store, value):
+        self.store = store
+        self.key = parse_ref(value)
+        self._data = decode_hex_blob(value) if self.key is None else None
+        # Taken from the store, not evidence metadata: the lookup is also the
+        # check that the blob exists, which must happen before headers go out
+        self._size = None
+
+    @property
+    def size(self):
+        if self._size is None:
+            self._size = len(self._data) if self._data is not None else self.store.size(self.key)
+        return self._size
+
+    def iter_range(self, start, stop):
+        if self._data is not None:
+            yield self._data[start:stop]
+        else:
+            yield from self.store.iter_range(self.key, start, stop)
+
+    def head(self, length=1024):
+        return b''.join(self.iter_range(0, min(length, self.size)))
+
+
+def read_blob(store, value):
+    """Bytes behind a blob column value, whether a reference or legacy hex"""
+    key = parse_ref(value)
+    if key is not None:
+        return store.get(key)
+    return decode_hex_blob(value)
@@ -0,0 +1,137 @@
+import uuid
+from urllib.parse import quote
+
+from flask import current_app, request
+
+# More ranges than this (after merging overlaps) are answered with the whole
+# file, so a request can't make us assemble thousands of tiny parts
+MAX_RANGES = 16
+
+
+def requested_ranges(size, etag):
+    """Byte ranges the request asks for, as sorted [(start, stop)] pairs.
+
+    Returns None when the whole body should be sent (no Range header, an
+    unparsable one, or an If-Range that doesn't match the current ETag) and
+    [] when none of the ranges can be satisfied.
+    """
+    header = request.headers.get('Range')
+    if not header or not size:
+        return None
+    if_range = request.headers.get('If-Range')
+    # Only a strong ETag can validate a range; a date or stale tag means the
+    # client's partial copy may be out of date, so it gets everything
+    if if_range is not None and if_range.strip() != f'"{etag}"':
+        return None
+    spans = _parse_byte_ranges(header, size)
+    if spans is None:
+        return None
+
+    merged = []
+    for start, stop in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    if len(merged) > MAX_RANGES:
+        return None
+    return merged
+
+
+def content_disposition(filename, disposition='attachment'):
+    """Content-Disposition value, with an RFC 5987 filename* for non-ASCII names"""
+    ascii_name = filename.encode('ascii', 'ignore').decode('ascii') or 'download'
+    value = '{}; filename="{}"'.format(disposition, ascii_name.replace('\\', '\\\\').replace('"', '\\"'))
+    if ascii_name != filename:
+        value += f"; filename*=UTF-8''{quote(filename)}"
+    return value
+
+
+def send_blob(blob, etag, mimetype, download_name=None, inline=False):
+    """Stream a BlobView with ETag, If-None-Match, Range and If-Range support.
+
+    Single ranges are sent as 206 with Content-Range; several ranges as a
+    multipart/byteranges body. Only the requested bytes are read from the
+    blob store.
+    """
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = 'no-cache'
+    if download_name:
+        response.headers['Content-Disposition'] = content_disposition(
+            download_name, 'inline' if inline else 'attachment'
+        )
+    response.set_etag(etag)
+    # Streamed body: keep after_request hooks from buffering it
+    response.direct_passthrough = True
+
+    if request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        return response
+
+    size = blob.size
+    ranges = requested_ranges(size, etag)
+    if ranges == []:
+        response.status_code = 416
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if ranges is None:
+        response.response = blob.iter_range(0, size)
+        response.content_length = size
+    elif len(ranges) == 1:
+        start, stop = ranges[0]
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        response.response = blob.iter_range(start, stop)
+        response.content_length = stop - start
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [
+            (
+                f'\r\n--{boundary}\r\nContent-Type: {mimetype}\r\n'
+                f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n'
+            ).encode('latin-1')
+            for start, stop in ranges
+        ]
+        closing = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+        response.status_code = 206
+        response.content_type = f'multipart/byteranges; boundary={boundary}'
+        response.response = _multipart_body(blob, ranges, parts, closing)
+        response.content_length = (
+            sum(len(part) + stop - start for part, (start, stop) in zip(parts, ranges)) + len(closing)
+        )
+    return response
+
+
+def _multipart_body(blob, ranges, parts, closing):
+    for part, (start, stop) in zip(parts, ranges):
+        yield part
+        yield from blob.iter_range(start, stop)
+    yield closing
+
+
+def _parse_byte_ranges(header, size):
+    # werkzeug's parse_range_header rejects overlapping or out-of-order
+    # ranges, which RFC 7233 allows (they are merged above), so parse here
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes' or not spec:
+        return None
+    spans = []
+    for item in spec.split(','):
+        first, dash, last = item.strip().partition('-')
+        if not dash:
+            return None
+        try:
+            if not first:
+                start, stop = max(size - int(last), 0), size
+            else:
+                start = int(first)
+                stop = size if not last else min(int(last) + 1, size)
+                if last and int(last) < start:
+                    return None
+        except ValueError:
+            return None
+        if start < stop:
+            spans.append((start, stop))
+    return spans
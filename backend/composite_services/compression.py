@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from shared.timing import phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this go out as they are: the framing overhead eats the gain
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '5'))
+
+# Formats that are already compressed and gain nothing from another pass
+SKIP_MIMETYPES = {
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif',
+    'application/pdf', 'application/zip', 'application/gzip', 'application/x-7z-compressed',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def supported_encodings():
+    """Content codings this server can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encodings):
+    """Best supported coding for a parsed Accept-Encoding header, or None"""
+    return accept_encodings.best_match(supported_encodings())
+
+
+def compressible(mimetype, size):
+    if size < COMPRESS_MIN_SIZE or not mimetype:
+        return False
+    return mimetype not in SKIP_MIMETYPES and not mimetype.startswith(('video/', 'audio/'))
+
+
+def compress(body, encoding):
+    with phase('compress'):
+        if encoding == 'br':
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def cached_variant(cache, key, etag, body, encoding, tags=()):
+    """Compressed copy of a cached body, stored next to it in the same cache.
+
+    The variant is keyed by the body's ETag as well, so a replaced entry never
+    pairs with a stale variant, and carries the entry's tags so writes drop
+    both together.
+    """
+    variant_key = ('encoded', key, etag, encoding)
+    data = cache.get(variant_key)
+    if data is None:
+        data = compress(body, encoding)
+        cache.set(variant_key, data, size=len(data), tags=tags)
+    return data
@@ -0,0 +1,280 @@
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from postgrest.types import ReturnMethod
+
+from blob_store import make_ref, parse_ref
+from media import decode_hex_blob
+from shared.table_columns import BLOB_SUMMARIES
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+EXPORT_FORMAT = 'portfolio-ndjson'
+EXPORT_VERSION = 1
+# Tables in dependency order: proficiency labels before the skills using them
+EXPORT_TABLES = (
+    'prof_lvl', 'skills', 'education', 'work_experience', 'community_service', 'other_information', 'e_portfolio',
+)
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '100'))
+# An import batch is written once it holds this many rows or line bytes
+IMPORT_BATCH_ROWS = int(os.getenv('IMPORT_BATCH_ROWS', '500'))
+IMPORT_BATCH_BYTES = int(os.getenv('IMPORT_BATCH_BYTES', str(4 * 1024 * 1024)))
+# Missing blob keys listed in an import summary; the count covers the rest
+MISSING_BLOBS_LISTED = 100
+
+BLOB_COLUMNS = {table: tuple(blobs) for table, blobs in BLOB_SUMMARIES.items()}
+# Generated by the database (migrations/001); never exported or written
+GENERATED_COLUMNS = frozenset(summary for blobs in BLOB_SUMMARIES.values() for summary in blobs.values())
+
+
+class ImportRejected(ValueError):
+    pass
+
+
+class UnsupportedStream(ImportRejected):
+    """The header names another format or a newer version"""
+
+
+def ndjson_line(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=str) + b'\n'
+    return json.dumps(obj, default=str, separators=(',', ':')).encode() + b'\n'
+
+
+def export_lines(client, store, catalog, include_blobs=False, page_size=EXPORT_PAGE_SIZE):
+    """Yield the whole portfolio as NDJSON lines, one page of one table at a time.
+
+    The stream is a header line, one ``row`` line per row and a closing
+    ``end`` line with the row counts and every blob key referenced; an export
+    without its end line is incomplete. Blob columns only ever hold
+    ``sha256:`` references: legacy inline hex values are exported as the
+    reference of their content, which blob_migration.py gives the same key.
+    Nothing is written, to the store or the tables. With include_blobs each
+    blob is also sent once, base64 encoded in a ``blob`` line, just before the
+    first row referencing it.
+    """
+    yield ndjson_line({
+        'type': 'header',
+        'format': EXPORT_FORMAT,
+        'version': EXPORT_VERSION,
+        'exported_at': datetime.now(timezone.utc).isoformat(),
+        'tables': list(EXPORT_TABLES),
+        'blobs': 'include' if include_blobs else 'ref',
+    })
+    counts, keys = {}, {}
+    for table in EXPORT_TABLES:
+        counts[table] = 0
+        try:
+            for row in _pages(client, table, _select_list(catalog, table), page_size):
+                for column in BLOB_COLUMNS.get(table, ()):
+                    if not row.get(column):
+                        continue
+                    row[column], blobs = _blob_refs(row[column])
+                    for key, data in blobs:
+                        if key in keys:
+                            continue
+                        keys[key] = None
+                        if include_blobs:
+                            data = store.get(key) if data is None else data
+                            yield ndjson_line({'type': 'blob', 'key': key, 'data': base64.b64encode(data).decode()})
+                yield ndjson_line({'type': 'row', 'table': table, 'data': row})
+                counts[table] += 1
+        except Exception as e:
+            # Headers are long gone; report in the stream and leave out the end line
+            yield ndjson_line({'type': 'error', 'table': table, 'error': str(e)})
+            return
+    yield ndjson_line({'type': 'end', 'rows': counts, 'blobs': list(keys)})
+
+
+def _select_list(catalog, table):
+    columns = catalog.columns(table)
+    if not columns:
+        return '*'
+    return ','.join(c for c in columns if c not in GENERATED_COLUMNS)
+
+
+def _pages(client, table, select, page_size):
+    """Rows of a table in id order, fetched page_size at a time (keyset paging)"""
+    last_id = None
+    while True:
+        query = client.table(table).select(select).order('id').limit(page_size)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        rows = query.execute().data or []
+        for row in rows:
+            for column in GENERATED_COLUMNS.intersection(row):
+                del row[column]
+            yield row
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]['id']
+
+
+def _blob_refs(value):
+    """(value with references only, [(key, bytes or None)]) for a blob column value;
+    bytes are given for legacy hex values, which aren't in the store yet"""
+    blobs = []
+
+    def to_ref(item):
+        key = parse_ref(item)
+        data = None
+        if key is None:
+            data = decode_hex_blob(item)
+            key = hashlib.sha256(data).hexdigest()
+        blobs.append((key, data))
+        return make_ref(key)
+
+    if isinstance(value, list):
+        # Empty slots stay, so artefacts_evidence_meta and file indexes still line up
+        return [to_ref(item) if item else item for item in value], blobs
+    return to_ref(value), blobs
+
+
+class BulkImport:
+    """Upsert the rows of an export stream in bounded batches.
+
+    Lines are read one at a time. Consecutive rows of one table with the same
+    columns are written together, at most batch_rows rows or batch_bytes line
+    bytes per upsert, so the request body is never held in memory. Rows are
+    matched on their primary key: existing ones are updated, others inserted.
+    run() yields a progress event per batch written and one per rejected
+    line or failed batch, then a final ``done`` summary.
+    """
+
+    def __init__(self, client, store, batch_rows=IMPORT_BATCH_ROWS, batch_bytes=IMPORT_BATCH_BYTES):
+        self.client = client
+        self.store = store
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.rows = {}
+        self.blobs = 0
+        self.errors = 0
+        self._referenced = set()
+        self._batch = []  # (line number, row)
+        self._batch_table = None
+        self._batch_bytes = 0
+
+    def run(self, lines):
+        for number, raw in enumerate(lines, 1):
+            raw = raw.strip()
+            if not raw:
+                continue
+            try:
+                record = json.loads(raw)
+                if not isinstance(record, dict):
+                    raise ImportRejected('line must be a JSON object')
+                kind = record.get('type')
+                if kind == 'header':
+                    _check_header(record)
+                elif kind == 'blob':
+                    self._put_blob(record)
+                elif kind == 'row':
+                    table, row = self._parse_row(record)
+                    if self._batch and (table != self._batch_table or row.keys() != self._batch[0][1].keys()):
+                        # PostgREST bulk writes need the same columns in every row
+                        yield from self._flush()
+                    self._batch.append((number, row))
+                    self._batch_table = table
+                    self._batch_bytes += len(raw)
+                    if len(self._batch) >= self.batch_rows or self._batch_bytes >= self.batch_bytes:
+                        yield from self._flush()
+                elif kind not in ('end', 'error'):
+                    raise ImportRejected(f'unknown line type {kind!r}')
+            except ValueError as e:
+                # ImportRejected, bad JSON or bad base64
+                self.errors += 1
+                yield {'type': 'error', 'line': number, 'error': str(e)}
+                if isinstance(e, UnsupportedStream):
+                    # Read nothing more from a stream this version doesn't understand
+                    yield from self._flush()
+                    yield self._summary()
+                    return
+        yield from self._flush()
+        yield self._summary()
+
+    def abort(self, error):
+        """Close a run cut short by error, such as the request body failing
+        to read: an error event, the pending batch, then the summary"""
+        self.errors += 1
+        yield {'type': 'error', 'error': error}
+        yield from self._flush()
+        yield self._summary()
+
+    def _parse_row(self, record):
+        table, row = record.get('table'), record.get('data')
+        if table not in EXPORT_TABLES:
+            raise ImportRejected(f'table must be one of {", ".join(EXPORT_TABLES)}')
+        if not isinstance(row, dict) or row.get('id') is None:
+            raise ImportRejected('data must be an object with an id')
+        row = {k: v for k, v in row.items() if k not in GENERATED_COLUMNS}
+        for column in BLOB_COLUMNS.get(table, ()):
+            value = row.get(column)
+            for item in value if isinstance(value, list) else [value]:
+                key = parse_ref(item)
+                if key is not None:
+                    self._referenced.add(key)
+        return table, row
+
+    def _put_blob(self, record):
+        key, data = record.get('key'), record.get('data')
+        if not isinstance(key, str) or not isinstance(data, str):
+            raise ImportRejected('blob lines need a key and base64 data')
+        data = base64.b64decode(data, validate=True)
+        if hashlib.sha256(data).hexdigest() != key:
+            raise ImportRejected(f'blob {key} does not match its content')
+        self.store.put(data)
+        self.blobs += 1
+
+    def _flush(self):
+        if not self._batch:
+            return
+        batch, table = self._batch, self._batch_table
+        self._batch, self._batch_bytes = [], 0
+        try:
+            self.client.table(table).upsert([row for _, row in batch], returning=ReturnMethod.minimal).execute()
+        except Exception as e:
+            self.errors += 1
+            yield {'type': 'error', 'table': table, 'lines': [batch[0][0], batch[-1][0]],
+                   'error': getattr(e, 'message', None) or str(e)}
+            return
+        self.rows[table] = self.rows.get(table, 0) + len(batch)
+        yield {'type': 'progress', 'table': table, 'rows': len(batch), 'table_total': self.rows[table],
+               'line': batch[-1][0]}
+
+    def _summary(self):
+        summary = {'type': 'done', 'rows': self.rows, 'blobs': self.blobs, 'errors': self.errors}
+        missing = [key for key in sorted(self._referenced) if not self.store.exists(key)]
+        if missing:
+            # Rows point at blobs this environment doesn't have; export with
+            # ?blobs=include to carry them along
+            summary['missing_blobs'] = len(missing)
+            summary['missing_blob_keys'] = missing[:MISSING_BLOBS_LISTED]
+        if self.rows:
+            warning = self._sync_sequences()
+            if warning:
+                summary['warning'] = warning
+        return summary
+
+    def _sync_sequences(self):
+        """Move id sequences past the imported ids, so later creates don't collide"""
+        try:
+            self.client.rpc('sync_id_sequences', {'p_tables': sorted(self.rows)}).execute()
+        except Exception as e:
+            # PGRST202: function not installed yet
+            if getattr(e, 'code', None) != 'PGRST202':
+                return f'Could not advance id sequences: {e}'
+            return 'Id sequences were not advanced; install migrations/005_sync_id_sequences.sql'
+        return None
+
+
+def _check_header(record):
+    if record.get('format') != EXPORT_FORMAT:
+        raise UnsupportedStream(f'not a {EXPORT_FORMAT} stream')
+    if not isinstance(record.get('version'), int) or record['version'] > EXPORT_VERSION:
+        raise UnsupportedStream(f'unsupported export version {record.get("version")!r}')
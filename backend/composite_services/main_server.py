@@ -1,32 +1,104 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, stream_with_context
 from flask_cors import CORS
-from supabase import create_client, Client
+from supabase import Client
 from functools import wraps
 from dotenv import load_dotenv
 import os
-import io
+import sys
+import hashlib
 import uuid
+import contextvars
+from datetime import date
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, wait
 from werkzeug.utils import secure_filename
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from shared.token_verifier import verifier_from_env
+from shared.listing import ListQuery, ListQueryError
+from shared.http_pool import create_pooled_client, pool_stats
+from shared.metrics import instrument_app, watch_cache
+from shared.table_columns import ColumnCatalog, blob_version, strip_blobs
+from shared.timing import phase, time_requests
+from response_cache import LRUCache
+from prof_levels import ProficiencyRegistry
+from media import sniff_image_mimetype, sniff_evidence_mimetype, evidence_metadata
+from blob_store import BlobNotFound, BlobView, blob_store_from_env, make_ref, parse_ref, read_blob
+from byte_ranges import content_disposition, send_blob
+from blob_migration import start_background_migration
+from uploads import UploadRequest, body_limit, upload_limits
+from sparse_fields import FieldSelection, FieldSelectionError, section_fields
+from compression import cached_variant, compress, compressible, negotiate
+from serialization import json_provider_from_env, msgpack, response_format
+from profiler import Profiler, ProfilerBusy, ProfilerCooldown
+from batch import RESOURCES, AtomicBatchUnavailable, BatchError, apply_batch, parse_operations
+from portfolio_document import PORTFOLIO_DOCUMENT, PortfolioDocument
+from data_transfer import BulkImport, export_lines, ndjson_line
+
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization"]}})
-
-# Initialize Supabase client
-supabase: Client = create_client(
+# Request, Supabase-call and cache metrics at /metrics (shared/metrics.py); first
+# so that its after_request hook runs last and sees the final body size
+instrument_app(app)
+# Server-Timing header (auth, upstream calls, decode, serialize, compress) and
+# slow-request logs; before compress_response so compression time is counted
+time_requests(app)
+# orjson-backed jsonify, answering in MessagePack when the client asks for it
+app.json = json_provider_from_env(app)
+# Multipart file parts are hashed and size-checked as they stream in (uploads.py)
+app.request_class = UploadRequest
+# Hard cap on any request body; werkzeug rejects larger bodies before parsing
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', str(60 * 1024 * 1024)))
+# /api/import streams its body in batches, so it gets its own cap (0 for none)
+IMPORT_MAX_CONTENT_LENGTH = int(os.getenv('IMPORT_MAX_CONTENT_LENGTH', str(1024 * 1024 * 1024))) or None
+LOGO_MAX_BYTES = 2 * 1024 * 1024  # 2 MB for logos
+EVIDENCE_MAX_BYTES = 10 * 1024 * 1024  # 10 MB per evidence file
+CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": ["Content-Type", "Authorization", "Range", "If-Range"], "expose_headers": ["Accept-Ranges", "Content-Range", "Content-Length", "Content-Encoding", "ETag", "Link", "X-Next-Cursor", "X-Portfolio-Version"]}})
+
+# Initialize Supabase clients; both share one keep-alive connection pool (shared/http_pool.py)
+supabase: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_SERVICE_KEY")
 )
 
 # Initialize Supabase client with ANON key for auth operations
-supabase_anon: Client = create_client(
+supabase_anon: Client = create_pooled_client(
     os.getenv("SUPABASE_URL"),
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# Verifies access tokens locally (JWT secret / JWKS) with a bounded identity
+# cache, only calling supabase_anon.auth.get_user when it cannot decide
+token_verifier = verifier_from_env(supabase_anon)
+
+# Bounded pool for fanning out independent Supabase queries within a request
+fanout_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('FANOUT_MAX_WORKERS', '8')),
+    thread_name_prefix='supabase-fanout'
+)
+PORTFOLIO_QUERY_TIMEOUT = float(os.getenv('PORTFOLIO_QUERY_TIMEOUT', '5'))
+
+def run_concurrently(queries, timeout):
+    """Run {name: callable} on the fan-out pool; returns (results, errors) by name"""
+    # Each query runs in a copy of the request's context so its upstream calls
+    # show up in the request's Server-Timing
+    futures = {name: fanout_executor.submit(contextvars.copy_context().run, fn) for name, fn in queries.items()}
+    wait(futures.values(), timeout=timeout)
+    results, errors = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            # Past the deadline: drop it if still queued, ignore it otherwise
+            future.cancel()
+            errors[name] = f'Timed out after {timeout:g}s'
+        elif future.exception() is not None:
+            errors[name] = str(future.exception())
+        else:
+            results[name] = future.result()
+    return results, errors
+
 # Authentication helper decorator
 def require_auth(f):
     @wraps(f)
@@ -39,13 +111,243 @@ def require_auth(f):
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Missing or invalid authorization header'}), 401
         token = auth_header.split(' ')[1]
-        try:
-            user = supabase_anon.auth.get_user(token)
-            return f(*args, **kwargs)
-        except Exception as e:
+        with phase('auth'):
+            user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Invalid token'}), 401
+        request.current_user = user
+        return f(*args, **kwargs)
     return decorated_function
 
+# Read-through cache for public GET responses, keyed by path + query string and
+# tagged with the tables (or individual rows) each response was built from
+response_cache = LRUCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '256')),
+    max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    ttl=int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+)
+
+# Content-addressed storage for logos and evidence files; table columns only
+# hold 'sha256:<key>' references (legacy rows may still hold inline hex)
+blob_store = blob_store_from_env(supabase)
+# Column names per table (from PostgREST's schema), used to keep blob
+# columns out of list and detail responses
+column_catalog = ColumnCatalog(supabase)
+
+# Decoded organization logos keyed by (table, row id); entries hold the logo
+# version used as both ETag and URL version, and are dropped by logo uploads
+logo_cache = LRUCache(
+    max_entries=int(os.getenv('LOGO_CACHE_SIZE', '512')),
+    max_bytes=int(os.getenv('LOGO_CACHE_MAX_BYTES', str(32 * 1024 * 1024))),
+    ttl=int(os.getenv('LOGO_CACHE_TTL', '3600'))
+)
+watch_cache('response', response_cache)
+watch_cache('logo', logo_cache)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Proficiency labels shared by /api/skills and /api/portfolio, rebuilt on a TTL
+# or when /api/prof-levels reads fresh rows; cached reads that embed labels are
+# dropped whenever the map actually changes
+def prof_labels_changed():
+    response_cache.invalidate('prof_lvl')
+    portfolio_document.touch()
+
+prof_registry = ProficiencyRegistry(
+    lambda: supabase.table('prof_lvl').select('*').execute().data,
+    ttl=int(os.getenv('PROF_LEVELS_TTL', '600')),
+    on_change=prof_labels_changed
+)
+
+def _cache_tags(tables, row_arg, kwargs):
+    if row_arg:
+        return [f'{table}:{kwargs[row_arg]}' for table in tables]
+    return list(tables)
+
+def content_etag(body):
+    """Strong ETag for a response body"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def cached_response(*tables, row_arg=None):
+    """Serve a GET from response_cache, filling it on a miss"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # JSON and MessagePack copies of a response are cached separately
+            key = (request.path, request.query_string, response_format(request.accept_mimetypes))
+            tags = _cache_tags(tables, row_arg, kwargs)
+            hit = response_cache.get(key)
+            if hit is not None:
+                body, mimetype, etag, headers = hit
+                # Weak comparison: a compressed copy carries W/"<etag>"
+                if request.if_none_match.contains_weak(etag):
+                    # Client copy is current: skip the body entirely
+                    response = app.response_class(status=304, headers=headers)
+                    response.set_etag(etag)
+                    return response
+                response = app.response_class(body, status=200, mimetype=mimetype, headers=headers)
+                response.set_etag(etag)
+                return precompress(response, response_cache, key, etag, body, tags)
+            # Taken before the view queries Supabase, so a write landing in
+            # between keeps its stale result out of the cache
+            since = response_cache.generations(tags)
+            response = app.make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not g.get('skip_response_cache'):
+                body = response.get_data()
+                etag = content_etag(body)
+                # Keep route-set headers such as the pagination Link
+                headers = [(k, v) for k, v in response.headers.items() if k not in ('Content-Type', 'Content-Length')]
+                response.set_etag(etag)
+                response_cache.set(key, (body, response.mimetype, etag, headers), size=len(body), tags=tags, since=since)
+                return precompress(response, response_cache, key, etag, body, tags)
+            return response
+        return wrapper
+    return decorator
+
+def precompress(response, cache, key, etag, body, tags):
+    """Send the compressed variant of a cached body when the client accepts one,
+    compressing it only the first time"""
+    if not compressible(response.mimetype, len(body)):
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(cached_variant(cache, key, etag, body, encoding, tags))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # Same entity, different bytes: the validator becomes weak
+    response.set_etag(etag, weak=True)
+    return response
+
+def next_page_headers(base_url, args, next_cursor):
+    """X-Next-Cursor and Link rel="next" headers pointing at the next page"""
+    if not next_cursor:
+        return []
+    args = args.to_dict(flat=False)
+    args['after'] = [next_cursor]
+    return [
+        ('X-Next-Cursor', next_cursor),
+        ('Link', f'<{base_url}?{urlencode(args, doseq=True)}>; rel="next"'),
+    ]
+
+def list_response(rows, next_cursor):
+    """JSON array of one page of rows, with next-page headers when there are more"""
+    response = jsonify(rows)
+    response.headers.extend(next_page_headers(request.base_url, request.args, next_cursor))
+    return response, 200
+
+def invalidates(*tables, row_arg=None):
+    """Drop cached reads of the given tables (and the touched row) after a write"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            rv = f(*args, **kwargs)
+            if request.method == 'OPTIONS':
+                return rv
+            response = app.make_response(rv)
+            # 5xx may follow a partial write, so only skip clean client errors
+            if response.status_code < 400 or response.status_code >= 500:
+                tags = list(tables)
+                if row_arg:
+                    tags += _cache_tags(tables, row_arg, kwargs)
+                drop_cached(*tags)
+            return response
+        return wrapper
+    return decorator
+
+def drop_cached(*tags):
+    response_cache.invalidate(*tags)
+    logo_cache.invalidate(*tags)
+
+# Cache-Control policy per endpoint for GET /api/* responses. Anything not listed
+# uses DEFAULT_CACHE_CONTROL; each entry can be overridden with an env var named
+# CACHE_CONTROL_<ENDPOINT>, e.g. CACHE_CONTROL_GET_PROF_LEVELS='public, max-age=3600'
+DEFAULT_CACHE_CONTROL = os.getenv('DEFAULT_CACHE_CONTROL', 'no-cache')
+CACHE_CONTROL_POLICIES = {
+    'get_prof_levels': 'public, max-age=300',
+}
+
+def cache_control_for(endpoint):
+    override = os.getenv(f'CACHE_CONTROL_{(endpoint or "").upper()}')
+    if override:
+        return override
+    return CACHE_CONTROL_POLICIES.get(endpoint, DEFAULT_CACHE_CONTROL)
+
+# Registered before add_conditional_headers so that it runs after it: ETags
+# and 304s are worked out on the uncompressed body
+@app.after_request
+def compress_response(response):
+    if response.status_code == 304:
+        etag, _ = response.get_etag()
+        if etag and request.if_none_match.is_weak(etag):
+            # The client revalidated a compressed copy
+            response.set_etag(etag, weak=True)
+        return response
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if not compressible(response.mimetype, len(body)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, _ = response.get_etag()
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.after_request
+def add_conditional_headers(response):
+    # Give every successful JSON GET a strong ETag and answer If-None-Match with
+    # 304; file responses (direct passthrough) are left to their own routes
+    if request.method != 'GET' or not request.path.startswith('/api/'):
+        return response
+    if response.status_code not in (200, 304) or response.direct_passthrough:
+        return response
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = cache_control_for(request.endpoint)
+    if response.status_code == 200:
+        if not response.get_etag()[0]:
+            response.set_etag(content_etag(response.get_data()))
+        response.make_conditional(request)
+    return response
+
+def stored_logo_version(row):
+    """logo_version of a row returned by a write, as list rows and serve_logo
+    report it: taken over the bytea column as read back, not the ref written"""
+    return row.get('logo_version') or blob_version(row['organization_logo'])
+
+def serve_logo(table, row_id, not_found_message):
+    """Send a row's organization_logo from logo_cache, decoding it on a miss.
+
+    Requests carrying ?v=<logo_version> that matches the current logo are
+    marked immutable; anything else must revalidate against the ETag.
+    """
+    version = request.args.get('v')
+    entry = logo_cache.get((table, row_id))
+    if entry is None or (version and version != entry[0]):
+        since = logo_cache.generations([f'{table}:{row_id}'])
+        response = supabase.table(table).select('organization_logo').eq('id', row_id).execute()
+        if not response.data:
+            return jsonify({'error': not_found_message}), 404
+        logo_data = response.data[0].get('organization_logo')
+        if not logo_data:
+            return jsonify({'error': 'No logo found'}), 404
+        file_bytes = read_blob(blob_store, logo_data)
+        entry = (blob_version(logo_data), file_bytes, sniff_image_mimetype(file_bytes))
+        logo_cache.set((table, row_id), entry, size=len(file_bytes), tags=[f'{table}:{row_id}'], since=since)
+
+    etag, file_bytes, mimetype = entry
+    response = app.response_class(file_bytes, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if version == etag else 'no-cache'
+    # SVG logos are text; raster formats are skipped by compressible()
+    precompress(response, logo_cache, (table, row_id), etag, file_bytes, [f'{table}:{row_id}'])
+    return response.make_conditional(request)
+
 # Auth Login endpoint
 @app.route('/api/auth/login', methods=['POST', 'OPTIONS'])
 def login():
@@ -78,10 +380,64 @@ def logout():
         return '', 204
     try:
         supabase_anon.auth.sign_out()
+        token_verifier.revoke(request.headers.get('Authorization', '').split(' ')[1])
         return jsonify({'message': 'Logged out successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Connection reuse counters for the shared Supabase connection pool
+@app.route('/api/admin/http-pool', methods=['GET'])
+@require_auth
+def http_pool_stats():
+    return jsonify(pool_stats()), 200
+
+# State of this worker's portfolio document; POST rebuilds it from the tables
+# and reports whether the patched copy had drifted from them
+@app.route('/api/admin/portfolio-document', methods=['GET', 'POST'])
+@require_auth
+def portfolio_document_status():
+    if request.method == 'POST':
+        try:
+            drifted = portfolio_document.rebuild()
+        except Exception as e:
+            return jsonify({'error': f'Rebuild failed: {str(e)}', **portfolio_document.status()}), 502
+        return jsonify({**portfolio_document.status(), 'drifted': drifted}), 200
+    return jsonify(portfolio_document.status()), 200
+
+# On-demand profiling of this worker process; off unless PROFILER_ENABLED is set.
+# POST starts a session (sample, cprofile or tracemalloc; see profiler.py), GET
+# returns its status or, once finished, the dump, DELETE ends it early
+profiler = Profiler()
+profiler.install(app)
+
+@app.route('/api/admin/profile', methods=['POST', 'GET', 'DELETE'])
+@require_auth
+def profile_worker():
+    if not profiler.enabled:
+        return jsonify({'error': 'Profiler is disabled'}), 404
+    if request.method == 'POST':
+        try:
+            session = profiler.start(request.get_json(silent=True) or {}, app.view_functions)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        except ProfilerBusy as e:
+            return jsonify({'error': str(e)}), 409
+        except ProfilerCooldown as e:
+            return jsonify({'error': str(e)}), 429, {'Retry-After': str(e.retry_after)}
+        return jsonify(session.status()), 202
+    session = profiler.session
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    if request.method == 'DELETE':
+        session.stop()
+    if not session.done.is_set():
+        return jsonify(session.status()), 202
+    body, mimetype, filename = session.result()
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 # Auth Validate endpoint
 @app.route('/api/auth/validate', methods=['POST', 'OPTIONS'])
 def validate_token():
@@ -92,14 +448,14 @@ def validate_token():
         if not auth_header.startswith('Bearer '):
             return jsonify({'error': 'No valid authorization header'}), 401
         token = auth_header.split(' ')[1]
-        user = supabase_anon.auth.get_user(token)
-        if not getattr(user, 'user', None):
+        user = token_verifier.verify(token)
+        if not user:
             return jsonify({'error': 'Invalid token'}), 401
         return jsonify({
             'valid': True,
             'user': {
-                'id': user.user.id,
-                'email': user.user.email
+                'id': user['id'],
+                'email': user['email']
             }
         }), 200
     except Exception:
@@ -125,45 +481,31 @@ def refresh_token():
 
 # Skills endpoint with proficiency labels resolved from prof_level table
 @app.route('/api/skills', methods=['GET'])
+@cached_response('skills', 'prof_lvl')
 def get_skills():
     try:
-        skills_res = supabase.table('skills').select('*').execute()
-        skills = skills_res.data or []
+        listing = ListQuery('skills', request.args)
+        fields = FieldSelection('skills', request.args.get('fields'), column_catalog)
+        skills_res = listing.apply(supabase.table('skills').select(fields.select_list(listing.key_columns()))).execute()
+        skills, next_cursor = listing.page(skills_res.data or [])
 
-        # Attempt to fetch proficiency levels mapping from `prof_lvl`
+        # Attach labels from the shared proficiency registry
         try:
-            levels_res = supabase.table('prof_lvl').select('*').execute()
-            levels = levels_res.data or []
-            level_map = {}
-            for lvl in levels:
-                key_raw = lvl.get('id') or lvl.get('level') or lvl.get('value')
-                key_str = str(key_raw).strip() if key_raw is not None else None
-                label = (
-                    lvl.get('level')
-                    or lvl.get('label')
-                    or lvl.get('name')
-                    or lvl.get('level_name')
-                    or key_str
-                )
-                if key_str:
-                    level_map[key_str] = label
-            # attach label
-            for s in skills:
-                prof_val = s.get('proficiency')
-                key_lookup = str(prof_val).strip() if prof_val is not None else None
-                if key_lookup and key_lookup in level_map:
-                    s['proficiency_label'] = level_map.get(key_lookup)
+            prof_registry.apply(skills)
         except Exception:
             # If mapping fails, return skills without labels
             pass
 
-        return jsonify(skills), 200
+        return list_response(fields.project(skills), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new skill
 @app.route('/api/skills', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('skills')
 def create_skill():
     if request.method == 'OPTIONS':
         return '', 204
@@ -178,6 +520,7 @@ def create_skill():
         }
         new_skill = {k: v for k, v in new_skill.items() if v is not None}
         response = supabase.table('skills').insert(new_skill).execute()
+        portfolio_document.upsert('skills', response.data)
         return jsonify({'data': response.data, 'message': 'Skill created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -185,6 +528,7 @@ def create_skill():
 # Update skill
 @app.route('/api/skills/<int:skill_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('skills')
 def update_skill(skill_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -197,6 +541,7 @@ def update_skill(skill_id):
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
         response = supabase.table('skills').update(update_data).eq('id', skill_id).execute()
+        portfolio_document.upsert('skills', response.data)
         if response.data:
             return jsonify({'data': response.data, 'message': 'Skill updated'}), 200
         return jsonify({'error': 'Skill not found'}), 404
@@ -206,11 +551,13 @@ def update_skill(skill_id):
 # Delete skill
 @app.route('/api/skills/<int:skill_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('skills')
 def delete_skill(skill_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
         response = supabase.table('skills').delete().eq('id', skill_id).execute()
+        portfolio_document.remove('skills', response.data)
         if response.data:
             return jsonify({'message': 'Skill deleted'}), 200
         return jsonify({'error': 'Skill not found'}), 404
@@ -219,16 +566,23 @@ def delete_skill(skill_id):
 
 # Education endpoint
 @app.route('/api/education', methods=['GET'])
+@cached_response('education')
 def get_education():
     try:
-        response = supabase.table('education').select('*').order('start_date', desc=True).execute()
-        return jsonify(response.data), 200
+        listing = ListQuery('education', request.args)
+        fields = FieldSelection('education', request.args.get('fields'), column_catalog)
+        response = listing.apply(supabase.table('education').select(fields.select_list(listing.key_columns()))).execute()
+        rows, next_cursor = listing.page(response.data)
+        return list_response(fields.project(strip_blobs('education', rows)), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new education
 @app.route('/api/education', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('education')
 def create_education():
     if request.method == 'OPTIONS':
         return '', 204
@@ -242,13 +596,15 @@ def create_education():
         }
         new_item = {k: v for k, v in new_item.items() if v is not None}
         response = supabase.table('education').insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'Education created'}), 201
+        portfolio_document.upsert('education', response.data)
+        return jsonify({'data': strip_blobs('education', response.data), 'message': 'Education created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Update education
 @app.route('/api/education/<int:edu_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('education', row_arg='edu_id')
 def update_education(edu_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -265,8 +621,9 @@ def update_education(edu_id):
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
         response = supabase.table('education').update(update_data).eq('id', edu_id).execute()
+        portfolio_document.upsert('education', response.data)
         if response.data:
-            return jsonify({'data': response.data, 'message': 'Education updated'}), 200
+            return jsonify({'data': strip_blobs('education', response.data), 'message': 'Education updated'}), 200
         return jsonify({'error': 'Education not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -274,11 +631,13 @@ def update_education(edu_id):
 # Delete education
 @app.route('/api/education/<int:edu_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('education', row_arg='edu_id')
 def delete_education(edu_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
         response = supabase.table('education').delete().eq('id', edu_id).execute()
+        portfolio_document.remove('education', response.data)
         if response.data:
             return jsonify({'message': 'Education deleted'}), 200
         return jsonify({'error': 'Education not found'}), 404
@@ -288,16 +647,18 @@ def delete_education(edu_id):
 # Upload organization logo for education
 @app.route('/api/education/<int:edu_id>/logo', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('education', row_arg='edu_id')
+@upload_limits(per_file=LOGO_MAX_BYTES, total=LOGO_MAX_BYTES + 64 * 1024)
 def upload_education_logo(edu_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
-        MAX_BYTES = 2 * 1024 * 1024  # 2 MB for logos
         clear_flag = request.form.get('clear')
         uploaded = request.files.get('logo') if request.files else None
 
         if clear_flag and clear_flag.lower() == 'true':
             response = supabase.table('education').update({'organization_logo': None}).eq('id', edu_id).execute()
+            portfolio_document.upsert('education', response.data)
             if response.data:
                 return jsonify({'message': 'Logo cleared'}), 200
             return jsonify({'error': 'Education not found'}), 404
@@ -305,14 +666,13 @@ def upload_education_logo(edu_id):
         if not uploaded:
             return jsonify({'error': 'No logo file provided'}), 400
 
-        content = uploaded.read() or b''
-        if len(content) > MAX_BYTES:
-            return jsonify({'error': 'Logo too large (max 2 MB)'}), 413
-        
-        hex_value = '\\\\x' + content.hex()
-        response = supabase.table('education').update({'organization_logo': hex_value}).eq('id', edu_id).execute()
+        # Already spooled, hashed and size-checked while the form was parsed
+        stream = uploaded.stream
+        logo_ref = make_ref(blob_store.put_stream(stream, stream.sha256, sniff_image_mimetype(stream.head())))
+        response = supabase.table('education').update({'organization_logo': logo_ref}).eq('id', edu_id).execute()
+        portfolio_document.upsert('education', response.data)
         if response.data:
-            return jsonify({'message': 'Logo uploaded', 'size_bytes': len(content)}), 200
+            return jsonify({'message': 'Logo uploaded', 'size_bytes': stream.size, 'logo_version': stored_logo_version(response.data[0])}), 200
         return jsonify({'error': 'Education not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Logo upload failed: {str(e)}'}), 500
@@ -321,48 +681,29 @@ def upload_education_logo(edu_id):
 @app.route('/api/education/<int:edu_id>/logo', methods=['GET'])
 def get_education_logo(edu_id):
     try:
-        from flask import send_file
-        import io
-        
-        response = supabase.table('education').select('organization_logo').eq('id', edu_id).execute()
-        if not response.data:
-            return jsonify({'error': 'Education not found'}), 404
-        
-        logo_data = response.data[0].get('organization_logo')
-        if not logo_data:
-            return jsonify({'error': 'No logo found'}), 404
-        
-        hex_str = logo_data
-        if hex_str.startswith('\\\\x'):
-            hex_str = hex_str[2:]
-        
-        file_bytes = bytes.fromhex(hex_str)
-        
-        # Detect image type
-        mimetype = 'image/png'
-        if file_bytes.startswith(b'\\xff\\xd8\\xff'):
-            mimetype = 'image/jpeg'
-        elif file_bytes.startswith(b'GIF'):
-            mimetype = 'image/gif'
-        elif file_bytes.startswith(b'<svg'):
-            mimetype = 'image/svg+xml'
-        
-        return send_file(io.BytesIO(file_bytes), mimetype=mimetype)
+        return serve_logo('education', edu_id, 'Education not found')
     except Exception as e:
         return jsonify({'error': f'Logo retrieval failed: {str(e)}'}), 500
 
 # Work experience endpoint
 @app.route('/api/work', methods=['GET'])
+@cached_response('work_experience')
 def get_work():
     try:
-        response = supabase.table('work_experience').select('*').order('start_date', desc=True).execute()
-        return jsonify(response.data), 200
+        listing = ListQuery('work_experience', request.args)
+        fields = FieldSelection('work_experience', request.args.get('fields'), column_catalog)
+        response = listing.apply(supabase.table('work_experience').select(fields.select_list(listing.key_columns()))).execute()
+        rows, next_cursor = listing.page(response.data)
+        return list_response(fields.project(strip_blobs('work_experience', rows)), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new work experience
 @app.route('/api/work', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('work_experience')
 def create_work():
     if request.method == 'OPTIONS':
         return '', 204
@@ -377,13 +718,15 @@ def create_work():
         }
         new_item = {k: v for k, v in new_item.items() if v is not None}
         response = supabase.table('work_experience').insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'Work experience created'}), 201
+        portfolio_document.upsert('work_experience', response.data)
+        return jsonify({'data': strip_blobs('work_experience', response.data), 'message': 'Work experience created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Update work experience
 @app.route('/api/work/<int:work_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('work_experience', row_arg='work_id')
 def update_work(work_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -399,8 +742,9 @@ def update_work(work_id):
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
         response = supabase.table('work_experience').update(update_data).eq('id', work_id).execute()
+        portfolio_document.upsert('work_experience', response.data)
         if response.data:
-            return jsonify({'data': response.data, 'message': 'Work experience updated'}), 200
+            return jsonify({'data': strip_blobs('work_experience', response.data), 'message': 'Work experience updated'}), 200
         return jsonify({'error': 'Work experience not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -408,11 +752,13 @@ def update_work(work_id):
 # Delete work experience
 @app.route('/api/work/<int:work_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('work_experience', row_arg='work_id')
 def delete_work(work_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
         response = supabase.table('work_experience').delete().eq('id', work_id).execute()
+        portfolio_document.remove('work_experience', response.data)
         if response.data:
             return jsonify({'message': 'Work experience deleted'}), 200
         return jsonify({'error': 'Work experience not found'}), 404
@@ -422,16 +768,18 @@ def delete_work(work_id):
 # Upload organization logo for work experience
 @app.route('/api/work/<int:work_id>/logo', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('work_experience', row_arg='work_id')
+@upload_limits(per_file=LOGO_MAX_BYTES, total=LOGO_MAX_BYTES + 64 * 1024)
 def upload_work_logo(work_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
-        MAX_BYTES = 2 * 1024 * 1024  # 2 MB for logos
         clear_flag = request.form.get('clear')
         uploaded = request.files.get('logo') if request.files else None
 
         if clear_flag and clear_flag.lower() == 'true':
             response = supabase.table('work_experience').update({'organization_logo': None}).eq('id', work_id).execute()
+            portfolio_document.upsert('work_experience', response.data)
             if response.data:
                 return jsonify({'message': 'Logo cleared'}), 200
             return jsonify({'error': 'Work experience not found'}), 404
@@ -439,14 +787,13 @@ def upload_work_logo(work_id):
         if not uploaded:
             return jsonify({'error': 'No logo file provided'}), 400
 
-        content = uploaded.read() or b''
-        if len(content) > MAX_BYTES:
-            return jsonify({'error': 'Logo too large (max 2 MB)'}), 413
-        
-        hex_value = '\\\\x' + content.hex()
-        response = supabase.table('work_experience').update({'organization_logo': hex_value}).eq('id', work_id).execute()
+        # Already spooled, hashed and size-checked while the form was parsed
+        stream = uploaded.stream
+        logo_ref = make_ref(blob_store.put_stream(stream, stream.sha256, sniff_image_mimetype(stream.head())))
+        response = supabase.table('work_experience').update({'organization_logo': logo_ref}).eq('id', work_id).execute()
+        portfolio_document.upsert('work_experience', response.data)
         if response.data:
-            return jsonify({'message': 'Logo uploaded', 'size_bytes': len(content)}), 200
+            return jsonify({'message': 'Logo uploaded', 'size_bytes': stream.size, 'logo_version': stored_logo_version(response.data[0])}), 200
         return jsonify({'error': 'Work experience not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Logo upload failed: {str(e)}'}), 500
@@ -455,48 +802,29 @@ def upload_work_logo(work_id):
 @app.route('/api/work/<int:work_id>/logo', methods=['GET'])
 def get_work_logo(work_id):
     try:
-        from flask import send_file
-        import io
-        
-        response = supabase.table('work_experience').select('organization_logo').eq('id', work_id).execute()
-        if not response.data:
-            return jsonify({'error': 'Work experience not found'}), 404
-        
-        logo_data = response.data[0].get('organization_logo')
-        if not logo_data:
-            return jsonify({'error': 'No logo found'}), 404
-        
-        hex_str = logo_data
-        if hex_str.startswith('\\\\x'):
-            hex_str = hex_str[2:]
-        
-        file_bytes = bytes.fromhex(hex_str)
-        
-        # Detect image type
-        mimetype = 'image/png'
-        if file_bytes.startswith(b'\\xff\\xd8\\xff'):
-            mimetype = 'image/jpeg'
-        elif file_bytes.startswith(b'GIF'):
-            mimetype = 'image/gif'
-        elif file_bytes.startswith(b'<svg'):
-            mimetype = 'image/svg+xml'
-        
-        return send_file(io.BytesIO(file_bytes), mimetype=mimetype)
+        return serve_logo('work_experience', work_id, 'Work experience not found')
     except Exception as e:
         return jsonify({'error': f'Logo retrieval failed: {str(e)}'}), 500
 
 # Community service endpoint
 @app.route('/api/community', methods=['GET'])
+@cached_response('community_service')
 def get_community():
     try:
-        response = supabase.table('community_service').select('*').execute()
-        return jsonify(response.data), 200
+        listing = ListQuery('community_service', request.args)
+        fields = FieldSelection('community_service', request.args.get('fields'), column_catalog)
+        response = listing.apply(supabase.table('community_service').select(fields.select_list(listing.key_columns()))).execute()
+        rows, next_cursor = listing.page(response.data)
+        return list_response(fields.project(rows), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new community service
 @app.route('/api/community', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('community_service')
 def create_community():
     if request.method == 'OPTIONS':
         return '', 204
@@ -511,6 +839,7 @@ def create_community():
         }
         new_item = {k: v for k, v in new_item.items() if v is not None}
         response = supabase.table('community_service').insert(new_item).execute()
+        portfolio_document.upsert('community_service', response.data)
         return jsonify({'data': response.data, 'message': 'Community service created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -518,6 +847,7 @@ def create_community():
 # Update community service
 @app.route('/api/community/<int:comm_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('community_service')
 def update_community(comm_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -533,6 +863,7 @@ def update_community(comm_id):
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
         response = supabase.table('community_service').update(update_data).eq('id', comm_id).execute()
+        portfolio_document.upsert('community_service', response.data)
         if response.data:
             return jsonify({'data': response.data, 'message': 'Community service updated'}), 200
         return jsonify({'error': 'Community service not found'}), 404
@@ -542,11 +873,13 @@ def update_community(comm_id):
 # Delete community service
 @app.route('/api/community/<int:comm_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('community_service')
 def delete_community(comm_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
         response = supabase.table('community_service').delete().eq('id', comm_id).execute()
+        portfolio_document.remove('community_service', response.data)
         if response.data:
             return jsonify({'message': 'Community service deleted'}), 200
         return jsonify({'error': 'Community service not found'}), 404
@@ -555,16 +888,23 @@ def delete_community(comm_id):
 
 # Projects/Other information endpoint
 @app.route('/api/projects', methods=['GET'])
+@cached_response('other_information')
 def get_projects():
     try:
-        response = supabase.table('other_information').select('*').execute()
-        return jsonify(response.data), 200
+        listing = ListQuery('other_information', request.args)
+        fields = FieldSelection('other_information', request.args.get('fields'), column_catalog)
+        response = listing.apply(supabase.table('other_information').select(fields.select_list(listing.key_columns()))).execute()
+        rows, next_cursor = listing.page(response.data)
+        return list_response(fields.project(rows), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new project
 @app.route('/api/projects', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('other_information')
 def create_project():
     if request.method == 'OPTIONS':
         return '', 204
@@ -578,6 +918,7 @@ def create_project():
         }
         new_item = {k: v for k, v in new_item.items() if v is not None}
         response = supabase.table('other_information').insert(new_item).execute()
+        portfolio_document.upsert('other_information', response.data)
         return jsonify({'data': response.data, 'message': 'Project created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -585,6 +926,7 @@ def create_project():
 # Update project
 @app.route('/api/projects/<int:proj_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('other_information')
 def update_project(proj_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -597,6 +939,7 @@ def update_project(proj_id):
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
         response = supabase.table('other_information').update(update_data).eq('id', proj_id).execute()
+        portfolio_document.upsert('other_information', response.data)
         if response.data:
             return jsonify({'data': response.data, 'message': 'Project updated'}), 200
         return jsonify({'error': 'Project not found'}), 404
@@ -606,11 +949,13 @@ def update_project(proj_id):
 # Delete project
 @app.route('/api/projects/<int:proj_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('other_information')
 def delete_project(proj_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
         response = supabase.table('other_information').delete().eq('id', proj_id).execute()
+        portfolio_document.remove('other_information', response.data)
         if response.data:
             return jsonify({'message': 'Project deleted'}), 200
         return jsonify({'error': 'Project not found'}), 404
@@ -619,27 +964,38 @@ def delete_project(proj_id):
 
 # E-Portfolio activities endpoint
 @app.route('/api/e-portfolio', methods=['GET'])
+@cached_response('e_portfolio')
 def get_e_portfolio():
     try:
-        response = supabase.table('e_portfolio').select('*').execute()
-        return jsonify(response.data), 200
+        listing = ListQuery('e_portfolio', request.args)
+        fields = FieldSelection('e_portfolio', request.args.get('fields'), column_catalog)
+        response = listing.apply(supabase.table('e_portfolio').select(fields.select_list(listing.key_columns()))).execute()
+        rows, next_cursor = listing.page(response.data)
+        return list_response(fields.project(strip_blobs('e_portfolio', rows)), next_cursor)
+    except (ListQueryError, FieldSelectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Get single e-portfolio activity by ID
 @app.route('/api/e-portfolio/<int:item_id>', methods=['GET'])
+@cached_response('e_portfolio', row_arg='item_id')
 def get_e_portfolio_item(item_id):
     try:
-        response = supabase.table('e_portfolio').select('*').eq('id', item_id).execute()
+        fields = FieldSelection('e_portfolio', request.args.get('fields'), column_catalog)
+        response = supabase.table('e_portfolio').select(fields.select_list()).eq('id', item_id).execute()
         if response.data:
-            return jsonify(response.data[0]), 200
+            return jsonify(fields.project(strip_blobs('e_portfolio', response.data))[0]), 200
         return jsonify({'error': 'E-portfolio activity not found'}), 404
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Create new e-portfolio activity
 @app.route('/api/e-portfolio', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('e_portfolio')
 def create_e_portfolio():
     if request.method == 'OPTIONS':
         return '', 204
@@ -666,13 +1022,14 @@ def create_e_portfolio():
         new_item = {k: v for k, v in new_item.items() if v is not None}
 
         response = supabase.table('e_portfolio').insert(new_item).execute()
-        return jsonify({'data': response.data, 'message': 'E-portfolio activity created'}), 201
+        return jsonify({'data': strip_blobs('e_portfolio', response.data), 'message': 'E-portfolio activity created'}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Update e-portfolio activity
 @app.route('/api/e-portfolio/<int:item_id>', methods=['PUT', 'OPTIONS'])
 @require_auth
+@invalidates('e_portfolio', row_arg='item_id')
 def update_e_portfolio(item_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -697,7 +1054,7 @@ def update_e_portfolio(item_id):
 
         response = supabase.table('e_portfolio').update(update_data).eq('id', item_id).execute()
         if response.data:
-            return jsonify({'data': response.data, 'message': 'E-portfolio activity updated'}), 200
+            return jsonify({'data': strip_blobs('e_portfolio', response.data), 'message': 'E-portfolio activity updated'}), 200
         return jsonify({'error': 'E-portfolio activity not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -705,6 +1062,7 @@ def update_e_portfolio(item_id):
 # Delete e-portfolio activity
 @app.route('/api/e-portfolio/<int:item_id>', methods=['DELETE', 'OPTIONS'])
 @require_auth
+@invalidates('e_portfolio', row_arg='item_id')
 def delete_e_portfolio(item_id):
     if request.method == 'OPTIONS':
         return '', 204
@@ -716,105 +1074,91 @@ def delete_e_portfolio(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Download e-portfolio evidence file
+def evidence_file(item_id, file_index):
+    """The artefacts_evidence_files value at file_index and its metadata
+    (artefacts_evidence_meta, or None for older uploads), or an error response.
+
+    Only the requested elements are pulled out of the jsonb arrays by
+    PostgREST (->> / ->), so the other files of the activity are never
+    transferred.
+    """
+    has_count = column_catalog.has_column('e_portfolio', 'evidence_count')
+    meta_column = f',meta:artefacts_evidence_meta->{file_index}' if column_catalog.has_column('e_portfolio', 'artefacts_evidence_meta') else ''
+    columns = f'file:artefacts_evidence_files->>{file_index}' + (',evidence_count' if has_count else '') + meta_column
+    response = supabase.table('e_portfolio').select(columns).eq('id', item_id).execute()
+    if not response.data:
+        return None, None, (jsonify({'error': 'E-portfolio activity not found'}), 404)
+    row = response.data[0]
+    if row.get('file'):
+        return row['file'], row.get('meta'), None
+
+    if has_count:
+        if not row.get('evidence_count'):
+            return None, None, (jsonify({'error': 'No evidence files found'}), 404)
+        if file_index >= row['evidence_count']:
+            return None, None, (jsonify({'error': 'File index out of range'}), 404)
+
+    # A single file is stored as a plain string, which ->> can't index; it is
+    # the only file, so reading the whole column costs nothing extra
+    response = supabase.table('e_portfolio').select('artefacts_evidence_files').eq('id', item_id).execute()
+    files_data = response.data[0].get('artefacts_evidence_files') if response.data else None
+    if not files_data:
+        return None, None, (jsonify({'error': 'No evidence files found'}), 404)
+    if isinstance(files_data, str):
+        files_list = [files_data]
+    elif isinstance(files_data, list):
+        files_list = files_data
+    else:
+        return None, None, (jsonify({'error': 'Invalid file data format'}), 500)
+    if file_index >= len(files_list):
+        return None, None, (jsonify({'error': 'File index out of range'}), 404)
+    return files_list[file_index], row.get('meta'), None
+
+# Download e-portfolio evidence file (supports Range / If-Range)
 @app.route('/api/e-portfolio/<int:item_id>/download/<int:file_index>', methods=['GET'])
 def download_e_portfolio_file(item_id, file_index=0):
     try:
-        from flask import send_file
-        import io
-        
-        response = supabase.table('e_portfolio').select('artefacts_evidence_files').eq('id', item_id).execute()
-        if not response.data:
-            return jsonify({'error': 'E-portfolio activity not found'}), 404
-        
-        files_data = response.data[0].get('artefacts_evidence_files')
-        if not files_data:
-            return jsonify({'error': 'No evidence files found'}), 404
-        
-        # Handle both single file (string) and multiple files (array)
-        if isinstance(files_data, str):
-            files_list = [files_data]
-        elif isinstance(files_data, list):
-            files_list = files_data
-        else:
-            return jsonify({'error': 'Invalid file data format'}), 500
-        
-        if file_index >= len(files_list):
-            return jsonify({'error': 'File index out of range'}), 404
-        
-        hex_str = files_list[file_index]
-        if hex_str.startswith('\\x'):
-            hex_str = hex_str[2:]
-        
-        file_bytes = bytes.fromhex(hex_str)
-        return send_file(
-            io.BytesIO(file_bytes),
-            as_attachment=True,
-            download_name=f'evidence_{item_id}_{file_index}',
-            mimetype='application/octet-stream'
+        value, meta, error = evidence_file(item_id, file_index)
+        if error:
+            return error
+        meta = meta or {}
+        return send_blob(
+            BlobView(blob_store, value),
+            blob_version(value),
+            meta.get('mime_type') or 'application/octet-stream',
+            download_name=meta.get('filename') or f'evidence_{item_id}_{file_index}'
         )
+    except BlobNotFound:
+        return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
-# Preview e-portfolio evidence file
+# Preview e-portfolio evidence file (supports Range / If-Range)
 @app.route('/api/e-portfolio/<int:item_id>/preview/<int:file_index>', methods=['GET'])
 def preview_e_portfolio_file(item_id, file_index=0):
     try:
-        from flask import send_file
-        import io
-        
-        response = supabase.table('e_portfolio').select('artefacts_evidence_files').eq('id', item_id).execute()
-        if not response.data:
-            return jsonify({'error': 'E-portfolio activity not found'}), 404
-        
-        files_data = response.data[0].get('artefacts_evidence_files')
-        if not files_data:
-            return jsonify({'error': 'No evidence files found'}), 404
-        
-        # Handle both single file (string) and multiple files (array)
-        if isinstance(files_data, str):
-            files_list = [files_data]
-        elif isinstance(files_data, list):
-            files_list = files_data
-        else:
-            return jsonify({'error': 'Invalid file data format'}), 500
-        
-        if file_index >= len(files_list):
-            return jsonify({'error': 'File index out of range'}), 404
-        
-        hex_str = files_list[file_index]
-        if hex_str.startswith('\\x'):
-            hex_str = hex_str[2:]
-        
-        file_bytes = bytes.fromhex(hex_str)
-        
-        # Try to detect mime type based on file signature
-        mimetype = 'application/octet-stream'
-        if file_bytes.startswith(b'%PDF'):
-            mimetype = 'application/pdf'
-        elif file_bytes.startswith(b'\x89PNG'):
-            mimetype = 'image/png'
-        elif file_bytes.startswith(b'\xff\xd8\xff'):
-            mimetype = 'image/jpeg'
-        elif file_bytes.startswith(b'GIF'):
-            mimetype = 'image/gif'
-        
-        return send_file(
-            io.BytesIO(file_bytes),
-            mimetype=mimetype
-        )
+        value, meta, error = evidence_file(item_id, file_index)
+        if error:
+            return error
+        meta = meta or {}
+        blob = BlobView(blob_store, value)
+        # Files uploaded before metadata was recorded are sniffed from their first bytes
+        mimetype = meta.get('mime_type') or sniff_evidence_mimetype(blob.head(16))
+        return send_blob(blob, blob_version(value), mimetype, download_name=meta.get('filename'), inline=True)
+    except BlobNotFound:
+        return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': f'Preview failed: {str(e)}'}), 500
 
-# Upload artefact file (stores as hex string in artefacts_evidence_files)
+# Upload artefact files (stored in the blob store, referenced from artefacts_evidence_files)
 @app.route('/api/e-portfolio/<int:item_id>/upload', methods=['POST', 'OPTIONS'])
 @require_auth
+@invalidates('e_portfolio', row_arg='item_id')
+@upload_limits(per_file=EVIDENCE_MAX_BYTES, total=app.config['MAX_CONTENT_LENGTH'])
 def upload_e_portfolio_file(item_id):
     if request.method == 'OPTIONS':
         return '', 204
     try:
-        # Optional max size guard (10 MB per file)
-        MAX_BYTES = 10 * 1024 * 1024
         # Allow clearing existing file with clear=true and no file
         clear_flag = request.form.get('clear')
 
@@ -833,7 +1177,10 @@ def upload_e_portfolio_file(item_id):
                 uploaded_files.extend(list(request.files.values()))
 
         if clear_flag and clear_flag.lower() == 'true':
-            response = supabase.table('e_portfolio').update({'artefacts_evidence_files': None}).eq('id', item_id).execute()
+            cleared = {'artefacts_evidence_files': None}
+            if column_catalog.has_column('e_portfolio', 'artefacts_evidence_meta'):
+                cleared['artefacts_evidence_meta'] = None
+            response = supabase.table('e_portfolio').update(cleared).eq('id', item_id).execute()
             if response.data:
                 return jsonify({'message': 'Files cleared'}), 200
             return jsonify({'error': 'E-portfolio activity not found'}), 404
@@ -841,28 +1188,35 @@ def upload_e_portfolio_file(item_id):
         if not uploaded_files:
             return jsonify({'error': 'No files provided'}), 400
 
-        hex_values = []
+        blob_refs = []
+        blob_meta = []
         total_size = 0
         
         for uploaded in uploaded_files:
-            content = uploaded.read() or b''
-            if len(content) > MAX_BYTES:
-                return jsonify({'error': f'File {uploaded.filename} too large (max 10 MB per file)'}), 413
-            total_size += len(content)
-            hex_value = '\\x' + content.hex()
-            hex_values.append(hex_value)
+            # Each file was spooled, hashed and size-checked (EVIDENCE_MAX_BYTES)
+            # while the form was parsed, so it is streamed on without a full read
+            stream = uploaded.stream
+            total_size += stream.size
+            # Identical files are stored once; the row only keeps the reference
+            key = blob_store.put_stream(stream, stream.sha256, uploaded.mimetype or 'application/octet-stream')
+            blob_refs.append(make_ref(key))
+            # Recorded once here so listing and serving never inspect the blob
+            blob_meta.append(evidence_metadata(uploaded.filename, stream.size, stream.sha256, stream.head(64 * 1024)))
         
         # Store as array if multiple files, single string if one file
-        store_value = hex_values if len(hex_values) > 1 else hex_values[0]
+        store_value = blob_refs if len(blob_refs) > 1 else blob_refs[0]
 
         try:
-            response = supabase.table('e_portfolio').update({'artefacts_evidence_files': store_value}).eq('id', item_id).execute()
+            update_payload = {'artefacts_evidence_files': store_value}
+            if column_catalog.has_column('e_portfolio', 'artefacts_evidence_meta'):
+                update_payload['artefacts_evidence_meta'] = blob_meta
+            response = supabase.table('e_portfolio').update(update_payload).eq('id', item_id).execute()
             if getattr(response, 'error', None):
                 raise Exception(str(response.error))
             if response.data:
                 return jsonify({
-                    'message': f'{len(hex_values)} file(s) uploaded', 
-                    'file_count': len(hex_values),
+                    'message': f'{len(blob_refs)} file(s) uploaded', 
+                    'file_count': len(blob_refs),
                     'total_size_bytes': total_size
                 }), 200
             # No data returned counts as not found
@@ -887,7 +1241,8 @@ def upload_e_portfolio_file(item_id):
                         raise
 
                 public_urls = []
-                for uploaded, content in zip(uploaded_files, [bytes.fromhex(h[2:] if h.startswith('\\x') else h) for h in hex_values]):
+                for uploaded, ref in zip(uploaded_files, blob_refs):
+                    content = blob_store.get(parse_ref(ref))
                     filename = secure_filename(uploaded.filename or 'evidence')
                     path = f"{item_id}/{uuid.uuid4().hex}_{filename}"
                     mime = uploaded.mimetype or 'application/octet-stream'
@@ -914,44 +1269,75 @@ def upload_e_portfolio_file(item_id):
         # Provide clearer server-side error context
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
+def evidence_items(row):
+    """File listing entries for an e_portfolio row without its blob column"""
+    links_field = row.get('artefacts_evidence_links_texts') or ''
+    items = []
+    # Bytea files, with their upload metadata where it was recorded
+    metas = row.get('artefacts_evidence_meta') or []
+    for idx in range(row.get('evidence_count') or 0):
+        item = {'source': 'bytea', 'index': idx}
+        if idx < len(metas) and isinstance(metas[idx], dict):
+            item.update(metas[idx])
+        items.append(item)
+    # Storage/public URLs (split by newline)
+    for url in [u.strip() for u in str(links_field).split('\n') if u.strip()]:
+        items.append({'source': 'url', 'url': url})
+    return items
+
 # List evidence files (bytea + storage URLs)
 @app.route('/api/e-portfolio/<int:item_id>/files', methods=['GET'])
+@cached_response('e_portfolio', row_arg='item_id')
 def list_eportfolio_files(item_id):
     try:
-        resp = supabase.table('e_portfolio').select('artefacts_evidence_files, artefacts_evidence_links_texts').eq('id', item_id).execute()
+        resp = supabase.table('e_portfolio').select(column_catalog.select_without_blobs('e_portfolio')).eq('id', item_id).execute()
         if not resp.data:
             return jsonify({'error': 'E-portfolio activity not found'}), 404
-        row = resp.data[0]
-        files_field = row.get('artefacts_evidence_files')
-        links_field = row.get('artefacts_evidence_links_texts') or ''
-        items = []
-        # Bytea files
-        if isinstance(files_field, str) and files_field:
-            items.append({'source': 'bytea', 'index': 0})
-        elif isinstance(files_field, list):
-            for idx in range(len(files_field)):
-                items.append({'source': 'bytea', 'index': idx})
-        # Storage/public URLs (split by newline)
-        for url in [u.strip() for u in str(links_field).split('\n') if u.strip()]:
-            items.append({'source': 'url', 'url': url})
-        return jsonify({'items': items}), 200
+        # Only the file count is needed, never the files themselves
+        return jsonify({'items': evidence_items(strip_blobs('e_portfolio', resp.data)[0])}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Delete a single evidence file
 @app.route('/api/e-portfolio/<int:item_id>/files/<int:file_index>', methods=['DELETE'])
 @require_auth
+@invalidates('e_portfolio', row_arg='item_id')
 def delete_eportfolio_file(item_id, file_index):
     try:
         source = request.args.get('source', 'bytea')
-        # Load current row
-        resp = supabase.table('e_portfolio').select('artefacts_evidence_files, artefacts_evidence_links_texts').eq('id', item_id).execute()
-        if not resp.data:
-            return jsonify({'error': 'E-portfolio activity not found'}), 404
-        row = resp.data[0]
 
         if source == 'bytea':
-            files_field = row.get('artefacts_evidence_files')
+            # Remove the element inside the database (migrations/002)
+            try:
+                result = supabase.rpc('remove_evidence_file', {'p_item_id': item_id, 'p_file_index': file_index}).execute().data
+            except Exception as rpc_err:
+                # postgrest-py validates RPC results as a list of rows, so the
+                # function's single jsonb object comes back as the error body
+                raw = rpc_err.json() if callable(getattr(rpc_err, 'json', None)) else None
+                if isinstance(raw, dict) and 'status' in raw:
+                    result = raw
+                # PGRST202: function not installed yet; use the read-modify-write path below
+                elif getattr(rpc_err, 'code', None) != 'PGRST202':
+                    raise
+                else:
+                    result = None
+            if result:
+                status = result.get('status')
+                if status == 'removed':
+                    return jsonify({'message': 'File removed'}), 200
+                if status == 'not_found':
+                    return jsonify({'error': 'E-portfolio activity not found'}), 404
+                if status == 'out_of_range':
+                    return jsonify({'error': 'Index out of range'}), 400
+                return jsonify({'error': 'No bytea files'}), 404
+
+            has_meta = column_catalog.has_column('e_portfolio', 'artefacts_evidence_meta')
+            resp = supabase.table('e_portfolio').select(
+                'artefacts_evidence_files' + (',artefacts_evidence_meta' if has_meta else '')
+            ).eq('id', item_id).execute()
+            if not resp.data:
+                return jsonify({'error': 'E-portfolio activity not found'}), 404
+            files_field = resp.data[0].get('artefacts_evidence_files')
             if isinstance(files_field, str):
                 if file_index != 0:
                     return jsonify({'error': 'Index out of range'}), 400
@@ -964,14 +1350,23 @@ def delete_eportfolio_file(item_id, file_index):
             else:
                 return jsonify({'error': 'No bytea files'}), 404
 
-            upd = supabase.table('e_portfolio').update({'artefacts_evidence_files': new_value}).eq('id', item_id).execute()
+            update_payload = {'artefacts_evidence_files': new_value}
+            if has_meta:
+                metas = resp.data[0].get('artefacts_evidence_meta')
+                update_payload['artefacts_evidence_meta'] = (
+                    metas[:file_index] + metas[file_index+1:] if new_value and isinstance(metas, list) else None
+                )
+            upd = supabase.table('e_portfolio').update(update_payload).eq('id', item_id).execute()
             if upd.data:
                 return jsonify({'message': 'File removed'}), 200
             return jsonify({'error': 'Update failed'}), 500
 
         elif source == 'url':
             # URL-based removal
-            links_field = row.get('artefacts_evidence_links_texts') or ''
+            resp = supabase.table('e_portfolio').select('artefacts_evidence_links_texts').eq('id', item_id).execute()
+            if not resp.data:
+                return jsonify({'error': 'E-portfolio activity not found'}), 404
+            links_field = resp.data[0].get('artefacts_evidence_links_texts') or ''
             urls = [u.strip() for u in str(links_field).split('\n') if u.strip()]
             if file_index < 0 or file_index >= len(urls):
                 return jsonify({'error': 'Index out of range'}), 400
@@ -998,58 +1393,253 @@ def delete_eportfolio_file(item_id, file_index):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Batch of creates, updates and deletes across the CRUD resources, e.g.
+# {"atomic": false, "operations": [{"op": "update", "resource": "skills", "id": 3,
+# "data": {"proficiency": 4}}, ...]}; one result per operation (batch.py)
+@app.route('/api/batch', methods=['POST', 'OPTIONS'])
+@require_auth
+def apply_batch_operations():
+    if request.method == 'OPTIONS':
+        return '', 204
+    data = request.get_json(silent=True) or {}
+    atomic = bool(data.get('atomic'))
+    try:
+        operations, invalid = parse_operations(data.get('operations'), atomic)
+    except BatchError as e:
+        error = {'error': str(e)}
+        if e.index is not None:
+            error['index'] = e.index
+        return jsonify(error), 400
+    results = list(invalid)
+    try:
+        if operations:
+            results += apply_batch(supabase, operations, atomic)
+    except AtomicBatchUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+    except Exception as e:
+        # An atomic batch was rolled back; the message names the failed operation
+        return jsonify({'error': getattr(e, 'message', None) or str(e)}), 409 if atomic else 500
+    finally:
+        if operations:
+            tables = {op.table for op in operations}
+            drop_cached(*tables, *{f'{op.table}:{op.id}' for op in operations if op.id is not None})
+    results.sort(key=lambda r: r['index'])
+    for result in results:
+        if result['status'] < 400:
+            table = RESOURCES[result['resource']].table
+            if result['op'] == 'delete':
+                portfolio_document.remove(table, [result['data']])
+            else:
+                portfolio_document.upsert(table, [result['data']])
+    return jsonify({
+        'results': results,
+        'applied': sum(1 for r in results if r['status'] < 400),
+        'failed': sum(1 for r in results if r['status'] >= 400),
+    }), 200
+
+# Whole-portfolio backup as NDJSON, streamed one page of one table at a time
+# (data_transfer.py). Blobs are referenced by hash; ?blobs=include also sends
+# each one once, base64 encoded, so the dump can seed an empty environment
+@app.route('/api/export', methods=['GET'])
+@require_auth
+def export_portfolio():
+    blobs = request.args.get('blobs', 'ref')
+    if blobs not in ('ref', 'include'):
+        return jsonify({'error': 'blobs must be ref or include'}), 400
+    response = app.response_class(
+        export_lines(supabase, blob_store, column_catalog, include_blobs=blobs == 'include'),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['Content-Disposition'] = content_disposition(f'portfolio-{date.today().isoformat()}.ndjson')
+    response.headers['Cache-Control'] = 'no-store'
+    # Streamed body: keep after_request hooks from buffering it
+    response.direct_passthrough = True
+    return response
+
+# Load an /api/export stream, upserting rows by id in bounded batches as the
+# body is read. The response is NDJSON too: a progress line per batch written,
+# an error line per rejected line or failed batch, then a summary
+@app.route('/api/import', methods=['POST', 'OPTIONS'])
+@require_auth
+@body_limit(IMPORT_MAX_CONTENT_LENGTH)
+def import_portfolio():
+    if request.method == 'OPTIONS':
+        return '', 204
+    bulk_import = BulkImport(supabase, blob_store)
+
+    def progress():
+        try:
+            for event in bulk_import.run(request.stream):
+                yield ndjson_line(event)
+        except Exception as e:
+            # Body over the cap or the client gone; headers are long sent, so
+            # report it in the stream and still write what was read
+            error = getattr(e, 'description', None) or str(e)
+            for event in bulk_import.abort(error):
+                yield ndjson_line(event)
+        finally:
+            if bulk_import.rows:
+                # Any cached read may be stale now
+                response_cache.clear()
+                logo_cache.clear()
+            if 'prof_lvl' in bulk_import.rows:
+                try:
+                    prof_registry.refresh()
+                except Exception:
+                    prof_registry.refresh_failed()
+            if bulk_import.rows and PORTFOLIO_DOCUMENT:
+                try:
+                    portfolio_document.rebuild()
+                except Exception as e:
+                    print(f'Portfolio document rebuild after import failed: {e}', file=sys.stderr, flush=True)
+
+    response = app.response_class(stream_with_context(progress()), mimetype='application/x-ndjson')
+    response.direct_passthrough = True
+    return response
+
 # Proficiency levels endpoint (for Skills dropdown)
 @app.route('/api/prof-levels', methods=['GET'])
+@cached_response('prof_lvl')
 def get_prof_levels():
     try:
         # Table name: prof_lvl with columns id (varchar/int) and level (text)
+        fields = FieldSelection('prof_lvl', request.args.get('fields'), column_catalog)
         response = supabase.table('prof_lvl').select('*').execute()
-        return jsonify(response.data), 200
+        # The registry needs whole rows, so fields only trims the response
+        prof_registry.refresh(response.data or [])
+        return jsonify(fields.project(response.data or [])), 200
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# /api/portfolio sections and the tables behind them
+PORTFOLIO_SECTIONS = {
+    'skills': 'skills',
+    'education': 'education',
+    'work': 'work_experience',
+    'community': 'community_service',
+    'projects': 'other_information',
+}
+
+def portfolio_queries(fields):
+    """{section: callable} fetching each /api/portfolio section"""
+    return {
+        'skills': lambda: supabase.table('skills').select(fields['skills'].select_list()).execute().data,
+        'education': lambda: strip_blobs('education', supabase.table('education').select(fields['education'].select_list()).order('start_date', desc=True).execute().data),
+        'work': lambda: strip_blobs('work_experience', supabase.table('work_experience').select(fields['work'].select_list()).order('start_date', desc=True).execute().data),
+        'community': lambda: supabase.table('community_service').select(fields['community'].select_list()).execute().data,
+        'projects': lambda: supabase.table('other_information').select(fields['projects'].select_list()).execute().data,
+    }
+
+def load_portfolio_document():
+    """Every section in full, for portfolio_document; raises if any fails"""
+    queries = portfolio_queries(section_fields(PORTFOLIO_SECTIONS, {}, column_catalog))
+    if prof_registry.is_stale():
+        queries['prof_lvl'] = prof_registry.rows
+    results, errors = run_concurrently(queries, PORTFOLIO_QUERY_TIMEOUT)
+    # Without fresh labels the registry keeps serving the last good ones
+    errors.pop('prof_lvl', None)
+    if errors:
+        raise RuntimeError('; '.join(f'{name}: {error}' for name, error in errors.items()))
+    return results
+
+def encode_portfolio_document(document, fmt):
+    body, mimetype = app.json.encode(document, fmt)
+    return body, mimetype, content_etag(body)
+
+# The default /api/portfolio body, held in memory as encoded bytes with a
+# version number (portfolio_document.py). Every write route below patches it,
+# and it is rebuilt from the tables at startup, every PORTFOLIO_REBUILD_INTERVAL
+# seconds and on POST /api/admin/portfolio-document. Each worker process keeps
+# its own copy, so writes served by another worker show up at the next rebuild
+portfolio_document = PortfolioDocument(
+    PORTFOLIO_SECTIONS, load_portfolio_document, encode_portfolio_document,
+    label_skills=prof_registry.apply
+)
+if PORTFOLIO_DOCUMENT:
+    portfolio_document_stop = portfolio_document.start()
+
+def blob_migrated(table, row_id):
+    """A row's hex blob was swapped for a reference: its cached logo, cached
+    responses and logo_version in portfolio_document are stale"""
+    drop_cached(table, f'{table}:{row_id}')
+    rows = supabase.table(table).select(column_catalog.select_without_blobs(table)).eq('id', row_id).execute().data
+    portfolio_document.upsert(table, rows)
+
+if os.getenv('BLOB_MIGRATION') == 'background':
+    # Move legacy inline hex blobs into the store without blocking startup
+    blob_migration, blob_migration_stop = start_background_migration(
+        supabase, blob_store, os.getenv('BLOB_MIGRATION_CHECKPOINT'), on_migrated=blob_migrated
+    )
+
+def serve_portfolio_document():
+    """The /api/portfolio response from portfolio_document, or None if it isn't built yet"""
+    fmt = response_format(request.accept_mimetypes)
+    entry = portfolio_document.encoded(fmt)
+    if entry is None:
+        return None
+    body, mimetype, etag, version = entry
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers['X-Portfolio-Version'] = str(version)
+    if msgpack is not None:
+        response.vary.add('Accept')
+    response.set_etag(etag)
+    if request.if_none_match.contains_weak(etag):
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+    # The compressed copy lives in response_cache, dropped by the same writes
+    return precompress(response, response_cache, ('portfolio-document', fmt), etag, body,
+                       list(PORTFOLIO_SECTIONS.values()) + ['prof_lvl'])
+
 # Get all portfolio data at once
 @app.route('/api/portfolio', methods=['GET'])
 def get_portfolio():
+    # ?fields[<section>]= selections, and requests before the document is
+    # first built, query the tables
+    if PORTFOLIO_DOCUMENT and not any(key.startswith('fields') for key in request.args):
+        response = serve_portfolio_document()
+        if response is not None:
+            return response
+    return query_portfolio()
+
+@cached_response('skills', 'prof_lvl', 'education', 'work_experience', 'community_service', 'other_information')
+def query_portfolio():
     try:
-        skills = supabase.table('skills').select('*').execute()
-        education = supabase.table('education').select('*').order('start_date', desc=True).execute()
-        work = supabase.table('work_experience').select('*').order('start_date', desc=True).execute()
-        community = supabase.table('community_service').select('*').execute()
-        projects = supabase.table('other_information').select('*').execute()
-        # Try to resolve proficiency labels for portfolio skills as well
-        skills_data = skills.data or []
+        # All sections are independent, so query them concurrently and return
+        # whatever arrived before the deadline alongside a per-section error map
+        # ?fields[<section>]=a,b narrows any section to the listed fields
+        fields = section_fields(PORTFOLIO_SECTIONS, request.args, column_catalog)
+        queries = portfolio_queries(fields)
+        if prof_registry.is_stale():
+            # Reload the label map alongside the sections instead of after them
+            queries['prof_lvl'] = prof_registry.rows
+        results, errors = run_concurrently(queries, PORTFOLIO_QUERY_TIMEOUT)
+        if not results.keys() - {'prof_lvl'}:
+            return jsonify({'error': 'All portfolio queries failed', 'errors': errors}), 500
+        # Resolve proficiency labels for portfolio skills as well
+        skills_data = results.get('skills') or []
         try:
-            levels_res = supabase.table('prof_lvl').select('*').execute()
-            levels = levels_res.data or []
-            level_map = {}
-            for lvl in levels:
-                key_raw = lvl.get('id') or lvl.get('level') or lvl.get('value')
-                key_str = str(key_raw).strip() if key_raw is not None else None
-                label = (
-                    lvl.get('level')
-                    or lvl.get('label')
-                    or lvl.get('name')
-                    or lvl.get('level_name')
-                    or key_str
-                )
-                if key_str:
-                    level_map[key_str] = label
-            for s in skills_data:
-                prof_val = s.get('proficiency')
-                key_lookup = str(prof_val).strip() if prof_val is not None else None
-                if key_lookup and key_lookup in level_map:
-                    s['proficiency_label'] = level_map.get(key_lookup)
+            prof_registry.apply(skills_data)
         except Exception:
             pass
 
+        # Label lookup failures only degrade the skills section, as before
+        errors.pop('prof_lvl', None)
+        if errors:
+            # Don't pin a partial page in the cache
+            g.skip_response_cache = True
         return jsonify({
-            'skills': skills_data,
-            'education': education.data,
-            'work': work.data,
-            'community': community.data,
-            'projects': projects.data
+            'skills': fields['skills'].project(skills_data),
+            'education': fields['education'].project(results.get('education') or []),
+            'work': fields['work'].project(results.get('work') or []),
+            'community': fields['community'].project(results.get('community') or []),
+            'projects': fields['projects'].project(results.get('projects') or []),
+            'errors': errors
         }), 200
+    except FieldSelectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
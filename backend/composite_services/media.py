@@ -0,0 +1,93 @@
+import os
+import struct
+from datetime import datetime, timezone
+
+from shared.timing import phase
+
+
+def decode_hex_blob(value):
+    """Decode a blob stored by the upload routes as '\\x' + hex.
+
+    Older logo uploads were written with a doubled backslash, which Postgres
+    stores as the hex text itself; those are unwrapped a second time.
+    """
+    with phase('decode'):
+        hex_str = value.lstrip('\\')
+        if hex_str.startswith('x'):
+            hex_str = hex_str[1:]
+        data = bytes.fromhex(hex_str)
+        if data.startswith(b'\\x'):
+            try:
+                data = bytes.fromhex(data[2:].decode('ascii'))
+            except ValueError:
+                pass
+        return data
+
+
+def sniff_image_mimetype(data):
+    """Guess a logo's MIME type from its leading bytes (PNG if unknown)"""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'GIF'):
+        return 'image/gif'
+    if data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        return 'image/webp'
+    head = data[:256].lstrip()
+    if head.startswith(b'<svg') or (head.startswith(b'<?xml') and b'<svg' in data[:1024]):
+        return 'image/svg+xml'
+    return 'image/png'
+
+
+def sniff_evidence_mimetype(data):
+    """Guess an evidence file's MIME type from its leading bytes"""
+    if data.startswith(b'%PDF'):
+        return 'application/pdf'
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'GIF'):
+        return 'image/gif'
+    return 'application/octet-stream'
+
+
+def image_dimensions(data):
+    """(width, height) of a PNG, GIF or JPEG from its leading bytes, else None"""
+    if data.startswith(b'\x89PNG') and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+    if data.startswith(b'GIF') and len(data) >= 10:
+        return struct.unpack('<HH', data[6:10])
+    if data.startswith(b'\xff\xd8'):
+        # Walk the JPEG segments up to the first start-of-frame marker
+        pos = 2
+        while pos + 9 <= len(data):
+            if data[pos] != 0xFF:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xFF:
+                pos += 1
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return width, height
+            pos += 2 + struct.unpack('>H', data[pos + 2:pos + 4])[0]
+    return None
+
+
+def evidence_metadata(filename, size, sha256, head):
+    """Metadata recorded for an uploaded evidence file (artefacts_evidence_meta).
+
+    head is the start of the file, enough to sniff the type and read image
+    dimensions from.
+    """
+    meta = {
+        'filename': os.path.basename((filename or '').replace('\\', '/')) or 'evidence',
+        'size': size,
+        'mime_type': sniff_evidence_mimetype(head),
+        'sha256': sha256,
+        'uploaded_at': datetime.now(timezone.utc).isoformat(),
+    }
+    dimensions = image_dimensions(head)
+    if dimensions:
+        meta['width'], meta['height'] = dimensions
+    return meta
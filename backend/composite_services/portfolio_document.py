@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+import time
+
+from shared.table_columns import strip_blobs
+
+PORTFOLIO_DOCUMENT = os.getenv('PORTFOLIO_DOCUMENT', 'on').lower() not in ('0', 'off', 'false', 'no')
+# Seconds between full rebuilds, which pick up writes the document never saw
+# (other worker processes, edits made directly in the database)
+PORTFOLIO_REBUILD_INTERVAL = float(os.getenv('PORTFOLIO_REBUILD_INTERVAL', '300'))
+# Sections the query path orders by start_date, newest first
+DATED_SECTIONS = ('education', 'work')
+
+
+class PortfolioDocument:
+    """The default /api/portfolio body, kept in memory and patched by writes.
+
+    Rows are held per section by id. Write routes upsert or remove the rows
+    they touched and bump the version; the first read of a version encodes
+    it (JSON or MessagePack) and later reads send those bytes as they are.
+    rebuild() reloads every section from scratch and reports whether the
+    patched copy had drifted from the tables.
+    """
+
+    def __init__(self, sections, load, encode, label_skills=None):
+        self.sections = sections  # section -> table
+        self.load = load  # () -> {section: rows}, raising if any section fails
+        self.encode = encode  # (document, fmt) -> (body, mimetype, etag)
+        self.label_skills = label_skills
+        self.version = 0
+        self.built_at = None
+        self.last_error = None
+        self.stats = {'rebuilds': 0, 'rebuild_failures': 0, 'drift_repairs': 0, 'patches': 0}
+        self._section_of = {table: section for section, table in sections.items()}
+        self._rows = None
+        self._patched = 0  # row patches so far, to spot ones landing during a rebuild
+        self._encoded = {}  # fmt -> (body, mimetype, etag, version)
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._rows is not None
+
+    def rebuild(self, attempts=3):
+        """Reload every section; returns True if the document had drifted"""
+        with self._rebuild_lock:
+            for _ in range(attempts):
+                seen = self._patched
+                try:
+                    loaded = self.load()
+                except Exception as e:
+                    with self._lock:
+                        self.stats['rebuild_failures'] += 1
+                        self.last_error = str(e)
+                    raise
+                rows = {
+                    section: {row['id']: row for row in strip_blobs(table, loaded.get(section) or [])}
+                    for section, table in self.sections.items()
+                }
+                with self._lock:
+                    if self._patched != seen:
+                        # A write was patched in meanwhile, and the load may predate it
+                        continue
+                    drifted = self._rows is not None and rows != self._rows
+                    if rows != self._rows:
+                        self._rows = rows
+                        self._changed()
+                    self.built_at = time.time()
+                    self.last_error = None
+                    self.stats['rebuilds'] += 1
+                    self.stats['drift_repairs'] += drifted
+                    return drifted
+            raise RuntimeError('The portfolio kept changing during the rebuild')
+
+    def start(self, interval=PORTFOLIO_REBUILD_INTERVAL):
+        """Build now, then rebuild every interval seconds on a daemon thread;
+        returns the event that stops it"""
+        stop = threading.Event()
+
+        def run():
+            while True:
+                try:
+                    if self.rebuild():
+                        print('Portfolio document had drifted from the tables; rebuilt', file=sys.stderr, flush=True)
+                except Exception as e:
+                    print(f'Portfolio document rebuild failed: {e}', file=sys.stderr, flush=True)
+                # Until the first build succeeds reads take the query path; retry sooner
+                if stop.wait(interval if self.ready else min(interval, 30)):
+                    return
+
+        threading.Thread(target=run, name='portfolio-document', daemon=True).start()
+        return stop
+
+    def upsert(self, table, rows):
+        """Patch in rows returned by an insert or update of table"""
+        section = self._section_of.get(table)
+        if section is None or not rows:
+            return
+        rows = strip_blobs(table, [dict(row) for row in rows])
+        with self._lock:
+            if self._rows is None:
+                return
+            current = self._rows[section]
+            for row in rows:
+                current[row['id']] = {**current.get(row['id'], {}), **row}
+            self._patched += 1
+            self.stats['patches'] += 1
+            self._changed()
+
+    def remove(self, table, rows):
+        """Drop rows returned by a delete from table"""
+        section = self._section_of.get(table)
+        if section is None or not rows:
+            return
+        with self._lock:
+            if self._rows is None:
+                return
+            for row in rows:
+                self._rows[section].pop(row['id'], None)
+            self._patched += 1
+            self.stats['patches'] += 1
+            self._changed()
+
+    def touch(self):
+        """New version without row changes, e.g. when proficiency labels change"""
+        with self._lock:
+            self._changed()
+
+    def encoded(self, fmt='json'):
+        """(body, mimetype, etag, version) of the current document, or None
+        before the first build"""
+        with self._lock:
+            if self._rows is None:
+                return None
+            entry = self._encoded.get(fmt)
+            if entry is not None:
+                return entry
+            version = self.version
+            snapshot = {section: list(rows.values()) for section, rows in self._rows.items()}
+        # Encoded outside the lock: labelling may reload prof_lvl, whose
+        # change callback touches this document
+        entry = (*self.encode(self._document(snapshot), fmt), version)
+        with self._lock:
+            if self.version == version:
+                self._encoded[fmt] = entry
+        return entry
+
+    def status(self):
+        with self._lock:
+            return {
+                'ready': self._rows is not None,
+                'version': self.version,
+                'built_at': self.built_at,
+                'rows': {section: len(rows) for section, rows in (self._rows or {}).items()},
+                'last_error': self.last_error,
+                **self.stats,
+            }
+
+    def _changed(self):
+        self.version += 1
+        self._encoded.clear()
+
+    def _document(self, snapshot):
+        document = {}
+        for section, rows in snapshot.items():
+            if section in DATED_SECTIONS:
+                # Postgres puts nulls first in descending order
+                rows.sort(key=lambda r: (r.get('start_date') is None, r.get('start_date') or ''), reverse=True)
+            else:
+                rows.sort(key=lambda r: r['id'])
+            document[section] = rows
+        if self.label_skills is not None and 'skills' in document:
+            # Labels are stamped onto copies, so a label change never needs a patch
+            document['skills'] = [dict(row) for row in document['skills']]
+            try:
+                self.label_skills(document['skills'])
+            except Exception:
+                pass
+        document['errors'] = {}
+        return document
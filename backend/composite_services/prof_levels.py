@@ -0,0 +1,112 @@
+import threading
+import time
+
+
+class ProficiencyRegistry:
+    """Shared proficiency id -> label map built from the prof_lvl table.
+
+    The map is built once and rebuilt when it is older than ``ttl`` seconds
+    or when fresh prof_lvl rows are handed to ``refresh``. If a reload fails
+    the previous map keeps being served.
+    """
+
+    def __init__(self, loader, ttl=600, on_change=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.on_change = on_change
+        self._rows = None
+        self._label_map = {}
+        self._labels = {}  # _label_map plus the int form of numeric ids, for apply
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def rows(self):
+        """The raw prof_lvl rows, loading them if the registry is stale"""
+        self._ensure_fresh()
+        return self._rows or []
+
+    def label_map(self):
+        self._ensure_fresh()
+        return self._label_map
+
+    def refresh(self, rows=None):
+        """Rebuild the map, from the given rows or by reloading prof_lvl"""
+        if rows is None:
+            rows = self.loader() or []
+        label_map = build_label_map(rows)
+        with self._lock:
+            changed = label_map != self._label_map
+            self._rows = rows
+            self._label_map = label_map
+            self._labels = with_int_keys(label_map)
+            self._loaded_at = time.monotonic()
+        if changed and self.on_change is not None:
+            self.on_change()
+
+    def apply(self, skills):
+        """Stamp proficiency_label onto each skill whose proficiency has a label.
+
+        One pass of dict lookups on the proficiency values as they are; only
+        values missing from the map (padded strings, floats) are normalized.
+        """
+        self._ensure_fresh()
+        label_map, labels = self._label_map, self._labels
+        if not labels:
+            return skills
+        for skill in skills:
+            value = skill.get('proficiency')
+            label = labels.get(value) if isinstance(value, (str, int)) else None
+            if label is None:
+                label = _lookup(label_map, value)
+            if label is not None:
+                skill['proficiency_label'] = label
+        return skills
+
+    def refresh_failed(self):
+        """Keep serving the last good map and retry after another TTL"""
+        with self._lock:
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if not self.is_stale():
+            return
+        try:
+            self.refresh()
+        except Exception:
+            self.refresh_failed()
+
+
+def build_label_map(levels):
+    level_map = {}
+    for lvl in levels:
+        key_raw = lvl.get('id') or lvl.get('level') or lvl.get('value')
+        key_str = str(key_raw).strip() if key_raw is not None else None
+        label = (
+            lvl.get('level')
+            or lvl.get('label')
+            or lvl.get('name')
+            or lvl.get('level_name')
+            or key_str
+        )
+        if key_str:
+            level_map[key_str] = label
+    return level_map
+
+
+def with_int_keys(label_map):
+    """label_map with each numeric id also keyed by its int, as integer
+    proficiency columns hold it"""
+    labels = dict(label_map)
+    for key, label in label_map.items():
+        if key.lstrip('-').isdigit():
+            labels.setdefault(int(key), label)
+    return labels
+
+
+def _lookup(label_map, prof_val):
+    if prof_val is None:
+        return None
+    return label_map.get(str(prof_val).strip())
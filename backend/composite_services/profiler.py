@@ -0,0 +1,280 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import g, request
+from werkzeug.wsgi import ClosingIterator
+
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+# Minimum seconds between the start of two sessions, and the longest session
+PROFILER_COOLDOWN = float(os.getenv('PROFILER_COOLDOWN', '60'))
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+TRACEMALLOC_FRAMES = 25
+
+MODES = ('sample', 'cprofile', 'tracemalloc')
+# What tracemalloc sessions watch unless told otherwise: the routes that hold
+# whole files in memory
+BLOB_ENDPOINTS = (
+    'upload_e_portfolio_file', 'download_e_portfolio_file', 'preview_e_portfolio_file',
+    'upload_education_logo', 'get_education_logo', 'upload_work_logo', 'get_work_logo',
+)
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class ProfilerCooldown(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Profiler was used recently; retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class ProfileSession:
+    """One profiling run over a time window or the next N matching requests.
+
+    - ``sample``: a thread reads every thread's stack each ``interval`` and
+      counts them as folded stacks (flamegraph.pl, speedscope).
+    - ``cprofile``: matching requests run under cProfile, merged into one
+      pstats dump.
+    - ``tracemalloc``: traces allocations from start to stop and reports the
+      lines that grew most plus each request's peak.
+
+    cProfile and tracemalloc see the whole process, so only one request is
+    measured at a time; requests that overlap it are counted as skipped.
+    Requests are measured until their response is closed, which includes
+    streaming a download.
+    """
+
+    def __init__(self, mode, seconds, requests=None, endpoints=None, interval=0.005, output='pstats'):
+        self.mode = mode
+        self.seconds = seconds
+        self.max_requests = requests
+        self.endpoints = frozenset(endpoints) if endpoints else None
+        self.interval = interval
+        self.output = output
+        self.started_at = time.time()
+        self.finished_at = None
+        self.measured = 0
+        self.skipped = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._busy = False
+        self._active = {}  # thread id -> endpoint, for requests being measured
+        self._stacks = Counter()
+        self._stats = None
+        self._peaks = []
+        if mode == 'tracemalloc':
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._baseline = tracemalloc.take_snapshot()
+            self._snapshot = None
+        if mode == 'sample':
+            threading.Thread(target=self._sample, name='profiler-sampler', daemon=True).start()
+        self._timer = threading.Timer(seconds, self.stop)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def matches(self, endpoint):
+        return not self.done.is_set() and (self.endpoints is None or endpoint in self.endpoints)
+
+    def request_started(self, endpoint):
+        """Begin measuring the current request; returns what request_finished needs, or None"""
+        with self._lock:
+            if self.done.is_set():
+                return None
+            if self.mode == 'sample':
+                self._active[threading.get_ident()] = endpoint
+                return ('sample', threading.get_ident(), endpoint)
+            if self._busy:
+                self.skipped += 1
+                return None
+            self._busy = True
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+            return ('cprofile', profile, endpoint)
+        tracemalloc.reset_peak()
+        return ('tracemalloc', tracemalloc.get_traced_memory()[0], endpoint)
+
+    def request_finished(self, measurement):
+        kind, value, endpoint = measurement
+        if kind == 'cprofile':
+            value.disable()
+        elif kind == 'tracemalloc':
+            current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (value, value)
+        with self._lock:
+            if kind == 'sample':
+                self._active.pop(value, None)
+            else:
+                self._busy = False
+            if kind == 'cprofile':
+                if self._stats is None:
+                    self._stats = pstats.Stats(value)
+                else:
+                    self._stats.add(value)
+            elif kind == 'tracemalloc':
+                self._peaks.append({'endpoint': endpoint, 'peak_bytes': peak - value,
+                                    'retained_bytes': current - value})
+            self.measured += 1
+            reached = self.max_requests is not None and self.measured >= self.max_requests
+        if reached:
+            self.stop()
+
+    def stop(self):
+        with self._lock:
+            if self.done.is_set():
+                return
+            self._timer.cancel()
+            if self.mode == 'tracemalloc':
+                self._snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            self.finished_at = time.time()
+            self.done.set()
+
+    def status(self):
+        status = {
+            'mode': self.mode,
+            'status': 'done' if self.done.is_set() else 'running',
+            'started_at': self.started_at,
+            'ends_at': self.finished_at or self.started_at + self.seconds,
+            'requests_measured': self.measured,
+            'requests_skipped': self.skipped,
+        }
+        if self.max_requests is not None:
+            status['requests'] = self.max_requests
+        if self.endpoints is not None:
+            status['endpoints'] = sorted(self.endpoints)
+        return status
+
+    def result(self):
+        """(body, mimetype, filename) of a finished session"""
+        if self.mode == 'sample':
+            lines = [f'{stack} {count}' for stack, count in self._stacks.most_common()]
+            return '\n'.join(lines) + '\n', 'text/plain', 'profile.folded'
+        if self.mode == 'cprofile':
+            if self._stats is None:
+                return 'No requests were profiled\n', 'text/plain', 'profile.txt'
+            if self.output == 'text':
+                out = io.StringIO()
+                self._stats.stream = out
+                self._stats.sort_stats('cumulative').print_stats(60)
+                return out.getvalue(), 'text/plain', 'profile.txt'
+            # Same bytes as Stats.dump_stats: loadable with pstats, snakeviz, ...
+            return marshal.dumps(self._stats.stats), 'application/octet-stream', 'profile.pstats'
+        top = self._snapshot.compare_to(self._baseline, 'lineno')[:30]
+        return json.dumps({
+            **self.status(),
+            'measurements': self._peaks,
+            'top_allocations': [{
+                'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                'size_diff_bytes': stat.size_diff,
+                'size_bytes': stat.size,
+                'count_diff': stat.count_diff,
+            } for stat in top],
+        }, indent=2), 'application/json', 'tracemalloc.json'
+
+    def _sample(self):
+        me = threading.get_ident()
+        while not self.done.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                # With an endpoint filter only threads serving those requests count
+                idents = list(self._active) if self.endpoints is not None else [i for i in frames if i != me]
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._stacks[_folded(frame)] += 1
+
+
+class Profiler:
+    """At most one ProfileSession at a time, with a cooldown between starts"""
+
+    def __init__(self, enabled=PROFILER_ENABLED, cooldown=PROFILER_COOLDOWN, max_seconds=PROFILER_MAX_SECONDS):
+        self.enabled = enabled
+        self.cooldown = cooldown
+        self.max_seconds = max_seconds
+        self.session = None
+        self._last_start = None
+        self._lock = threading.Lock()
+
+    def start(self, options, known_endpoints):
+        """Start a session from request options; raises ValueError, ProfilerBusy or ProfilerCooldown"""
+        mode = options.get('mode', 'sample')
+        if mode not in MODES:
+            raise ValueError(f'mode must be one of {", ".join(MODES)}')
+        seconds = float(options.get('seconds', 10))
+        if not 0 < seconds <= self.max_seconds:
+            raise ValueError(f'seconds must be between 0 and {self.max_seconds:g}')
+        requests = options.get('requests')
+        if requests is not None and (not isinstance(requests, int) or not 0 < requests <= 1000):
+            raise ValueError('requests must be an integer between 1 and 1000')
+        endpoints = options.get('endpoint')
+        if isinstance(endpoints, str):
+            endpoints = [endpoints]
+        if endpoints is None and mode == 'tracemalloc':
+            endpoints = BLOB_ENDPOINTS
+        unknown = [e for e in endpoints or () if e not in known_endpoints]
+        if unknown:
+            raise ValueError(f'Unknown endpoint: {", ".join(unknown)}')
+        interval = float(options.get('interval_ms', 5)) / 1000
+        if not 0.001 <= interval <= 0.1:
+            raise ValueError('interval_ms must be between 1 and 100')
+        output = options.get('format', 'pstats')
+        if output not in ('pstats', 'text'):
+            raise ValueError('format must be pstats or text')
+
+        with self._lock:
+            if self.session is not None and not self.session.done.is_set():
+                raise ProfilerBusy('A profiling session is already running')
+            now = time.monotonic()
+            if self._last_start is not None and now - self._last_start < self.cooldown:
+                raise ProfilerCooldown(int(self.cooldown - (now - self._last_start)) + 1)
+            self._last_start = now
+            self.session = ProfileSession(mode, seconds, requests, endpoints, interval, output)
+            return self.session
+
+    def install(self, app):
+        """Measure matching requests while a session runs; one attribute check otherwise"""
+        if not self.enabled:
+            return
+
+        @app.before_request
+        def start_request_profile():
+            session = self.session
+            if session is None or not session.matches(request.endpoint):
+                return
+            measurement = session.request_started(request.endpoint)
+            if measurement is not None:
+                g.profile = (session, measurement)
+
+        @app.after_request
+        def finish_request_profile(response):
+            entry = g.pop('profile', None)
+            if entry is not None:
+                session, measurement = entry
+                # On close, so that streamed bodies are measured as well
+                finish = lambda: session.request_finished(measurement)
+                if response.direct_passthrough:
+                    # werkzeug hands these bodies to the server as they are,
+                    # without running close callbacks
+                    response.response = ClosingIterator(response.response, finish)
+                else:
+                    response.call_on_close(finish)
+            return response
+
+
+def _folded(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
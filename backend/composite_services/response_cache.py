@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total size, with a TTL.
+
+    Each entry can carry tags (e.g. table names) so that writes can drop
+    every entry that depends on the data they changed. Every invalidation
+    bumps a per-tag generation: a read-through fill takes generations()
+    before it loads, and set(since=...) discards the value if a write
+    invalidated one of its tags in the meantime.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size, tags, expires_at)
+        self._tag_index = {}           # tag -> set of keys
+        self._generations = {}         # tag -> number of invalidations
+        self._epoch = 0                # number of clear() calls
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[3] <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generations(self, tags):
+        """Snapshot of the tags' invalidation counts, to pass to set() as since"""
+        with self._lock:
+            return self._epoch, {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def set(self, key, value, size=0, tags=(), ttl=None, since=None):
+        """Store value; returns False if it was too large or, given since, stale"""
+        if size > self.max_bytes:
+            return False
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            if since is not None and self._changed_since(since):
+                # Loaded before a write that invalidated it
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, tags, expires_at)
+            self._bytes += size
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags; returns how many were dropped"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                keys |= self._tag_index.get(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+            self._bytes = 0
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _changed_since(self, since):
+        epoch, generations = since
+        return epoch != self._epoch or any(
+            self._generations.get(tag, 0) != generation for tag, generation in generations.items()
+        )
+
+    def _remove(self, key):
+        _, size, tags, _ = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
@@ -0,0 +1,87 @@
+import os
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from shared.timing import phase
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # without it every client gets JSON
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson and can answer in MessagePack.
+
+    Output matches the stdlib provider's except that non-ASCII text is sent
+    as UTF-8 rather than \\u escapes: keys are sorted, dates, decimals, UUIDs
+    and dataclasses go through Flask's own conversions, and debug mode
+    indents. ``encoder='stdlib'`` keeps Flask's encoder but still adds
+    MessagePack negotiation.
+    """
+
+    def __init__(self, app, encoder='orjson'):
+        super().__init__(app)
+        if encoder not in ('orjson', 'stdlib'):
+            raise ValueError(f'Unknown JSON encoder: {encoder}')
+        self.encoder = encoder if orjson is not None else 'stdlib'
+
+    def dumps(self, obj, **kwargs):
+        if self.encoder == 'stdlib' or kwargs:
+            # Callers passing json.dumps options get the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def encode(self, obj, fmt='json'):
+        """(body, mimetype) of obj as a JSON or MessagePack response body"""
+        with phase('serialize'):
+            return self._encode(obj, fmt)
+
+    def _encode(self, obj, fmt):
+        if fmt == 'msgpack':
+            return msgpack.packb(obj, default=self.default, use_bin_type=True), MSGPACK_MIMETYPES[0]
+        if self.encoder == 'stdlib':
+            return super().response(obj).get_data(), self.mimetype
+        return orjson.dumps(obj, default=self.default, option=self._options(indent=self._indent())) + b'\n', self.mimetype
+
+    def response(self, *args, **kwargs):
+        fmt = response_format(request.accept_mimetypes) if has_request_context() else 'json'
+        body, mimetype = self.encode(self._prepare_response_obj(args, kwargs), fmt)
+        response = self._app.response_class(body, mimetype=mimetype)
+        if msgpack is not None:
+            response.vary.add('Accept')
+        return response
+
+    def _indent(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def _options(self, indent=False):
+        # Route dates and dataclasses through Flask's default() so they look
+        # the same as before (RFC 822 dates); allow int keys like json.dumps
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+
+def response_format(accept_mimetypes):
+    """'msgpack' when the client prefers MessagePack over JSON, else 'json'"""
+    if msgpack is None:
+        return 'json'
+    best = accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return 'msgpack' if best in MSGPACK_MIMETYPES else 'json'
+
+
+def json_provider_from_env(app):
+    """FastJSONProvider using the encoder named by JSON_ENCODER (orjson or stdlib)"""
+    return FastJSONProvider(app, os.getenv('JSON_ENCODER', 'orjson').lower())
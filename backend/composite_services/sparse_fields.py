@@ -0,0 +1,100 @@
+from shared.table_columns import BLOB_SUMMARIES
+
+# Columns a client may ask for with ?fields=, per table. Work and community
+# rows have been written under two naming schemes, so both are listed; names
+# the live schema doesn't have are rejected once ColumnCatalog has loaded.
+FIELD_WHITELIST = {
+    'skills': ['id', 'skill_name', 'proficiency', 'category', 'proficiency_label'],
+    'prof_lvl': ['id', 'level'],
+    'education': ['id', 'institute_name', 'certification', 'start_date', 'finish_date',
+                  'logo_version', 'has_logo'],
+    'work_experience': ['id', 'company', 'position', 'company_name', 'role', 'start_date',
+                        'end_date', 'description', 'logo_version', 'has_logo'],
+    'community_service': ['id', 'organization', 'programme_name', 'role', 'start_date',
+                          'end_date', 'description'],
+    'other_information': ['id', 'project_name', 'description', 'technologies', 'url',
+                          'images', 'files'],
+    'e_portfolio': ['id', 'activity_name', 'activity_type', 'start_date', 'finish_date',
+                    'organisation_module', 'description', 'what_i_did', 'skills_tools_acquired',
+                    'takeaways', 'artefacts_evidence_links_texts', 'relevance_career',
+                    'evidence_count', 'artefacts_evidence_meta'],
+}
+
+# Fields computed by the composite service, and the columns they are built from
+DERIVED_FIELDS = {
+    'has_logo': ['logo_version'],
+    'proficiency_label': ['proficiency'],
+}
+
+
+class FieldSelectionError(ValueError):
+    """Unknown or malformed ?fields= list (HTTP 400)"""
+
+
+class FieldSelection:
+    """A validated ?fields= list for one table.
+
+    select_list() is the PostgREST projection to fetch (requested columns
+    plus whatever derived fields and cursors need) and project() trims the
+    finished rows back to what was asked for. Without a fields list both
+    leave the response exactly as before.
+    """
+
+    def __init__(self, table, raw, catalog):
+        self.table = table
+        self.catalog = catalog
+        self.fields = None
+        if raw is None:
+            return
+        fields = [f.strip() for f in raw.split(',') if f.strip()]
+        if not fields:
+            raise FieldSelectionError('fields must name at least one field')
+        allowed = FIELD_WHITELIST[table]
+        columns = catalog.columns(table)
+        summaries = BLOB_SUMMARIES.get(table, {})
+        for field in fields:
+            if field not in allowed:
+                raise FieldSelectionError(f"Unknown field '{field}' for {table}")
+            source = DERIVED_FIELDS.get(field, [field])[0]
+            if (columns is not None and source not in columns
+                    and source not in summaries.values()):
+                raise FieldSelectionError(f"Unknown field '{field}' for {table}")
+        self.fields = list(dict.fromkeys(fields))
+
+    def select_list(self, extra=()):
+        """PostgREST select for the requested fields plus extra columns"""
+        if self.fields is None:
+            return self.catalog.select_without_blobs(self.table)
+        wanted = []
+        for field in list(self.fields) + list(extra):
+            wanted.extend(DERIVED_FIELDS.get(field, [field]))
+        columns = self.catalog.columns(self.table)
+        blob_for = {summary: blob for blob, summary in BLOB_SUMMARIES.get(self.table, {}).items()}
+        selected = []
+        for column in wanted:
+            # Before migration 001 (or with an unknown schema) a summary is
+            # computed by strip_blobs from the blob column itself
+            if column in blob_for and (columns is None or column not in columns):
+                column = blob_for[column]
+            if column not in selected:
+                selected.append(column)
+        return ','.join(selected)
+
+    def project(self, rows):
+        """Rows reduced to the requested fields"""
+        if self.fields is None:
+            return rows
+        return [{field: row.get(field) for field in self.fields} for row in rows]
+
+
+def section_fields(sections, args, catalog):
+    """FieldSelection per /api/portfolio section from ?fields[<section>]=..."""
+    if 'fields' in args:
+        raise FieldSelectionError('Use fields[<section>]= to choose portfolio fields')
+    unknown = [key[7:-1] for key in args if key.startswith('fields[') and key[7:-1] not in sections]
+    if unknown:
+        raise FieldSelectionError(f"Unknown portfolio section '{unknown[0]}'")
+    return {
+        section: FieldSelection(table, args.get(f'fields[{section}]'), catalog)
+        for section, table in sections.items()
+    }
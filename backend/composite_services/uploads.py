@@ -0,0 +1,105 @@
+import hashlib
+import tempfile
+from functools import wraps
+
+from flask import Request, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Files up to this size stay in memory while parsing; larger ones spill to disk
+SPOOL_MAX_BYTES = 512 * 1024
+
+
+# Default of UploadRequest.route_max_content_length: use MAX_CONTENT_LENGTH
+MAX_CONTENT_LENGTH_FROM_CONFIG = object()
+
+
+class FileTooLarge(RequestEntityTooLarge):
+    def __init__(self, filename, limit):
+        super().__init__(f'File {filename or "upload"} too large (max {limit // (1024 * 1024)} MB per file)')
+
+
+class HashingSpooledFile(tempfile.SpooledTemporaryFile):
+    """Spooled temp file that tracks size and SHA-256 as parts are written,
+    and aborts the parse as soon as a file passes its size limit."""
+
+    def __init__(self, filename=None, max_bytes=None):
+        super().__init__(max_size=SPOOL_MAX_BYTES, mode='w+b')
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise FileTooLarge(self.filename, self.max_bytes)
+        self._sha256.update(data)
+        return super().write(data)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def head(self, length=1024):
+        """First bytes of the file, leaving the position at the start"""
+        self.seek(0)
+        data = self.read(length)
+        self.seek(0)
+        return data
+
+
+class UploadRequest(Request):
+    """Request whose multipart file parts are hashed and size-checked while
+    they stream in, instead of being read into memory afterwards"""
+
+    max_file_size = None
+    # Set by body_limit() on routes with their own cap; None there means no cap
+    route_max_content_length = MAX_CONTENT_LENGTH_FROM_CONFIG
+
+    @property
+    def max_content_length(self):
+        if self.route_max_content_length is MAX_CONTENT_LENGTH_FROM_CONFIG:
+            return super().max_content_length
+        return self.route_max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpooledFile(filename, self.max_file_size)
+
+
+def upload_limits(per_file, total):
+    """Reject oversized uploads from Content-Length before reading the body,
+    and cap each file part while the multipart body is parsed."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return f(*args, **kwargs)
+            if request.content_length is not None and request.content_length > total:
+                return jsonify({'error': f'Upload too large (max {total // (1024 * 1024)} MB per request)'}), 413
+            request.max_file_size = per_file
+            try:
+                # Parse now so size errors surface as 413 rather than a handler 500
+                request.files
+            except RequestEntityTooLarge as e:
+                return jsonify({'error': e.description}), 413
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def body_limit(limit):
+    """Cap the request body of a route at limit bytes instead of
+    MAX_CONTENT_LENGTH (None for no cap), for routes that stream their body.
+    Bodies declaring more in Content-Length are refused with 413 before the
+    handler runs; longer chunked bodies fail while being read."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method == 'OPTIONS':
+                return f(*args, **kwargs)
+            if limit is not None and request.content_length is not None and request.content_length > limit:
+                return jsonify({'error': f'Request body too large (max {limit // (1024 * 1024)} MB)'}), 413
+            request.route_max_content_length = limit
+            return f(*args, **kwargs)
+        return wrapper
+    return decorator
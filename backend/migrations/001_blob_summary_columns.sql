@@ -0,0 +1,27 @@
+-- Lightweight summaries of the hex blob columns, so list endpoints can report
+-- logos and evidence files without selecting the blobs themselves.
+-- Run once in the Supabase SQL editor.
+
+-- logo_version must stay in sync with media.blob_version in the composite
+-- service: the first 16 hex chars of md5 over the stored value.
+alter table education
+  add column if not exists logo_version text
+  generated always as (left(md5(organization_logo::text), 16)) stored;
+
+alter table work_experience
+  add column if not exists logo_version text
+  generated always as (left(md5(organization_logo::text), 16)) stored;
+
+-- artefacts_evidence_files holds either a single hex string or an array of them
+alter table e_portfolio
+  add column if not exists evidence_count integer
+  generated always as (
+    case jsonb_typeof(artefacts_evidence_files)
+      when 'array' then jsonb_array_length(artefacts_evidence_files)
+      when 'string' then 1
+      else 0
+    end
+  ) stored;
+
+-- Make the new columns visible to PostgREST straight away
+notify pgrst, 'reload schema';
@@ -0,0 +1,51 @@
+-- Remove one evidence file from an activity inside the database, so the
+-- composite service doesn't have to read and rewrite the whole
+-- artefacts_evidence_files array. The row is locked while it is edited, so
+-- concurrent removals can't undo each other.
+-- Run once in the Supabase SQL editor.
+
+-- Returns {"status": "removed", "remaining": n}, or a status of
+-- "not_found" (no such activity), "no_files" or "out_of_range".
+create or replace function remove_evidence_file(p_item_id bigint, p_file_index integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+  files jsonb;
+begin
+  select artefacts_evidence_files into files
+  from e_portfolio where id = p_item_id
+  for update;
+  if not found then
+    return jsonb_build_object('status', 'not_found');
+  end if;
+
+  -- A single file is stored as a plain string rather than an array
+  case jsonb_typeof(files)
+    when 'string' then
+      if p_file_index <> 0 then
+        return jsonb_build_object('status', 'out_of_range');
+      end if;
+      files := null;
+    when 'array' then
+      if p_file_index < 0 or p_file_index >= jsonb_array_length(files) then
+        return jsonb_build_object('status', 'out_of_range');
+      end if;
+      files := files - p_file_index;
+      if jsonb_array_length(files) = 0 then
+        files := null;
+      end if;
+    else
+      return jsonb_build_object('status', 'no_files');
+  end case;
+
+  update e_portfolio set artefacts_evidence_files = files where id = p_item_id;
+  return jsonb_build_object('status', 'removed', 'remaining', coalesce(jsonb_array_length(files), 0));
+end;
+$$;
+
+-- Only the service role (the composite service) may call it through PostgREST
+revoke execute on function remove_evidence_file(bigint, integer) from public, anon, authenticated;
+grant execute on function remove_evidence_file(bigint, integer) to service_role;
+
+notify pgrst, 'reload schema';
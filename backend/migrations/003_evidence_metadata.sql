@@ -0,0 +1,62 @@
+-- Per-file metadata for e-portfolio evidence, recorded by the upload route so
+-- file listings, previews and downloads never have to inspect the blobs.
+-- Run once in the Supabase SQL editor, after 002.
+
+-- Array of objects in the same order as artefacts_evidence_files:
+-- {filename, size, mime_type, sha256, uploaded_at, width?, height?}
+-- Files uploaded before this migration have no entry.
+alter table e_portfolio
+  add column if not exists artefacts_evidence_meta jsonb;
+
+-- Same as 002, but keeps artefacts_evidence_meta in step with the files
+create or replace function remove_evidence_file(p_item_id bigint, p_file_index integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+  files jsonb;
+  meta jsonb;
+begin
+  select artefacts_evidence_files, artefacts_evidence_meta into files, meta
+  from e_portfolio where id = p_item_id
+  for update;
+  if not found then
+    return jsonb_build_object('status', 'not_found');
+  end if;
+
+  -- A single file is stored as a plain string rather than an array
+  case jsonb_typeof(files)
+    when 'string' then
+      if p_file_index <> 0 then
+        return jsonb_build_object('status', 'out_of_range');
+      end if;
+      files := null;
+    when 'array' then
+      if p_file_index < 0 or p_file_index >= jsonb_array_length(files) then
+        return jsonb_build_object('status', 'out_of_range');
+      end if;
+      files := files - p_file_index;
+      if jsonb_array_length(files) = 0 then
+        files := null;
+      end if;
+    else
+      return jsonb_build_object('status', 'no_files');
+  end case;
+
+  if files is null or jsonb_typeof(meta) <> 'array' then
+    meta := null;
+  else
+    meta := meta - p_file_index;
+  end if;
+
+  update e_portfolio
+  set artefacts_evidence_files = files, artefacts_evidence_meta = meta
+  where id = p_item_id;
+  return jsonb_build_object('status', 'removed', 'remaining', coalesce(jsonb_array_length(files), 0));
+end;
+$$;
+
+revoke execute on function remove_evidence_file(bigint, integer) from public, anon, authenticated;
+grant execute on function remove_evidence_file(bigint, integer) to service_role;
+
+notify pgrst, 'reload schema';
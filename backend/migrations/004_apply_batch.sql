@@ -0,0 +1,104 @@
+-- Applies the operations of POST /api/batch in one round trip and one
+-- transaction. Run once in the Supabase SQL editor, after 003.
+--
+-- p_operations is an array of {op: create|update|delete, table, id?, data?}
+-- already validated by the API (known tables and columns only). The result
+-- is one {status, data?, error?} per operation, in order.
+--
+-- With p_atomic every operation must succeed or nothing is kept: the first
+-- failure (including an update or delete of a missing row) raises and rolls
+-- the whole batch back. Otherwise each operation runs in its own savepoint
+-- and failures are reported in its result.
+
+create or replace function apply_batch_operation(p_operation jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+  tbl text := p_operation->>'table';
+  data jsonb := coalesce(p_operation->'data', '{}'::jsonb);
+  cols text;
+  affected jsonb;
+begin
+  if tbl is null or tbl not in ('skills', 'education', 'work_experience', 'community_service',
+                                'other_information', 'e_portfolio') then
+    raise exception 'unknown table %', tbl using errcode = '22023';
+  end if;
+  select string_agg(format('%I', key), ', ') into cols from jsonb_object_keys(data) as key;
+
+  case p_operation->>'op'
+    when 'create' then
+      if cols is null then
+        execute format('insert into %I default values returning to_jsonb(%I.*)', tbl, tbl)
+          into affected;
+      else
+        execute format('insert into %I (%s) select %s from jsonb_populate_record(null::%I, $1) returning to_jsonb(%I.*)',
+                       tbl, cols, cols, tbl, tbl)
+          into affected using data;
+      end if;
+      return jsonb_build_object('status', 201, 'data', affected);
+    when 'update' then
+      if cols is null then
+        raise exception 'no fields to update' using errcode = '22023';
+      end if;
+      execute format('update %I set (%s) = (select %s from jsonb_populate_record(null::%I, $1)) where id = $2 returning to_jsonb(%I.*)',
+                     tbl, cols, cols, tbl, tbl)
+        into affected using data, (p_operation->>'id')::bigint;
+    when 'delete' then
+      execute format('delete from %I where id = $1 returning jsonb_build_object(''id'', id)', tbl)
+        into affected using (p_operation->>'id')::bigint;
+    else
+      raise exception 'unknown operation %', p_operation->>'op' using errcode = '22023';
+  end case;
+
+  if affected is null then
+    return jsonb_build_object('status', 404, 'error', 'not found');
+  end if;
+  return jsonb_build_object('status', 200, 'data', affected);
+end;
+$$;
+
+create or replace function apply_batch(p_operations jsonb, p_atomic boolean default false)
+returns jsonb
+language plpgsql
+as $$
+declare
+  operation jsonb;
+  idx integer := 0;
+  result jsonb;
+  results jsonb := '[]'::jsonb;
+begin
+  for operation in select value from jsonb_array_elements(p_operations) loop
+    if p_atomic then
+      result := apply_batch_operation(operation);
+      if (result->>'status')::integer >= 400 then
+        raise exception 'operation %: %', idx, result->>'error' using errcode = 'P0002';
+      end if;
+    else
+      begin
+        result := apply_batch_operation(operation);
+      exception when others then
+        -- Invalid input and constraint violations are the client's to fix
+        result := jsonb_build_object(
+          'status', case when left(sqlstate, 2) in ('22', '23') then 400 else 500 end,
+          'error', sqlerrm);
+      end;
+    end if;
+    results := results || jsonb_build_array(result);
+    idx := idx + 1;
+  end loop;
+  return results;
+exception when others then
+  if p_atomic and sqlerrm not like 'operation %' then
+    raise exception 'operation %: %', idx, sqlerrm using errcode = sqlstate;
+  end if;
+  raise;
+end;
+$$;
+
+revoke execute on function apply_batch_operation(jsonb) from public, anon, authenticated;
+revoke execute on function apply_batch(jsonb, boolean) from public, anon, authenticated;
+grant execute on function apply_batch_operation(jsonb) to service_role;
+grant execute on function apply_batch(jsonb, boolean) to service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,35 @@
+-- Called by POST /api/import after it has written rows with their own ids.
+-- Run once in the Supabase SQL editor, after 004.
+--
+-- Upserting explicit ids leaves each table's id sequence where it was, so the
+-- next create would reuse an imported id. This moves the sequence of every
+-- listed table past its largest id. Tables whose id has no sequence are
+-- skipped. The result has one row per table whose sequence was moved.
+
+create or replace function sync_id_sequences(p_tables text[])
+returns table (synced_table text)
+language plpgsql
+as $$
+declare
+  tbl text;
+  seq text;
+begin
+  foreach tbl in array p_tables loop
+    if tbl not in ('prof_lvl', 'skills', 'education', 'work_experience', 'community_service',
+                   'other_information', 'e_portfolio') then
+      raise exception 'unknown table %', tbl using errcode = '22023';
+    end if;
+    seq := pg_get_serial_sequence(format('%I', tbl), 'id');
+    if seq is not null then
+      execute format('select setval(%L, greatest((select max(id) from %I), 1))', seq, tbl);
+      synced_table := tbl;
+      return next;
+    end if;
+  end loop;
+end;
+$$;
+
+revoke execute on function sync_id_sequences(text[]) from public, anon, authenticated;
+grant execute on function sync_id_sequences(text[]) to service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,33 @@
+-- Called by the blob migration (composite_services/blob_migration.py) to
+-- swap an inline hex blob for its blob store reference.
+-- Run once in the Supabase SQL editor, after 005.
+--
+-- The new value is only written if the column still holds the value the
+-- migration read, compared as JSON (bytea as its \x hex text, as PostgREST
+-- returns it). A row written in between is left alone, so the swap can't
+-- undo a concurrent upload or evidence edit. The result has one row if the
+-- value was swapped and none otherwise.
+
+create or replace function swap_blob_value(p_table text, p_id bigint, p_column text, p_expected jsonb, p_value jsonb)
+returns table (swapped_id bigint)
+language plpgsql
+as $$
+begin
+  if (p_table, p_column) not in (('education', 'organization_logo'), ('work_experience', 'organization_logo'),
+                                 ('e_portfolio', 'artefacts_evidence_files')) then
+    raise exception 'unknown blob column %.%', p_table, p_column using errcode = '22023';
+  end if;
+  return query execute format(
+    'update %I set %I = %s where id = $1 and to_jsonb(%I) = $2 returning id::bigint',
+    p_table, p_column,
+    -- References go into the bytea logo columns as their UTF-8 text
+    case when p_column = 'organization_logo' then 'convert_to($3 #>> ''{}'', ''UTF8'')' else '$3' end,
+    p_column
+  ) using p_id, p_expected, p_value;
+end;
+$$;
+
+revoke execute on function swap_blob_value(text, bigint, text, jsonb, jsonb) from public, anon, authenticated;
+grant execute on function swap_blob_value(text, bigint, text, jsonb, jsonb) to service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+
+import httpx
+from gotrue.http_clients import SyncClient as AuthHttpClient
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client, SupabaseAuthClient, SupabaseStorageClient
+from supabase.lib.client_options import ClientOptions
+
+from shared import timing
+from shared.metrics import REGISTRY, Histogram
+
+UPSTREAM_SECONDS = Histogram(
+    'supabase_request_duration_seconds',
+    'Time to the response headers of calls to Supabase, by service, table, operation and status',
+    ('service', 'table', 'operation', 'status'),
+)
+
+
+class PoolSettings:
+    """Connection pool and timeout settings for HTTP traffic to Supabase.
+
+    ``read_timeout`` of None keeps each client library's own default (5s for
+    PostgREST and Auth, 20s for Storage). ``keepalive_expiry`` is how long an
+    idle connection is kept open for reuse; the httpx default of 5 seconds
+    means a fresh TCP + TLS handshake after almost any pause in traffic.
+    HTTP/2 needs the optional ``h2`` package (pip install httpx[http2]).
+    """
+
+    def __init__(self, max_connections=100, max_keepalive=20, keepalive_expiry=120.0,
+                 connect_timeout=5.0, read_timeout=None, pool_timeout=5.0, http2=False):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self.http2 = http2
+
+    def limits(self, max_connections=None):
+        max_connections = max_connections or self.max_connections
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(self.max_keepalive, max_connections),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self, default_read, pool=None):
+        if isinstance(default_read, httpx.Timeout):
+            default_read = default_read.read
+        read = self.read_timeout if self.read_timeout is not None else default_read
+        return httpx.Timeout(read, connect=self.connect_timeout,
+                             pool=self.pool_timeout if pool is None else pool)
+
+
+def settings_from_env():
+    """PoolSettings from the SUPABASE_HTTP_* environment variables"""
+    read_timeout = os.getenv('SUPABASE_HTTP_READ_TIMEOUT')
+    return PoolSettings(
+        max_connections=int(os.getenv('SUPABASE_HTTP_MAX_CONNECTIONS', '100')),
+        max_keepalive=int(os.getenv('SUPABASE_HTTP_MAX_KEEPALIVE', '20')),
+        keepalive_expiry=float(os.getenv('SUPABASE_HTTP_KEEPALIVE_EXPIRY', '120')),
+        connect_timeout=float(os.getenv('SUPABASE_HTTP_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(read_timeout) if read_timeout else None,
+        pool_timeout=float(os.getenv('SUPABASE_HTTP_POOL_TIMEOUT', '5')),
+        http2=os.getenv('SUPABASE_HTTP2', '').lower() in ('1', 'true', 'yes'),
+    )
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    """httpx transport that counts requests against new connections.
+
+    Every request that did not open a connection reused a pooled one, so
+    ``requests - new_connections`` is the reuse count; ``tls_handshakes``
+    shows what the pool saved on HTTPS.
+    """
+
+    def __init__(self, settings):
+        super().__init__(limits=settings.limits(), http2=settings.http2)
+        self.settings = settings
+        self._counts = {'requests': 0, 'new_connections': 0, 'tls_handshakes': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        outer = request.extensions.get('trace')
+
+        def trace(event, info):
+            # httpcore reports connection setup as it happens, so this is
+            # exact even when several requests race for the pool
+            if event == 'connection.connect_tcp.complete':
+                self._count('new_connections')
+            elif event == 'connection.start_tls.complete':
+                self._count('tls_handshakes')
+            if outer is not None:
+                outer(event, info)
+
+        request.extensions['trace'] = trace
+        self._count('requests')
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = super().handle_request(request)
+            status = response.status_code
+            return response
+        except httpx.TransportError:
+            self._count('errors')
+            raise
+        finally:
+            observe_upstream(request, status, time.perf_counter() - started)
+
+    def stats(self):
+        """Request and connection counters plus the pool's current state"""
+        with self._lock:
+            stats = dict(self._counts)
+        stats['reused_connections'] = max(stats['requests'] - stats['new_connections'] - stats['errors'], 0)
+        connections = list(self._pool.connections)
+        stats['open_connections'] = len(connections)
+        stats['idle_connections'] = sum(1 for c in connections if c.is_idle())
+        stats['max_connections'] = self.settings.max_connections
+        stats['http2'] = self.settings.http2
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+
+class MeteredAsyncTransport(httpx.AsyncHTTPTransport):
+    """Async transport that records supabase_request_duration_seconds"""
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = await super().handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            observe_upstream(request, status, time.perf_counter() - started)
+
+
+def observe_upstream(request, status, seconds):
+    service, table, operation = upstream_call(request)
+    UPSTREAM_SECONDS.labels(service, table, operation, status).observe(seconds)
+    if timing.current() is not None:
+        timing.record('upstream', seconds, f'{service} {operation} {table}'.rstrip(),
+                      {'call': f'{service} {operation} {table}'.rstrip(), 'shape': query_shape(request),
+                       'status': status, 'ms': round(seconds * 1000, 2)})
+
+
+def query_shape(request):
+    """A request's query with filter values masked, e.g. select=*&id=eq.?&order=id.asc.
+
+    select, order and limit are kept as they are; they describe the shape.
+    """
+    if request.url.path.strip('/').split('/')[0] != 'rest':
+        return None
+    shape = []
+    for name, value in request.url.params.multi_items():
+        if name not in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns'):
+            operator, dot, _ = value.partition('.')
+            value = f'{operator}.?' if dot else '?'
+        shape.append(f'{name}={value}')
+    return '&'.join(shape)
+
+
+def upstream_call(request):
+    """(service, table, operation) of a request to Supabase.
+
+    Storage calls are labelled by bucket and auth calls by endpoint, never by
+    object path or user, to keep the number of series bounded.
+    """
+    parts = request.url.path.strip('/').split('/')
+    service = parts[0] if parts else ''
+    if service == 'rest':
+        if len(parts) < 3 or not parts[2]:
+            return 'rest', '', 'schema'
+        if parts[2] == 'rpc':
+            return 'rest', parts[3] if len(parts) > 3 else '', 'rpc'
+        operation = _REST_OPERATIONS.get(request.method, request.method.lower())
+        if operation == 'insert' and 'resolution=' in request.headers.get('Prefer', ''):
+            operation = 'upsert'
+        return 'rest', parts[2], operation
+    if service == 'storage':
+        # storage/v1/object/{bucket}/{path}, object/list/{bucket}, object/move, bucket/...
+        rest = parts[2:]
+        if rest[:1] != ['object']:
+            return 'storage', '', rest[0] if rest else ''
+        rest = rest[1:]
+        if rest[:1] in (['move'], ['copy']):
+            return 'storage', '', rest[0]
+        if rest[:1] in (['list'], ['public'], ['sign'], ['upload'], ['authenticated'], ['info']):
+            return 'storage', rest[1] if len(rest) > 1 else '', rest[0]
+        return 'storage', rest[0] if rest else '', _STORAGE_OPERATIONS.get(request.method, request.method.lower())
+    if service == 'auth':
+        return 'auth', '', parts[2] if len(parts) > 2 else ''
+    return service, '', request.method.lower()
+
+
+_REST_OPERATIONS = {'GET': 'select', 'HEAD': 'count', 'POST': 'insert', 'PATCH': 'update', 'DELETE': 'delete'}
+_STORAGE_OPERATIONS = {'GET': 'download', 'HEAD': 'info', 'POST': 'upload', 'PUT': 'update', 'DELETE': 'remove'}
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def shared_transport():
+    """The process-wide transport every pooled Supabase client sends through"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = MeteredTransport(settings_from_env())
+        return _transport
+
+
+def pool_stats():
+    return shared_transport().stats()
+
+
+def _pool_families():
+    transport = _transport
+    if not isinstance(transport, MeteredTransport):
+        return
+    stats = transport.stats()
+    for key, kind, documentation in (
+        ('requests', 'counter', 'Requests sent through the shared Supabase connection pool'),
+        ('new_connections', 'counter', 'Connections the pool had to open'),
+        ('tls_handshakes', 'counter', 'TLS handshakes the pool had to make'),
+        ('errors', 'counter', 'Requests that failed at the transport level'),
+        ('open_connections', 'gauge', 'Connections currently open'),
+        ('idle_connections', 'gauge', 'Open connections waiting for reuse'),
+    ):
+        name = f'supabase_pool_{key}' + ('_total' if kind == 'counter' else '')
+        yield name, kind, documentation, [(name, {}, stats[key])]
+
+REGISTRY.register_collector(_pool_families)
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    def __init__(self, base_url, transport, **kwargs):
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return SyncClient(base_url=base_url, headers=headers, transport=self._transport,
+                          timeout=self._transport.settings.timeout(timeout))
+
+
+class _PooledStorageClient(SupabaseStorageClient):
+    def __init__(self, url, headers, timeout, transport):
+        self._transport = transport
+        super().__init__(url, headers, timeout)
+
+    def _create_session(self, base_url, headers, timeout):
+        return SyncClient(base_url=base_url, headers=headers, transport=self._transport,
+                          timeout=self._transport.settings.timeout(timeout))
+
+
+class PooledClient(Client):
+    """supabase Client whose PostgREST, Auth and Storage clients all share one
+    connection pool instead of opening three of their own"""
+
+    def __init__(self, supabase_url, supabase_key, transport):
+        self._transport = transport
+        # A fresh options object: the library's default instance is shared,
+        # and Client.__init__ writes this client's key into its headers
+        super().__init__(supabase_url, supabase_key, ClientOptions())
+
+    def _init_supabase_auth_client(self, auth_url, client_options):
+        return SupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            # 5s read timeout: the httpx default gotrue otherwise runs with
+            http_client=AuthHttpClient(transport=self._transport, timeout=self._transport.settings.timeout(5)),
+        )
+
+    def _init_postgrest_client(self, rest_url, supabase_key, headers, schema, timeout):
+        client = _PooledPostgrestClient(rest_url, self._transport, headers=headers, schema=schema, timeout=timeout)
+        client.auth(token=supabase_key)
+        return client
+
+    def _init_storage_client(self, storage_url, headers, storage_client_timeout):
+        return _PooledStorageClient(storage_url, headers, storage_client_timeout, self._transport)
+
+
+def create_pooled_client(supabase_url, supabase_key):
+    """Drop-in for supabase.create_client that sends through shared_transport()"""
+    return PooledClient(supabase_url, supabase_key, shared_transport())
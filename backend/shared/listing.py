@@ -0,0 +1,181 @@
+import base64
+import json
+from datetime import date, datetime
+
+# Largest page a client may ask for with ?limit=
+MAX_PAGE_SIZE = 500
+
+# Per table: the sort orders a list may use (the first is the default) and the
+# columns it may be filtered on, with the type each filter value must parse as.
+#   order=id          id ascending
+#   order=start_date  newest first (nulls first, as before), ties broken by id
+LIST_SPECS = {
+    'skills': {
+        'order': ['id'],
+        'filters': {'id': 'int', 'category': 'text', 'proficiency': 'int'},
+    },
+    'education': {
+        'order': ['start_date', 'id'],
+        'filters': {'id': 'int', 'institute_name': 'text', 'certification': 'text',
+                    'start_date': 'date', 'finish_date': 'date'},
+    },
+    'work_experience': {
+        'order': ['start_date', 'id'],
+        'filters': {'id': 'int', 'start_date': 'date', 'end_date': 'date'},
+    },
+    'community_service': {
+        'order': ['id', 'start_date'],
+        'filters': {'id': 'int', 'role': 'text', 'start_date': 'date', 'end_date': 'date'},
+    },
+    'other_information': {
+        'order': ['id'],
+        'filters': {'id': 'int'},
+    },
+    'e_portfolio': {
+        'order': ['id', 'start_date'],
+        'filters': {'id': 'int', 'activity_type': 'text', 'start_date': 'date', 'finish_date': 'date'},
+    },
+}
+
+# Operators per filter type: ?col=v is eq, ?col__in=a,b and ?col__gte=v etc.
+_OPERATORS = {
+    'text': {'eq', 'in'},
+    'int': {'eq', 'in', 'gt', 'gte', 'lt', 'lte'},
+    'date': {'eq', 'in', 'gt', 'gte', 'lt', 'lte'},
+}
+
+
+class ListQueryError(ValueError):
+    """Invalid limit, cursor, order or filter in a list request (HTTP 400)"""
+
+
+class ListQuery:
+    """Limit, keyset cursor, sort order and filters for a list endpoint,
+    parsed from query args and pushed down to PostgREST.
+
+    Query args other than limit, after, order and the table's filters are
+    ignored. Without ?limit= the whole (filtered) table is returned, as before.
+    """
+
+    def __init__(self, table, args):
+        spec = LIST_SPECS[table]
+        self.table = table
+        self.limit = _parse_limit(args.get('limit'))
+        self.order = args.get('order') or spec['order'][0]
+        if self.order not in spec['order']:
+            raise ListQueryError(f"order must be one of: {', '.join(spec['order'])}")
+        self.filters = _parse_filters(spec['filters'], args)
+        self.after = _decode_cursor(args.get('after'), self.order) if args.get('after') else None
+
+    def apply(self, query):
+        """Add filters, ordering, the cursor condition and the limit to a select"""
+        for column, operator, value in self.filters:
+            if operator == 'in':
+                query = query.filter(column, 'in', '({})'.format(','.join(_quote(v) for v in value)))
+            else:
+                query = query.filter(column, operator, value)
+
+        if self.order == 'id':
+            query.params = query.params.add('order', 'id.asc')
+            if self.after is not None:
+                query = query.filter('id', 'gt', self.after['id'])
+        else:
+            query.params = query.params.add('order', f'{self.order}.desc.nullsfirst,id.desc')
+            if self.after is not None:
+                query.params = query.params.add('or', self._after_sort_value())
+
+        if self.limit is not None:
+            # One extra row tells us whether there is a next page
+            query = query.limit(self.limit + 1)
+        return query
+
+    def key_columns(self):
+        """Columns every fetched row needs for the next cursor"""
+        return ['id'] if self.order == 'id' else ['id', self.order]
+
+    def page(self, rows):
+        """(rows of this page, cursor for the next page or None)"""
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, self.cursor_for(rows[-1])
+
+    def cursor_for(self, row):
+        key = {'id': row['id']}
+        if self.order != 'id':
+            key['v'] = row.get(self.order)
+        return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+    def _after_sort_value(self):
+        # Rows after (v, id) in "column desc nulls first, id desc" order
+        column, value, row_id = self.order, self.after.get('v'), self.after['id']
+        if value is None:
+            return f'(and({column}.is.null,id.lt.{row_id}),{column}.not.is.null)'
+        value = _quote(value)
+        return f'({column}.lt.{value},and({column}.eq.{value},id.lt.{row_id}))'
+
+
+def _parse_limit(raw):
+    if raw is None or raw == '':
+        return None
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ListQueryError('limit must be an integer')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ListQueryError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+
+def _parse_filters(columns, args):
+    filters = []
+    for key in args.keys():
+        column, _, operator = key.partition('__')
+        if column not in columns:
+            if operator:
+                raise ListQueryError(f'Cannot filter on {column}')
+            continue
+        operator = operator or 'eq'
+        if operator not in _OPERATORS[columns[column]]:
+            raise ListQueryError(f'Unsupported filter {key}')
+        for raw in args.getlist(key):
+            if operator == 'in':
+                values = [_parse_value(columns[column], column, v) for v in raw.split(',') if v != '']
+                if not values:
+                    raise ListQueryError(f'{key} needs at least one value')
+                filters.append((column, 'in', values))
+            else:
+                filters.append((column, operator, _parse_value(columns[column], column, raw)))
+    return filters
+
+
+def _parse_value(kind, column, raw):
+    try:
+        if kind == 'int':
+            return str(int(raw))
+        if kind == 'date':
+            return date.fromisoformat(raw).isoformat()
+    except ValueError:
+        raise ListQueryError(f'Invalid {kind} for {column}: {raw}')
+    if len(raw) > 200:
+        raise ListQueryError(f'Filter value for {column} is too long')
+    return raw
+
+
+def _quote(value):
+    # Double-quote values so commas, colons and parentheses stay literal
+    return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def _decode_cursor(raw, order):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+        row_id = int(key['id'])
+        value = key.get('v')
+        if order != 'id' and value is not None:
+            # Must be a date/timestamp; it is sent back to PostgREST verbatim
+            value = str(value)
+            datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ListQueryError('Invalid cursor')
+    return {'id': row_id, 'v': value}
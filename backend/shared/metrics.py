@@ -0,0 +1,262 @@
+import hmac
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+# Latency buckets in seconds, and size buckets in bytes (256 B .. 16 MB)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Registry:
+    """Metrics of one process, rendered in the Prometheus text format.
+
+    Besides metrics that record as they go, collectors can be registered:
+    callables run at scrape time that return ``(name, type, help, samples)``
+    families, for values something else already counts (cache stats, pool
+    state).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    def exposition(self):
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines = []
+        for metric in metrics:
+            _family(lines, metric.name, metric.type, metric.documentation, metric.samples())
+        for collect in collectors:
+            for name, kind, documentation, samples in collect():
+                _family(lines, name, kind, documentation, samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        """The series for these label values (in labelnames order)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(self.name, dict(zip(self.labelnames, key)))
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def _child(self):
+        return _Value()
+
+
+class _Buckets:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': _number(bound)}, cumulative
+        yield f'{name}_sum', labels, total
+        yield f'{name}_count', labels, cumulative
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+
+# -- HTTP server metrics --------------------------------------------------------
+
+REQUESTS = Counter('http_requests_total', 'Requests handled, by Flask endpoint, method and status',
+                   ('endpoint', 'method', 'status'))
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Time to produce a response, by endpoint',
+                            ('endpoint', 'method'))
+RESPONSE_BYTES = Histogram('http_response_size_bytes', 'Response body size, by endpoint',
+                           ('endpoint',), buckets=SIZE_BUCKETS)
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests being handled right now, by endpoint', ('endpoint',))
+
+
+def record_request(endpoint, method, status, seconds, size=None):
+    """Count one handled request (for servers not wired through instrument_app)"""
+    REQUESTS.labels(endpoint, method, status).inc()
+    REQUEST_SECONDS.labels(endpoint, method).observe(seconds)
+    if size is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(size)
+
+
+def instrument_app(app, path='/metrics'):
+    """Record request metrics for every request to app and serve them at path.
+
+    Call it right after creating the app, before CORS and other after_request
+    hooks are registered: Flask runs those hooks in reverse order, so the
+    size recorded here is that of the final (e.g. compressed) body. Scrapes
+    need ``Authorization: Bearer $METRICS_TOKEN`` when METRICS_TOKEN is set.
+    """
+    @app.before_request
+    def start_request_timer():
+        g.metrics_endpoint = request.endpoint or 'unmatched'
+        g.metrics_started = time.perf_counter()
+        IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+    @app.after_request
+    def record_response_size(response):
+        g.metrics_status = response.status_code
+        size = response.content_length
+        if size is None and not response.is_streamed:
+            size = response.calculate_content_length()
+        if size is not None:
+            RESPONSE_BYTES.labels(g.get('metrics_endpoint', 'unmatched')).observe(size)
+        return response
+
+    @app.teardown_request
+    def record_request_duration(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        endpoint = g.metrics_endpoint
+        IN_FLIGHT.labels(endpoint).dec()
+        REQUESTS.labels(endpoint, request.method, g.pop('metrics_status', 500)).inc()
+        REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started)
+
+    token = os.getenv('METRICS_TOKEN')
+
+    def metrics():
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(REGISTRY.exposition(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule(path, 'metrics', metrics, methods=['GET'])
+
+
+# -- Caches -------------------------------------------------------------------
+
+_caches = {}
+
+def watch_cache(name, cache):
+    """Export a cache's stats() (hits, misses, evictions, entries, bytes) as cache_* metrics"""
+    _caches[name] = cache
+
+
+def _cache_families():
+    stats = [(name, cache.stats()) for name, cache in list(_caches.items())]
+    for key, kind, documentation in (
+        ('hits', 'counter', 'Cache lookups that found a live entry'),
+        ('misses', 'counter', 'Cache lookups that found nothing or an expired entry'),
+        ('evictions', 'counter', 'Entries dropped to stay within the size bounds'),
+        ('entries', 'gauge', 'Entries currently cached'),
+        ('bytes', 'gauge', 'Bytes currently cached'),
+    ):
+        suffix = '_total' if kind == 'counter' else ''
+        name = f'cache_{key}{suffix}'
+        yield name, kind, documentation, [(name, {'cache': cache}, s[key]) for cache, s in stats if key in s]
+
+REGISTRY.register_collector(_cache_families)
+
+
+# -- Text format ----------------------------------------------------------------
+
+def _family(lines, name, kind, documentation, samples):
+    lines.append(f'# HELP {name} {documentation}')
+    lines.append(f'# TYPE {name} {kind}')
+    for sample_name, labels, value in samples:
+        if labels:
+            rendered = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f'{sample_name}{{{rendered}}} {_number(value)}')
+        else:
+            lines.append(f'{sample_name} {_number(value)}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+
+# Blob columns per table and the lightweight column that summarizes each one.
+# The summary columns are generated by backend/migrations/001_blob_summary_columns.sql
+BLOB_SUMMARIES = {
+    'education': {'organization_logo': 'logo_version'},
+    'work_experience': {'organization_logo': 'logo_version'},
+    'e_portfolio': {'artefacts_evidence_files': 'evidence_count'},
+}
+
+
+def blob_version(value):
+    """Short content version of a stored hex blob.
+
+    Matches the logo_version column generated in Postgres
+    (left(md5(organization_logo::text), 16)), so list rows and the logo
+    route agree on the version without either decoding the blob.
+    """
+    return hashlib.md5(value.encode()).hexdigest()[:16]
+
+
+def evidence_count(value):
+    """Number of files in an artefacts_evidence_files value (string or list)"""
+    if isinstance(value, list):
+        return len(value)
+    return 1 if value else 0
+
+
+_SUMMARIZERS = {
+    'logo_version': lambda value: blob_version(value) if value else None,
+    'evidence_count': evidence_count,
+}
+
+
+class ColumnCatalog:
+    """Column names per table, read once from PostgREST's OpenAPI description"""
+
+    def __init__(self, client, retry_after=60):
+        self.client = client
+        self.retry_after = retry_after
+        self._columns = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def columns(self, table):
+        """Column names of a table, or None if the schema couldn't be read"""
+        with self._lock:
+            if self.needs_load():
+                try:
+                    self._columns = self._load()
+                except Exception:
+                    self._failed_at = time.monotonic()
+            if self._columns is None:
+                return None
+            return self._columns.get(table)
+
+    def needs_load(self):
+        """True when the next columns() call would fetch the schema"""
+        return self._columns is None and (
+            self._failed_at is None or time.monotonic() - self._failed_at >= self.retry_after
+        )
+
+    def has_column(self, table, column):
+        """Whether a column exists; False if the schema couldn't be read"""
+        return column in (self.columns(table) or [])
+
+    def select_without_blobs(self, table):
+        """PostgREST select list for a table with blob columns swapped for their summaries.
+
+        If a summary column hasn't been migrated yet the blob is still selected
+        (and summarized by strip_blobs) so responses keep the same shape.
+        """
+        columns = self.columns(table)
+        if not columns:
+            return '*'
+        blobs = BLOB_SUMMARIES.get(table, {})
+        selected = [c for c in columns if c not in blobs]
+        for blob, summary in blobs.items():
+            if blob in columns and summary not in columns:
+                selected.append(blob)
+        return ','.join(selected)
+
+    def _load(self):
+        response = self.client.postgrest.session.get('/')
+        response.raise_for_status()
+        definitions = response.json().get('definitions') or {}
+        return {
+            table: list((definition.get('properties') or {}).keys())
+            for table, definition in definitions.items()
+        }
+
+
+def strip_blobs(table, rows):
+    """Replace blob columns in rows with has_logo / logo_version / evidence_count"""
+    blobs = BLOB_SUMMARIES.get(table)
+    if not blobs:
+        return rows
+    for row in rows:
+        for blob, summary in blobs.items():
+            if blob in row:
+                row[summary] = _SUMMARIZERS[summary](row.pop(blob))
+        if 'logo_version' in row:
+            row['has_logo'] = row['logo_version'] is not None
+    return rows
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+
+# Requests slower than this are logged with their phase breakdown; a random
+# REQUEST_LOG_SAMPLE_RATE share (0..1) of the others is logged too
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '0'))
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'on').lower() not in ('0', 'off', 'false', 'no')
+# Cross-origin pages only see Server-Timing when allowed by Timing-Allow-Origin
+TIMING_ALLOW_ORIGIN = os.getenv('TIMING_ALLOW_ORIGIN', '*')
+
+logger = logging.getLogger('slow_requests')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Phases of one request (auth, upstream calls, decode, serialize, ...).
+
+    Phases may be recorded from fan-out threads and asyncio tasks, as long
+    as they run in a copy of the request's context.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []   # (name, seconds, description)
+        self.queries = []  # query shapes of the upstream calls
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, description=None, query=None):
+        with self._lock:
+            self.phases.append((name, seconds, description))
+            if query is not None:
+                self.queries.append(query)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total=None):
+        """Server-Timing header value: one entry per upstream call, the other
+        phases summed by name, then the total"""
+        entries, sums = [], {}
+        with self._lock:
+            phases = list(self.phases)
+        for name, seconds, description in phases:
+            if name == 'upstream':
+                entries.append(_entry(name, seconds, description))
+            else:
+                sums[name] = sums.get(name, 0.0) + seconds
+        entries[:0] = [_entry(name, seconds) for name, seconds in sums.items()]
+        entries.append(_entry('total', self.elapsed() if total is None else total))
+        return ', '.join(entries)
+
+    def log_record(self, method, path, endpoint, status, size, total=None):
+        with self._lock:
+            phases, queries = list(self.phases), list(self.queries)
+        return {
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round((self.elapsed() if total is None else total) * 1000, 2),
+            'response_bytes': size,
+            'phases': [{'name': n, 'ms': round(s * 1000, 2), **({'desc': d} if d else {})} for n, s, d in phases],
+            'queries': queries,
+        }
+
+
+def begin():
+    """Start timing the current request (or task); returns (timings, reset token)"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record(name, seconds, description=None, query=None):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, description, query)
+
+
+@contextmanager
+def phase(name, description=None):
+    """Time the enclosed block as a phase of the current request, if any"""
+    if _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started, description)
+
+
+def should_log(seconds):
+    return seconds * 1000 >= SLOW_REQUEST_MS or (REQUEST_LOG_SAMPLE_RATE and random.random() < REQUEST_LOG_SAMPLE_RATE)
+
+
+def log_request(record):
+    logger.warning(json.dumps(record, default=str))
+
+
+def time_requests(app):
+    """Add a Server-Timing header to app's responses and log slow requests.
+
+    Register it before hooks whose time should count (compression), since
+    Flask runs after_request hooks in reverse order.
+    """
+    @app.before_request
+    def start_phase_timer():
+        g.timings, g.timings_token = begin()
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = g.get('timings')
+        if timings is None:
+            return response
+        total = timings.elapsed()
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = timings.server_timing(total)
+            if TIMING_ALLOW_ORIGIN:
+                response.headers['Timing-Allow-Origin'] = TIMING_ALLOW_ORIGIN
+        if should_log(total):
+            log_request(timings.log_record(request.method, request.full_path.rstrip('?'), request.endpoint,
+                                           response.status_code, response.content_length, total))
+        return response
+
+    @app.teardown_request
+    def stop_phase_timer(exc):
+        token = g.pop('timings_token', None)
+        if token is not None:
+            try:
+                end(token)
+            except ValueError:
+                # Reset from a different context (the request context was
+                # pushed elsewhere); the var goes away with that context
+                pass
+
+
+def _entry(name, seconds, description=None):
+    entry = f'{name};dur={seconds * 1000:.1f}'
+    if description:
+        entry += ';desc="{}"'.format(description.replace('\\', '\\\\').replace('"', '\\"'))
+    return entry
@@ -0,0 +1,208 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT is only needed for asymmetric (JWKS) keys
+    pyjwt = None
+
+
+class TokenVerifier:
+    """Verify Supabase access tokens locally, falling back to Auth's get_user.
+
+    HS256 tokens are checked against the project JWT secret and asymmetric
+    tokens against the project JWKS. Verified identities and revoked tokens
+    are kept in bounded caches that never outlive the token's own expiry.
+    """
+
+    def __init__(self, auth_client, jwt_secret=None, jwks_url=None,
+                 audience='authenticated', cache_size=1024, cache_ttl=300, leeway=30):
+        self.auth_client = auth_client
+        self.jwt_secret = jwt_secret.encode() if jwt_secret else None
+        self.audience = audience
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.leeway = leeway
+        self._jwks_client = None
+        if jwks_url and pyjwt is not None:
+            self._jwks_client = pyjwt.PyJWKClient(jwks_url, cache_keys=True)
+        self._identities = OrderedDict()
+        self._revoked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token):
+        """Return the identity dict for a valid token, or None if it is invalid"""
+        if not token:
+            return None
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+        with self._lock:
+            if self._is_revoked(key, now):
+                return None
+            cached = self._identities.get(key)
+            if cached is not None:
+                identity, expires_at = cached
+                if expires_at > now:
+                    self._identities.move_to_end(key)
+                    return identity
+                del self._identities[key]
+
+        try:
+            header, claims = _decode_unverified(token)
+        except ValueError:
+            return None
+
+        decided, identity = self._verify_locally(token, header, claims, now)
+        if not decided:
+            identity = self._verify_remotely(token, claims)
+        if identity is not None:
+            self._remember(key, identity, now)
+        return identity
+
+    def revoke(self, token):
+        """Reject this token for the rest of its lifetime (e.g. after logout)"""
+        if not token:
+            return
+        key = hashlib.sha256(token.encode()).hexdigest()
+        try:
+            _, claims = _decode_unverified(token)
+            expires_at = float(claims.get('exp'))
+        except (ValueError, TypeError):
+            expires_at = time.time() + self.cache_ttl
+        with self._lock:
+            self._identities.pop(key, None)
+            self._revoked[key] = expires_at
+            self._revoked.move_to_end(key)
+            while len(self._revoked) > self.cache_size:
+                self._revoked.popitem(last=False)
+
+    def _is_revoked(self, key, now):
+        expires_at = self._revoked.get(key)
+        if expires_at is None:
+            return False
+        if expires_at + self.leeway <= now:
+            del self._revoked[key]
+            return False
+        return True
+
+    def _remember(self, key, identity, now):
+        expires_at = now + self.cache_ttl
+        if identity.get('exp'):
+            expires_at = min(expires_at, identity['exp'])
+        with self._lock:
+            self._identities[key] = (identity, expires_at)
+            self._identities.move_to_end(key)
+            while len(self._identities) > self.cache_size:
+                self._identities.popitem(last=False)
+
+    def _verify_locally(self, token, header, claims, now):
+        # Returns (decided, identity); decided is False when only Auth can tell
+        if not _claims_valid(claims, self.audience, self.leeway, now):
+            return True, None
+        alg = header.get('alg')
+        if alg == 'HS256' and self.jwt_secret:
+            signing_input, _, signature = token.rpartition('.')
+            expected = hmac.new(self.jwt_secret, signing_input.encode(), hashlib.sha256).digest()
+            try:
+                actual = _b64decode(signature)
+            except ValueError:
+                return True, None
+            if not hmac.compare_digest(expected, actual):
+                return True, None
+            return True, _identity(claims)
+        if alg in ('RS256', 'ES256') and self._jwks_client is not None:
+            try:
+                signing_key = self._jwks_client.get_signing_key_from_jwt(token)
+            except Exception:
+                # JWKS unreachable or unknown kid: let Auth decide
+                return False, None
+            try:
+                verified = pyjwt.decode(
+                    token, signing_key.key, algorithms=[alg],
+                    audience=self.audience, leeway=self.leeway
+                )
+            except pyjwt.PyJWTError:
+                return True, None
+            return True, _identity(verified)
+        return False, None
+
+    def _verify_remotely(self, token, claims):
+        try:
+            user = self.auth_client.auth.get_user(token)
+        except Exception:
+            return None
+        user = getattr(user, 'user', None)
+        if not user:
+            return None
+        identity = _identity(claims)
+        identity['id'] = user.id
+        identity['email'] = user.email
+        return identity
+
+
+def verifier_from_env(auth_client):
+    """Build a TokenVerifier from SUPABASE_JWT_SECRET / SUPABASE_URL and AUTH_CACHE_* settings"""
+    supabase_url = os.getenv('SUPABASE_URL') or ''
+    jwks_url = os.getenv('SUPABASE_JWKS_URL')
+    if not jwks_url and supabase_url:
+        jwks_url = supabase_url.rstrip('/') + '/auth/v1/.well-known/jwks.json'
+    return TokenVerifier(
+        auth_client,
+        jwt_secret=os.getenv('SUPABASE_JWT_SECRET'),
+        jwks_url=jwks_url,
+        audience=os.getenv('SUPABASE_JWT_AUDIENCE', 'authenticated'),
+        cache_size=int(os.getenv('AUTH_CACHE_SIZE', '1024')),
+        cache_ttl=int(os.getenv('AUTH_CACHE_TTL', '300')),
+    )
+
+
+def _b64decode(segment):
+    try:
+        return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Malformed token segment') from e
+
+
+def _decode_unverified(token):
+    parts = token.split('.')
+    if len(parts) != 3:
+        raise ValueError('Malformed token')
+    try:
+        header = json.loads(_b64decode(parts[0]))
+        claims = json.loads(_b64decode(parts[1]))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Malformed token') from e
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise ValueError('Malformed token')
+    return header, claims
+
+
+def _claims_valid(claims, audience, leeway, now):
+    exp = claims.get('exp')
+    if not isinstance(exp, (int, float)) or exp + leeway <= now:
+        return False
+    nbf = claims.get('nbf')
+    if isinstance(nbf, (int, float)) and nbf - leeway > now:
+        return False
+    if audience:
+        aud = claims.get('aud')
+        auds = aud if isinstance(aud, list) else [aud]
+        if audience not in auds:
+            return False
+    return True
+
+
+def _identity(claims):
+    return {
+        'id': claims.get('sub'),
+        'email': claims.get('email'),
+        'role': claims.get('role'),
+        'session_id': claims.get('session_id'),
+        'exp': claims.get('exp'),
+    }
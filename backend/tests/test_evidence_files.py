@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import run  # noqa: E402  (benchmarks/run.py: seeded data and the in-process app)
+
+from blob_store import parse_ref  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    tables, objects = run.seed(12, 0.01, random.Random(1))
+    fake = run.FakeSupabase(tables)
+    fake.buckets['blobs'] = dict(objects)
+    main_server = run.load_app(fake)
+    yield fake, main_server
+    main_server.supabase_anon.auth._remove_session()
+
+
+def test_missing_evidence_blob_is_404(app):
+    fake, main_server = app
+    # Row 1 holds one stored file with metadata, including its size
+    row = next(r for r in fake.tables['e_portfolio'] if r['id'] == 1)
+    assert row['artefacts_evidence_meta'][0]['size']
+    client = main_server.app.test_client()
+    assert client.get('/api/e-portfolio/1/download/0').status_code == 200
+
+    main_server.blob_store.delete(parse_ref(row['artefacts_evidence_files']))
+    for path in ('/api/e-portfolio/1/download/0', '/api/e-portfolio/1/preview/0'):
+        response = client.get(path)
+        assert response.status_code == 404
+        assert response.get_json() == {'error': 'File not found'}
+        response = client.get(path, headers={'Range': 'bytes=0-99'})
+        assert response.status_code == 404